@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Shared asyncio AWS clients
+"""
+import asyncio
+from contextlib import AsyncExitStack
+from aiobotocore.config import AioConfig
+from aiobotocore.credentials import AioDeferredRefreshableCredentials
+from aiobotocore.session import get_session
+from aws import clients
+from aws.accounts import credential_fetch
+from aws.ratelimit import register_async_rate_limits
+
+CLIENTS = {}
+SESSION = None
+EXIT_STACK = None
+SEMAPHORE = None
+CONCURRENCY = 64
+
+
+def configure_async_clients(concurrency=64):
+    """
+    Requests in flight at once across every async client
+    """
+    global CONCURRENCY  # pylint: disable=global-statement
+
+    CONCURRENCY = concurrency
+
+
+def aio_session():
+    """
+    aiobotocore session acting like the sync clients' session; the
+    credentials of an assumed role are refreshed, off the loop, by the
+    fetch of the sync session when they expire
+    """
+    session = get_session()
+    fetch = credential_fetch(clients.SESSION)
+    if fetch:
+
+        async def refresh():
+            return await asyncio.get_running_loop().run_in_executor(None, fetch)
+
+        # pylint: disable=protected-access
+        session._credentials = AioDeferredRefreshableCredentials(
+            refresh_using=refresh, method="assume-role"
+        )
+
+    return session
+
+
+async def open_clients():
+    """
+    Start a client registry on the running loop
+    """
+    global SESSION, EXIT_STACK, SEMAPHORE  # pylint: disable=global-statement
+
+    SESSION = aio_session()
+    EXIT_STACK = AsyncExitStack()
+    SEMAPHORE = asyncio.Semaphore(CONCURRENCY)
+    CLIENTS.clear()
+
+
+async def close_clients():
+    """
+    Close every client of the registry
+    """
+    CLIENTS.clear()
+    await EXIT_STACK.aclose()
+
+
+async def create_client(service, region):
+    """
+    aiobotocore client with the settings of the sync clients
+    """
+    config = AioConfig(
+        max_pool_connections=clients.CONFIG.max_pool_connections,
+        retries=clients.CONFIG.retries,
+        connect_timeout=clients.CONFIG.connect_timeout,
+        read_timeout=clients.CONFIG.read_timeout,
+    )
+    client = await EXIT_STACK.enter_async_context(
+        SESSION.create_client(
+            service,
+            region_name=region,
+            config=config,
+            endpoint_url=clients.ENDPOINT_URL,
+        )
+    )
+    register_async_rate_limits(client)
+    for hook in clients.CLIENT_HOOKS:
+        hook(client)
+
+    return client
+
+
+async def get_client(service, region=None):
+    """
+    Client for a service and region, created once and reused; a failed
+    creation is retried by the next caller
+    """
+    client_id = (service, region)
+    if client_id not in CLIENTS:
+        CLIENTS[client_id] = asyncio.ensure_future(create_client(service, region))
+
+    future = CLIENTS[client_id]
+    try:
+        return await future
+    except BaseException:
+        if CLIENTS.get(client_id) is future:
+            del CLIENTS[client_id]
+        raise
+
+
+async def call(client, operation, **params):
+    """
+    API call, waits for a free request slot
+    """
+    async with SEMAPHORE:
+        return await getattr(client, operation)(**params)
+
+
+async def paginate(client, operation, **params):
+    """
+    Pages of an API call, each page request waits for a free request slot
+    """
+    pages = client.get_paginator(operation).paginate(**params).__aiter__()
+    while True:
+        async with SEMAPHORE:
+            try:
+                page = await pages.__anext__()
+            except StopAsyncIteration:
+                return
+        yield page
+
+
+async def collect(client, operation, key, **params):
+    """
+    Items under key of every page of an API call
+    """
+    return [
+        item
+        async for page in paginate(client, operation, **params)
+        for item in page[key]
+    ]
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+asyncio scan engine, every region/mode scan shares one event loop
+
+The loop runs on its own thread and hands rows to the consumer through the
+scheduler's row streams; the sync row builders run on a pool of at most
+max_workers threads
+"""
+import asyncio
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from common.scheduler import END, RowStream, ScanCancelled, chunks, stream_results
+from aio.clients import open_clients, close_clients
+
+# seconds between hand-over attempts while the consumer is behind
+HAND_OVER_WAIT = 0.01
+
+
+async def hand_over(stream, chunk):
+    """
+    Put a chunk into a stream without blocking the loop, waits while the
+    consumer is behind
+    """
+    while not stream.offer(chunk):
+        await asyncio.sleep(HAND_OVER_WAIT)
+
+
+async def produce_jobs(jobs, streams, max_workers, mode_limits):
+    """
+    Run (region, mode, query_func) coroutines into their streams, at most
+    mode_limits[mode] at once per mode
+    """
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=max_workers)
+    )
+    semaphores = {
+        mode: asyncio.Semaphore(limit) for mode, limit in (mode_limits or {}).items()
+    }
+
+    async def produce(job, stream):
+        region, mode, query_func = job
+        async with semaphores.get(mode, nullcontext()):
+            if stream.cancelled:
+                return
+            try:
+                table_head, pages = await query_func(region)
+                stream.start(table_head)
+                async for rows in pages:
+                    for chunk in chunks(rows):
+                        await hand_over(stream, chunk)
+                stream.finish()
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                stream.finish(exception)
+            try:
+                await hand_over(stream, END)
+            except ScanCancelled:
+                pass
+
+    await open_clients()
+    try:
+        await asyncio.gather(
+            *(produce(job, stream) for job, stream in zip(jobs, streams))
+        )
+    finally:
+        await close_clients()
+
+
+def run_async_jobs(jobs, max_workers, mode_limits=None):
+    """
+    run_jobs on the event loop; yields (job, (table_head, rows), exception)
+    in submission order
+    """
+    streams = [RowStream() for _ in jobs]
+    thread = threading.Thread(
+        target=asyncio.run,
+        args=(produce_jobs(jobs, streams, max_workers, mode_limits),),
+    )
+    thread.start()
+    try:
+        yield from stream_results(jobs, streams)
+    finally:
+        thread.join()
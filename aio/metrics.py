@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+asyncio CloudWatch metrics
+"""
+import asyncio
+from cloudwatch.metrics import MAX_QUERIES, metric_results, metric_data_params
+from aio.clients import paginate
+
+
+async def get_metric_data(cloudwatch_client, queries, start, end):
+    """
+    (query id, timestamps, values) of at most MAX_QUERIES queries
+    """
+    return [
+        result
+        async for page in paginate(
+            cloudwatch_client,
+            "get_metric_data",
+            **metric_data_params(queries, start, end),
+        )
+        for result in metric_results(page)
+    ]
+
+
+async def fetch_metrics(cloudwatch_client, metric_batch):
+    """
+    MetricBatch.fetch with every GetMetricData chunk requested concurrently
+    """
+    chunks = [
+        (start, queries[offset : offset + MAX_QUERIES])
+        for start, queries in metric_batch.windows()
+        for offset in range(0, len(queries), MAX_QUERIES)
+    ]
+    fetched = await asyncio.gather(
+        *(
+            get_metric_data(cloudwatch_client, queries, start, metric_batch.end)
+            for start, queries in chunks
+        )
+    )
+
+    return metric_batch.results(result for results in fetched for result in results)
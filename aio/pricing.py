@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+asyncio pricing, prices land in the same maps as the sync lookups
+"""
+import asyncio
+import functools
+from pricing import price
+from common.memo import async_single_flight
+from aio.clients import get_client, call, collect
+
+
+async def products(query):
+    """
+    Price List items of a query, from the offline index when it covers the region
+    """
+    region = next(
+        item["Value"] for item in query.resource_filter if item["Field"] == "regionCode"
+    )
+    if price.PRICE_INDEX and price.PRICE_INDEX.covers(query.service_code, region):
+        data = await asyncio.get_running_loop().run_in_executor(
+            None,
+            functools.partial(
+                price.PRICE_INDEX.get_products,
+                ServiceCode=query.service_code,
+                Filters=query.resource_filter,
+            ),
+        )
+        return data["PriceList"]
+
+    client = await get_client("pricing", "us-east-1")
+    if query.paginate:
+        return await collect(
+            client,
+            "get_products",
+            "PriceList",
+            ServiceCode=query.service_code,
+            Filters=query.resource_filter,
+            PaginationConfig={"PageSize": 100},
+        )
+
+    data = await call(
+        client,
+        "get_products",
+        ServiceCode=query.service_code,
+        Filters=query.resource_filter,
+    )
+    return data["PriceList"]
+
+
+async def resolve_price(price_map, query):
+    """
+    Cached price of a query
+    """
+
+    async def load():
+        monthly_cost = (
+            price.PRICE_CACHE.get(query.cache_key) if price.PRICE_CACHE else None
+        )
+        if monthly_cost is None:
+            monthly_cost = query.interpret(await products(query))
+            if price.PRICE_CACHE:
+                price.PRICE_CACHE.set(query.cache_key, monthly_cost)
+        return monthly_cost
+
+    return await async_single_flight(price_map, query.cost_id, load)
+
+
+async def resolve_prices(price_map, queries):
+    """
+    Resolve distinct queries concurrently, None entries are skipped
+    """
+    distinct = {query.cost_id: query for query in queries if query}
+    await asyncio.gather(
+        *(resolve_price(price_map, query) for query in distinct.values())
+    )
+
+
+async def prefetch_prices(price_map, kind, query, cost_ids):
+    """
+    Page through all region products of a prefetch query once
+    """
+
+    async def load():
+        if price.PRICE_CACHE and price.PRICE_CACHE.get(query.cache_key):
+            return True
+        price_items = await products(query)
+        count = price.store_prefetched(price_map, kind, cost_ids, price_items)
+        if price.PRICE_CACHE:
+            price.PRICE_CACHE.set(query.cache_key, count)
+        return True
+
+    await async_single_flight(price.PREFETCHED, query.cost_id, load)
@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+"""
+asyncio scanners
+
+Every page of resources has its prices, instance type checks and metrics
+requested concurrently, its rows are then built by the sync scanners' row
+builders and yielded as a list; the builders run on the engine's executor
+as a miss of the warmed maps falls back to a blocking lookup
+"""
+import asyncio
+from pricing.price import (
+    ebs_price_query,
+    ec2_price_query,
+    rds_price_query,
+    snapshot_price_query,
+    load_balancer_price_query,
+    log_group_price_query,
+    ec2_prefetch_query,
+    rds_prefetch_query,
+)
+from common.memo import async_single_flight
+from common.records import NOT_AVAILABLE
+from aio.clients import get_client, call, collect, paginate
+from aio.pricing import resolve_prices, prefetch_prices
+from aio.metrics import fetch_metrics
+from cloudwatch.metrics import MetricBatch
+from rightsizing.engine import SizingBatch
+from ec2 import ec2scan, catalog
+from rds import rdsscan, orderable
+from ebs import ebsscan
+from lb import lbscan
+from ami import amiscan
+from ecr import ecrscan
+from cloudwatch import group
+
+
+async def off_loop(func, *args):
+    """
+    Result of a sync builder, run on the engine's executor
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+async def ec2_catalog(client):
+    """
+    Instance type catalog of the region of an EC2 client
+    """
+    region = client.meta.region_name
+
+    async def load():
+        instance_types = catalog.read_catalog(region)
+        if instance_types is None:
+            instance_types = catalog.build_catalog(
+                await collect(
+                    client,
+                    "describe_instance_types",
+                    "InstanceTypes",
+                    PaginationConfig={"PageSize": 100},
+                )
+            )
+            catalog.write_catalog(region, instance_types)
+        return instance_types
+
+    return await async_single_flight(catalog.CATALOGS, region, load)
+
+
+async def rds_orderable_index(client, engine, engine_version):
+    """
+    Orderable classes of an engine version in the region of an RDS client
+    """
+    region = client.meta.region_name
+
+    async def load():
+        index = orderable.read_index(region, engine, engine_version)
+        if index is None:
+            index = orderable.build_index(
+                await collect(
+                    client,
+                    "describe_orderable_db_instance_options",
+                    "OrderableDBInstanceOptions",
+                    Engine=engine,
+                    EngineVersion=engine_version,
+                    PaginationConfig={"PageSize": 1000},
+                )
+            )
+            orderable.write_index(region, engine, engine_version, index)
+        return index
+
+    return await async_single_flight(
+        orderable.INDEXES, (region, engine, engine_version), load
+    )
+
+
+async def warm_ec2(region, ec2_client, instances):
+    """
+    Prices and the instance type catalog the EC2 row builder and right-sizing
+    look up, candidate prices come from the region-wide prefetch
+    """
+    await asyncio.gather(
+        resolve_prices(
+            ec2scan.INSTANCE_PRICE_MAP,
+            [
+                ec2_price_query(
+                    instance["InstanceType"],
+                    ec2scan.instance_platform(instance),
+                    region,
+                )
+                for instance in instances
+            ],
+        ),
+        ec2_catalog(ec2_client),
+    )
+
+
+async def ec2_page_rows(region, ec2_client):
+    """
+    Rows of every describe_instances page, yielded once its metrics are in
+    """
+    cloudwatch_client = await get_client("cloudwatch", region)
+    async for page in paginate(ec2_client, "describe_instances"):
+        instances = list(ec2scan.page_instances(page))
+        state_batch = await off_loop(ec2scan.ec2_state, region, instances)
+        await warm_ec2(
+            region,
+            ec2_client,
+            [
+                instance
+                for instance in instances
+                if not state_batch.row(instance["InstanceId"])
+            ],
+        )
+
+        metric_batch = MetricBatch(region, ec2scan.START_TIME, ec2scan.END_TIME)
+        sizing_batch = SizingBatch()
+        table_data, running_instances = await off_loop(
+            ec2scan.ec2_rows,
+            region,
+            ec2_client,
+            instances,
+            metric_batch,
+            state_batch,
+            sizing_batch,
+        )
+        ec2scan.apply_ec2_metrics(
+            await fetch_metrics(cloudwatch_client, metric_batch),
+            table_data,
+            running_instances,
+            sizing_batch,
+        )
+        await off_loop(
+            ec2scan.apply_ec2_rightsizing, region, ec2_client, table_data, sizing_batch
+        )
+        await off_loop(state_batch.save, table_data)
+        yield table_data
+
+
+async def query_ec2(region):
+    """
+    EC2 entrypoint
+    """
+    print(f"\n\n✨  Running in EC2 instance mode {region}")
+    ec2_client = await get_client("ec2", region)
+    await prefetch_prices(ec2scan.INSTANCE_PRICE_MAP, *ec2_prefetch_query(region))
+
+    return ec2scan.TABLE_HEAD, ec2_page_rows(region, ec2_client)
+
+
+async def warm_rds(region, client, ec2_client, instances):
+    """
+    Prices, orderable indexes and the instance type catalog the RDS row
+    builder and right-sizing look up, candidate prices come from the
+    region-wide prefetch
+    """
+    await asyncio.gather(
+        resolve_prices(
+            rdsscan.RDS_PRICE_MAP,
+            [
+                rds_price_query(rdsscan.instance_config(instance), region)
+                for instance in instances
+            ],
+        ),
+        *(
+            rds_orderable_index(client, engine, engine_version)
+            for engine, engine_version in {
+                (instance["Engine"], instance["EngineVersion"])
+                for instance in instances
+                if instance["DBInstanceClass"] != "db.serverless"
+            }
+        ),
+        ec2_catalog(ec2_client),
+    )
+
+
+async def rds_page_rows(region, client):
+    """
+    Rows of every describe_db_instances page, yielded once its metrics are in
+    """
+    cloudwatch_client = await get_client("cloudwatch", region)
+    ec2_client = await get_client("ec2", region)
+    clusters = await collect(client, "describe_db_clusters", "DBClusters")
+    clustered_instances = rdsscan.cluster_members(clusters)
+
+    async for page in paginate(client, "describe_db_instances"):
+        instances = page["DBInstances"]
+        state_batch = await off_loop(
+            rdsscan.rds_state, region, instances, clustered_instances
+        )
+        await warm_rds(
+            region,
+            client,
+            ec2_client,
+            [
+                instance
+                for instance in instances
+                if not state_batch.row(instance["DBInstanceIdentifier"])
+            ],
+        )
+
+        metric_batch = MetricBatch(region, rdsscan.START_TIME, rdsscan.END_TIME)
+        sizing_batch = SizingBatch()
+        table_data, available_instances = await off_loop(
+            rdsscan.rds_rows,
+            region,
+            ec2_client,
+            clustered_instances,
+            instances,
+            metric_batch,
+            state_batch,
+            sizing_batch,
+        )
+        rdsscan.apply_rds_metrics(
+            await fetch_metrics(cloudwatch_client, metric_batch),
+            table_data,
+            available_instances,
+            sizing_batch,
+        )
+        await off_loop(
+            rdsscan.apply_rds_rightsizing,
+            region,
+            client,
+            ec2_client,
+            table_data,
+            sizing_batch,
+        )
+        await off_loop(state_batch.save, table_data)
+        yield table_data
+
+
+async def query_rds(region):
+    """
+    RDS entry point
+    """
+    print(f"\n\n✨  Running in RDS mode {region}")
+    client = await get_client("rds", region)
+    await prefetch_prices(rdsscan.RDS_PRICE_MAP, *rds_prefetch_query(region))
+
+    return rdsscan.TABLE_HEAD, rds_page_rows(region, client)
+
+
+async def volume_page_rows(region, client):
+    """
+    Rows of every describe_volumes page
+    """
+    async for page in paginate(client, "describe_volumes"):
+        volumes = page["Volumes"]
+        state_batch = await off_loop(ebsscan.volume_state, region, volumes)
+        volume_types = {
+            volume["VolumeType"]
+            for volume in volumes
+            if not state_batch.row(volume["VolumeId"])
+        }
+        if "gp2" in volume_types:
+            volume_types.add("gp3")
+        await resolve_prices(
+            ebsscan.EBS_PRICE_MAP,
+            [ebs_price_query(volume_type, region) for volume_type in volume_types],
+        )
+        table_data = await off_loop(ebsscan.volume_rows, region, volumes, state_batch)
+        await off_loop(state_batch.save, table_data)
+        yield table_data
+
+
+async def query_ebs(region):
+    """
+    EBS entry point
+    """
+    print(f"\n\n✨  Running in EBS volume mode {region}")
+    client = await get_client("ec2", region)
+
+    return ebsscan.VOLUME_TABLE_HEAD, volume_page_rows(region, client)
+
+
+async def snapshot_page_rows(region, client, account_id):
+    """
+    Rows of every describe_snapshots page
+    """
+    async for page in paginate(client, "describe_snapshots", OwnerIds=[account_id]):
+        snapshots = page["Snapshots"]
+        state_batch = await off_loop(ebsscan.snapshot_state, region, snapshots)
+        await resolve_prices(
+            ebsscan.SNAPSHOT_PRICE_MAP,
+            [
+                snapshot_price_query(tier, region)
+                for tier in {
+                    snapshot.get("StorageTier", NOT_AVAILABLE)
+                    for snapshot in snapshots
+                    if not state_batch.row(snapshot["SnapshotId"])
+                }
+            ],
+        )
+        table_data = await off_loop(
+            ebsscan.snapshot_rows, region, snapshots, state_batch
+        )
+        await off_loop(state_batch.save, table_data)
+        yield table_data
+
+
+async def query_ebs_snapshots(region):
+    """
+    EBS snapshot entrypoint
+    """
+    print(f"\n\n✨  Running in EBS snapshot mode {region}")
+    ec2_client = await get_client("ec2", region)
+    sts_client = await get_client("sts")
+
+    identity = await call(sts_client, "get_caller_identity")
+
+    return ebsscan.SNAPSHOT_TABLE_HEAD, snapshot_page_rows(
+        region, ec2_client, identity.get("Account")
+    )
+
+
+async def lb_page_rows(region, client, rows, page_key):
+    """
+    Rows of every describe_load_balancers page, yielded once its metrics are in
+    """
+    cloudwatch_client = await get_client("cloudwatch", region)
+    async for page in paginate(client, "describe_load_balancers"):
+        metric_batch = MetricBatch(region, lbscan.START_TIME, lbscan.END_TIME)
+        pending = await off_loop(rows, region, page[page_key], metric_batch)
+        yield lbscan.apply_lb_metrics(
+            await fetch_metrics(cloudwatch_client, metric_batch), pending
+        )
+
+
+async def query_lb(region):
+    """
+    LB entrypoint
+    """
+    elbv1_client = await get_client("elb", region)
+    elbv2_client = await get_client("elbv2", region)
+    await resolve_prices(
+        lbscan.INSTANCE_PRICE_MAP,
+        [
+            load_balancer_price_query(region, "classic"),
+            load_balancer_price_query(region, "application"),
+        ],
+    )
+
+    async def load_balancer_rows():
+        print(f"\n\n✨  Running in Load Balancer V1 mode {region}")
+        async for rows in lb_page_rows(
+            region, elbv1_client, lbscan.classic_rows, "LoadBalancerDescriptions"
+        ):
+            yield rows
+        print(f"✨  Running in Load Balancer V2 mode {region}")
+        async for rows in lb_page_rows(
+            region, elbv2_client, lbscan.lb_v2_rows, "LoadBalancers"
+        ):
+            yield rows
+
+    return lbscan.TABLE_HEAD, load_balancer_rows()
+
+
+async def log_group_page_rows(region, client):
+    """
+    Rows of every describe_log_groups page, yielded once its metrics are in
+    """
+    cloudwatch_client = await get_client("cloudwatch", region)
+    async for page in paginate(client, "describe_log_groups"):
+        metric_batch = MetricBatch(region, group.START_TIME, group.END_TIME)
+        pending = await off_loop(
+            group.log_group_rows, region, page["logGroups"], metric_batch
+        )
+        yield group.apply_log_group_metrics(
+            await fetch_metrics(cloudwatch_client, metric_batch), pending
+        )
+
+
+async def query_cloudwatch_groups(region):
+    """
+    CloudWatch Group entrypoint
+    """
+    print(f"\n\n✨  Running in CloudWatch Group mode {region}")
+    cloudwatch_logs_client = await get_client("logs", region)
+    await resolve_prices(group.INSTANCE_PRICE_MAP, [log_group_price_query(region)])
+
+    return group.TABLE_HEAD, log_group_page_rows(region, cloudwatch_logs_client)
+
+
+async def ami_page_rows(client):
+    """
+    Rows of every describe_images page
+    """
+    async for page in paginate(client, "describe_images", Owners=["self"]):
+        yield amiscan.ami_rows(page["Images"])
+
+
+async def query_ami(region):
+    """
+    AMI entrypoint
+    """
+    print(f"\n\n✨  Running in AMI mode {region}")
+    ec2_client = await get_client("ec2", region)
+
+    return amiscan.TABLE_HEAD, ami_page_rows(ec2_client)
+
+
+async def repository_page_rows(ecr_client):
+    """
+    Rows of every describe_repositories page, its repositories are listed
+    concurrently and rows keep the repository order
+    """
+    async for page in paginate(ecr_client, "describe_repositories"):
+        repo_names = [repo["repositoryName"] for repo in page["repositories"]]
+        for repo_name in repo_names:
+            print(f"Processing repository: {repo_name}")
+        repo_images = await asyncio.gather(
+            *(
+                collect(
+                    ecr_client,
+                    "describe_images",
+                    "imageDetails",
+                    repositoryName=repo_name,
+                    **ecrscan.image_filter(),
+                )
+                for repo_name in repo_names
+            )
+        )
+        for repo_name, images in zip(repo_names, repo_images):
+            yield ecrscan.image_rows(repo_name, images)
+
+
+async def query_ecr_images(region):
+    """
+    ECR Images entrypoint
+    """
+    print(
+        f"\n\n✨  Running in ECR Images mode {region} for images not used within 90 days"
+    )
+    ecr_client = await get_client("ecr", region)
+
+    return ecrscan.TABLE_HEAD, repository_page_rows(ecr_client)
+
+
+MODE_FUNCTIONS = {
+    "ebs": [query_ebs, query_ebs_snapshots],
+    "ec2": [query_ec2],
+    "rds": [query_rds],
+    "lb": [query_lb],
+    "ami": [query_ami],
+    "ecr": [query_ecr_images],
+    "cw": [query_cloudwatch_groups],
+}
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Assumed-role sessions of organization accounts
+"""
+import os
+from functools import partial
+import boto3
+import botocore.session
+from botocore.credentials import (
+    AssumeRoleCredentialFetcher,
+    DeferredRefreshableCredentials,
+    JSONFileCache,
+)
+from aws import clients
+
+CREDENTIAL_CACHE = "~/.cache/costs-optimizer/credentials"
+SESSIONS = {}
+# {boto3 session: function fetching its credentials}, for the async clients
+CREDENTIAL_FETCHES = {}
+
+
+def assumed_role_session(account_id, role_name):
+    """
+    boto3 session of a role in another account; credentials are kept on
+    disk until they expire and refreshed by botocore when they do
+    """
+    session_id = (account_id, role_name)
+    if session_id in SESSIONS:
+        return SESSIONS[session_id]
+
+    # pylint: disable=protected-access
+    source_session = clients.DEFAULT_SESSION._session
+    fetcher = AssumeRoleCredentialFetcher(
+        client_creator=partial(
+            source_session.create_client, endpoint_url=clients.ENDPOINT_URL
+        ),
+        source_credentials=source_session.get_credentials(),
+        role_arn=f"arn:aws:iam::{account_id}:role/{role_name}",
+        extra_args={"RoleSessionName": "costs-optimizer"},
+        cache=JSONFileCache(os.path.expanduser(CREDENTIAL_CACHE)),
+    )
+    botocore_session = botocore.session.Session()
+    botocore_session._credentials = DeferredRefreshableCredentials(
+        refresh_using=fetcher.fetch_credentials, method="assume-role"
+    )
+    SESSIONS[session_id] = boto3.Session(botocore_session=botocore_session)
+    CREDENTIAL_FETCHES[SESSIONS[session_id]] = fetcher.fetch_credentials
+
+    return SESSIONS[session_id]
+
+
+def use_account(account_id, role_name):
+    """
+    Clients created afterwards act in account_id
+    """
+    clients.use_session(assumed_role_session(account_id, role_name))
+
+
+def credential_fetch(session):
+    """
+    Function fetching the credentials of an assumed-role session as botocore
+    refresh metadata, None for other sessions
+    """
+    return CREDENTIAL_FETCHES.get(session)
+
+
+def caller_account():
+    """
+    Account the current credentials act in
+    """
+    return clients.get_client("sts").get_caller_identity()["Account"]
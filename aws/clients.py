@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Shared AWS clients
+"""
+import threading
+import boto3
+from botocore.config import Config
+from aws.ratelimit import register_rate_limits
+
+DEFAULT_SESSION = boto3.Session()
+SESSION = DEFAULT_SESSION
+CLIENTS = {}
+# called with every client created, sync or async, e.g. to stub its calls
+CLIENT_HOOKS = []
+LOCK = threading.Lock()
+ENDPOINT_URL = None
+CONFIG = Config(
+    max_pool_connections=50,
+    retries={"mode": "adaptive", "max_attempts": 10},
+    connect_timeout=10,
+    read_timeout=60,
+)
+
+
+def configure_clients(
+    max_pool_connections=50,
+    retry_mode="adaptive",
+    max_attempts=10,
+    timeout=60,
+    endpoint_url=None,
+):
+    """
+    Client settings, applied to clients created afterwards;
+    endpoint_url sends every call to one endpoint, e.g. a local stub
+    """
+    global CONFIG, ENDPOINT_URL  # pylint: disable=global-statement
+
+    CONFIG = Config(
+        max_pool_connections=max_pool_connections,
+        retries={"mode": retry_mode, "max_attempts": max_attempts},
+        connect_timeout=min(timeout, 10),
+        read_timeout=timeout,
+    )
+    ENDPOINT_URL = endpoint_url
+    with LOCK:
+        CLIENTS.clear()
+
+
+def use_session(session):
+    """
+    Session of clients created afterwards, e.g. an assumed role
+    """
+    global SESSION  # pylint: disable=global-statement
+
+    with LOCK:
+        SESSION = session
+        CLIENTS.clear()
+
+
+def add_client_hook(hook):
+    """
+    Call hook(client) with every client created afterwards
+    """
+    with LOCK:
+        CLIENT_HOOKS.append(hook)
+        CLIENTS.clear()
+
+
+def get_client(service, region=None):
+    """
+    Client for a service and region, created once and reused
+    """
+    client_id = (service, region)
+    client = CLIENTS.get(client_id)
+    if client is None:
+        with LOCK:
+            client = CLIENTS.get(client_id)
+            if client is None:
+                client = SESSION.client(
+                    service,
+                    region_name=region,
+                    config=CONFIG,
+                    endpoint_url=ENDPOINT_URL,
+                )
+                register_rate_limits(client)
+                for hook in CLIENT_HOOKS:
+                    hook(client)
+                CLIENTS[client_id] = client
+
+    return client
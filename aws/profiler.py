@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+API call profiler
+
+Hooks on every client count calls, retries, throttled attempts, errors and
+bytes received and keep a latency histogram per (service, operation, region);
+the latency of a call runs from its parameter build to after-call, so rate
+limiter waits and retries are part of it
+"""
+import json
+import time
+import threading
+from aws.clients import add_client_hook
+from aws.ratelimit import THROTTLING_CODES
+
+# upper bounds in ms of the latency histogram, slower calls land in a last bucket
+LATENCY_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+COUNTERS = ["calls", "retries", "throttles", "errors", "bytes", "seconds"]
+TABLE_HEAD = [
+    "Service",
+    "Operation",
+    "Region",
+    "Calls",
+    "Retries",
+    "Throttles",
+    "Errors",
+    "KiB",
+    "Total s",
+    "Mean ms",
+    "p95 ms",
+    "Max ms",
+]
+PROFILE = None
+
+
+def enable_api_profile():
+    """
+    Profile the calls of every client created afterwards
+    """
+    global PROFILE  # pylint: disable=global-statement
+
+    if PROFILE is None:
+        PROFILE = ApiProfile()
+        add_client_hook(PROFILE.register)
+
+    return PROFILE
+
+
+def take_api_profile():
+    """
+    Operations profiled since the last take, e.g. to hand them to the parent
+    of an account worker process
+    """
+    return PROFILE.take() if PROFILE else {}
+
+
+def histogram_labels():
+    """
+    Names of the histogram buckets
+    """
+    return [f"<={bound}ms" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}ms"]
+
+
+def percentile(histogram, fraction):
+    """
+    Upper bound in ms of the bucket holding a fraction of the calls, None
+    for the last bucket
+    """
+    target = sum(histogram) * fraction
+    seen = 0
+    for bound, count in zip(LATENCY_BUCKETS, histogram):
+        seen += count
+        if count and seen >= target:
+            return bound
+
+    return None
+
+
+class ApiProfile:
+    """
+    {(service, operation, region): counters and histogram} of API calls
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.operations = {}
+
+    def stats(self, key):
+        """
+        Counters of an operation, created on first use; call with the lock held
+        """
+        if key not in self.operations:
+            self.operations[key] = {
+                **dict.fromkeys(COUNTERS, 0),
+                "max_seconds": 0,
+                "histogram": [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+
+        return self.operations[key]
+
+    def record(self, key, seconds, retries=0, received=0, error=False):
+        """
+        A completed call
+        """
+        bucket = next(
+            (
+                position
+                for position, bound in enumerate(LATENCY_BUCKETS)
+                if seconds * 1000 <= bound
+            ),
+            len(LATENCY_BUCKETS),
+        )
+        with self.lock:
+            stats = self.stats(key)
+            stats["calls"] += 1
+            stats["retries"] += retries
+            stats["errors"] += error
+            stats["bytes"] += received
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+            stats["histogram"][bucket] += 1
+
+    def throttled(self, key):
+        """
+        A throttled request attempt
+        """
+        with self.lock:
+            self.stats(key)["throttles"] += 1
+
+    def register(self, client):
+        """
+        Profile the calls of a botocore or aiobotocore client
+        """
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name
+
+        def started(context, **_):
+            context["profile_started"] = time.perf_counter()
+
+        def elapsed(context):
+            return time.perf_counter() - context.get(
+                "profile_started", time.perf_counter()
+            )
+
+        def after_call(model, http_response, parsed, context, **_):
+            metadata = parsed.get("ResponseMetadata", {})
+            self.record(
+                (service, model.name, region),
+                elapsed(context),
+                metadata.get("RetryAttempts", 0),
+                int(http_response.headers.get("content-length") or 0),
+                http_response.status_code >= 300,
+            )
+
+        def after_call_error(event_name, context, **_):
+            # only the exception and context come with this event
+            self.record(
+                (service, event_name.rsplit(".", 1)[-1], region),
+                elapsed(context),
+                error=True,
+            )
+
+        def needs_retry(event_name, response=None, **_):
+            if response is None:
+                return
+            if response[1].get("Error", {}).get("Code") in THROTTLING_CODES:
+                self.throttled((service, event_name.rsplit(".", 1)[-1], region))
+
+        client.meta.events.register("before-parameter-build", started)
+        client.meta.events.register("after-call", after_call)
+        client.meta.events.register("after-call-error", after_call_error)
+        client.meta.events.register("needs-retry", needs_retry)
+
+    def take(self):
+        """
+        Profiled operations, the profile starts over
+        """
+        with self.lock:
+            operations, self.operations = self.operations, {}
+
+        return operations
+
+    def merge(self, operations):
+        """
+        Add the operations of another profile, e.g. of a worker process
+        """
+        with self.lock:
+            for key, other in operations.items():
+                stats = self.stats(key)
+                for counter in COUNTERS:
+                    stats[counter] += other[counter]
+                stats["max_seconds"] = max(stats["max_seconds"], other["max_seconds"])
+                stats["histogram"] = [
+                    count + other_count
+                    for count, other_count in zip(
+                        stats["histogram"], other["histogram"]
+                    )
+                ]
+
+    def rows(self):
+        """
+        Summary rows, slowest operations in total first
+        """
+        with self.lock:
+            operations = sorted(
+                self.operations.items(), key=lambda item: -item[1]["seconds"]
+            )
+
+        return [
+            [
+                service,
+                operation,
+                region or "-",
+                stats["calls"],
+                stats["retries"],
+                stats["throttles"],
+                stats["errors"],
+                round(stats["bytes"] / 1024, 1),
+                round(stats["seconds"], 2),
+                round(stats["seconds"] / stats["calls"] * 1000, 1),
+                percentile(stats["histogram"], 0.95) or f">{LATENCY_BUCKETS[-1]}",
+                round(stats["max_seconds"] * 1000, 1),
+            ]
+            for (service, operation, region), stats in operations
+            if stats["calls"]
+        ]
+
+    def dump(self, path):
+        """
+        Write the profile as JSON
+        """
+        with self.lock:
+            operations = [
+                {
+                    "service": service,
+                    "operation": operation,
+                    "region": region,
+                    **{counter: stats[counter] for counter in COUNTERS},
+                    "max_seconds": stats["max_seconds"],
+                    "histogram": dict(zip(histogram_labels(), stats["histogram"])),
+                }
+                for (service, operation, region), stats in self.operations.items()
+            ]
+        with open(path, "w", encoding="utf-8") as profile_file:
+            json.dump({"operations": operations}, profile_file, indent=2)
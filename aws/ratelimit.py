@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Process-wide AWS rate limiter
+
+Every request attempt takes a token from the bucket of its
+(service, operation, region); throttling halves the bucket rate and
+successful responses raise it back, so scans settle near the account limits
+instead of retrying into them
+"""
+import time
+import asyncio
+import threading
+
+THROTTLING_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "SlowDown",
+}
+# requests per second of buckets without a configured rate, learned from there
+DEFAULT_RATE = 20
+MAX_LEARNED_RATE = 100
+MIN_RATE = 0.5
+INCREASE = 0.5
+RATES = {}
+BUCKETS = {}
+LOCK = threading.Lock()
+ENABLED = True
+
+
+def parse_rates(rates):
+    """
+    "pricing=5,ec2.DescribeInstances=20" -> {"pricing": 5.0, ...}
+    """
+    parsed = {}
+    for rate in filter(None, (rates or "").split(",")):
+        key, _, value = rate.partition("=")
+        parsed[key.strip()] = float(value)
+
+    return parsed
+
+
+def configure_rate_limits(rates=None, enabled=True):
+    """
+    Configured rates by "service" or "service.Operation"
+    """
+    global ENABLED  # pylint: disable=global-statement
+
+    ENABLED = enabled
+    with LOCK:
+        RATES.clear()
+        RATES.update(parse_rates(rates))
+        BUCKETS.clear()
+
+
+class TokenBucket:
+    """
+    Token bucket with an adaptive rate, configured rates are a ceiling
+    """
+
+    def __init__(self, rate, ceiling):
+        self.lock = threading.Lock()
+        self.rate = rate
+        self.ceiling = ceiling
+        self.tokens = max(rate, 1)
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """
+        Take a token, seconds to wait before sending
+        """
+        with self.lock:
+            now = time.monotonic()
+            burst = max(self.rate, 1)
+            self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+
+            return -self.tokens / self.rate
+
+    def throttled(self):
+        """
+        Halve the rate
+        """
+        with self.lock:
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self.tokens = min(self.tokens, 0)
+
+    def succeeded(self):
+        """
+        Raise the rate back towards the ceiling
+        """
+        with self.lock:
+            self.rate = min(self.ceiling, self.rate + INCREASE)
+
+
+def bucket(service, operation, region):
+    """
+    Bucket of an API operation in a region
+    """
+    bucket_id = (service, operation, region)
+    with LOCK:
+        if bucket_id not in BUCKETS:
+            rate = RATES.get(f"{service}.{operation}", RATES.get(service))
+            if rate:
+                BUCKETS[bucket_id] = TokenBucket(rate, rate)
+            else:
+                BUCKETS[bucket_id] = TokenBucket(DEFAULT_RATE, MAX_LEARNED_RATE)
+
+        return BUCKETS[bucket_id]
+
+
+def operation_bucket(client, event_name):
+    """
+    Bucket of the operation an event of client belongs to
+    """
+    return bucket(
+        client.meta.service_model.service_name,
+        event_name.rsplit(".", 1)[-1],
+        client.meta.region_name,
+    )
+
+
+def response_feedback(client, event_name, response):
+    """
+    Adapt the bucket rate to a response
+    """
+    if response is None:
+        return
+    http_response, parsed = response
+    error_code = parsed.get("Error", {}).get("Code")
+    if error_code in THROTTLING_CODES:
+        operation_bucket(client, event_name).throttled()
+    elif http_response.status_code < 400:
+        operation_bucket(client, event_name).succeeded()
+
+
+def register_rate_limits(client):
+    """
+    Rate limit every request attempt of a botocore client
+    """
+    if not ENABLED:
+        return
+
+    def before_send(event_name, **_):
+        delay = operation_bucket(client, event_name).reserve()
+        if delay:
+            time.sleep(delay)
+
+    def needs_retry(event_name, response=None, **_):
+        response_feedback(client, event_name, response)
+
+    client.meta.events.register("before-send", before_send)
+    client.meta.events.register("needs-retry", needs_retry)
+
+
+def register_async_rate_limits(client):
+    """
+    Rate limit every request attempt of an aiobotocore client
+    """
+    if not ENABLED:
+        return
+
+    async def before_send(event_name, **_):
+        delay = operation_bucket(client, event_name).reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def needs_retry(event_name, response=None, **_):
+        response_feedback(client, event_name, response)
+
+    client.meta.events.register("before-send", before_send)
+    client.meta.events.register("needs-retry", needs_retry)
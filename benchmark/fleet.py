@@ -0,0 +1,663 @@
+#!/usr/bin/env python3
+"""
+Synthetic AWS accounts
+
+Answers the API operations the scanners call with resources generated from
+their position in the account, so pages are built when they are requested
+and an account of 200k snapshots costs no more memory than one page of them
+"""
+import json
+import zlib
+from datetime import datetime, timedelta, timezone
+
+NOW = datetime.now(timezone.utc)
+# (family, architecture, burstable, GiB per vCPU, USD per vCPU hour)
+FAMILIES = [
+    ("t3", "x86_64", True, 4, 0.0208),
+    ("t3a", "x86_64", True, 4, 0.0188),
+    ("t4g", "arm64", True, 4, 0.0168),
+    ("m5", "x86_64", False, 4, 0.048),
+    ("m6a", "x86_64", False, 4, 0.0432),
+    ("m7a", "x86_64", False, 4, 0.0580),
+    ("m6g", "arm64", False, 4, 0.0385),
+    ("m7g", "arm64", False, 4, 0.0408),
+    ("c5", "x86_64", False, 2, 0.0425),
+    ("c6a", "x86_64", False, 2, 0.0383),
+    ("c7a", "x86_64", False, 2, 0.0513),
+    ("c6g", "arm64", False, 2, 0.034),
+    ("c7g", "arm64", False, 2, 0.0363),
+    ("r5", "x86_64", False, 8, 0.063),
+    ("r6a", "x86_64", False, 8, 0.0567),
+    ("r7a", "x86_64", False, 8, 0.0761),
+    ("r6g", "arm64", False, 8, 0.0504),
+    ("r7g", "arm64", False, 8, 0.0536),
+    ("r8g", "arm64", False, 8, 0.0589),
+]
+SIZES = [
+    ("medium", 1),
+    ("large", 2),
+    ("xlarge", 4),
+    ("2xlarge", 8),
+    ("4xlarge", 16),
+    ("8xlarge", 32),
+]
+# families fleets are made of, the candidates are every family
+FLEET_FAMILIES = ["t3", "m5", "c5", "r5", "m6g", "m7a"]
+DB_FAMILIES = ["t3", "t4g", "m5", "m6g", "m7g", "r5", "r6g", "r7g", "r8g"]
+DB_ENGINES = [
+    ("aurora-postgresql", "Aurora PostgreSQL", "16.1", ["aurora", "aurora-iopt1"]),
+    ("postgres", "PostgreSQL", "16.3", ["gp2", "gp3", "io1"]),
+    ("mysql", "MySQL", "8.0.35", ["gp2", "gp3", "io1"]),
+]
+VOLUME_TYPES = ["gp2", "gp3", "io1", "st1"]
+# usagetype prefix of the Price List items of a region
+USAGE_PREFIX = "EUC1"
+
+
+def spread(index, modulo, salt=0):
+    """
+    Deterministic pseudo-random pick of an index in [0, modulo)
+    """
+    return ((index + 1) * 2654435761 + salt * 40503) % 4294967296 % modulo
+
+
+def instance_types():
+    """
+    (type, vcpus, memory MiB, architecture, burstable, USD per hour)
+    """
+    for family, architecture, burstable, memory, price in FAMILIES:
+        for size, vcpus in SIZES:
+            yield (
+                f"{family}.{size}",
+                vcpus,
+                vcpus * memory * 1024,
+                architecture,
+                burstable,
+                round(vcpus * price, 4),
+            )
+
+
+def price_item(sku, product_family, attributes, usd):
+    """
+    Price List item of get_products
+    """
+    return json.dumps(
+        {
+            "product": {
+                "productFamily": product_family,
+                "attributes": {**attributes, "productFamily": product_family},
+                "sku": sku,
+            },
+            "terms": {
+                "OnDemand": {
+                    f"{sku}.OD": {
+                        "priceDimensions": {
+                            f"{sku}.OD.D": {"pricePerUnit": {"USD": f"{usd:.6f}"}}
+                        }
+                    }
+                }
+            },
+        }
+    )
+
+
+def paged(params, items, key, **paging):
+    """
+    Page of items(start, stop) answering params; paging is total, size,
+    limit (request page size parameter) and token_in/token_out
+    """
+    token_in = paging.get("token_in", "NextToken")
+    token_out = paging.get("token_out", token_in)
+    start = int(params.get(token_in) or 0)
+    size = params.get(paging.get("limit", "MaxResults")) or paging["size"]
+    stop = min(start + size, paging["total"])
+    page = {key: items(start, stop)}
+    if stop < paging["total"]:
+        page[token_out] = str(stop)
+
+    return page
+
+
+class SyntheticAccount:
+    """
+    One account in one region at a given scale
+    """
+
+    def __init__(self, region, scale, datapoints=720):
+        self.region = region
+        self.scale = scale
+        self.datapoints = datapoints
+        self.types = list(instance_types())
+        self.products = self.price_list()
+        self.queries = {}
+        self.operations = {
+            ("sts", "GetCallerIdentity"): self.get_caller_identity,
+            ("ec2", "DescribeInstances"): self.describe_instances,
+            ("ec2", "DescribeInstanceTypes"): self.describe_instance_types,
+            ("ec2", "DescribeVolumes"): self.describe_volumes,
+            ("ec2", "DescribeSnapshots"): self.describe_snapshots,
+            ("ec2", "DescribeImages"): self.describe_amis,
+            ("rds", "DescribeDBClusters"): self.describe_db_clusters,
+            ("rds", "DescribeDBInstances"): self.describe_db_instances,
+            (
+                "rds",
+                "DescribeOrderableDBInstanceOptions",
+            ): self.describe_orderable_options,
+            ("cloudwatch", "GetMetricData"): self.get_metric_data,
+            ("logs", "DescribeLogGroups"): self.describe_log_groups,
+            ("ecr", "DescribeRepositories"): self.describe_repositories,
+            ("ecr", "DescribeImages"): self.describe_repository_images,
+            ("elb", "DescribeLoadBalancers"): self.describe_classic_lbs,
+            ("elbv2", "DescribeLoadBalancers"): self.describe_lbs,
+            ("pricing", "GetProducts"): self.get_products,
+        }
+
+    def respond(self, service, operation, params):
+        """
+        Parsed response of an operation
+        """
+        handler = self.operations.get((service, operation))
+        if handler is None:
+            raise NotImplementedError(f"{service}.{operation}")
+
+        return handler(params)
+
+    def get_caller_identity(self, _):
+        """
+        sts GetCallerIdentity
+        """
+        return {"Account": "123456789012", "Arn": "arn:aws:iam::123456789012:root"}
+
+    def instance(self, index):
+        """
+        EC2 instance at a position of the account
+        """
+        family = FLEET_FAMILIES[spread(index, len(FLEET_FAMILIES))]
+        size = SIZES[spread(index, 3, 1)][0]
+        running = spread(index, 100, 2) >= 15
+        return {
+            "InstanceId": f"i-{index:017x}",
+            "InstanceType": f"{family}.{size}",
+            "PlatformDetails": "Windows" if spread(index, 10, 3) == 0 else "Linux/UNIX",
+            "State": {"Name": "running" if running else "stopped"},
+            "StateTransitionReason": (
+                "" if running else "User initiated (2025-03-24 10:00:00 GMT)"
+            ),
+            "LaunchTime": NOW - timedelta(days=spread(index, 900, 4)),
+            "Monitoring": {"State": "disabled"},
+            "Tags": [{"Key": "Name", "Value": f"synthetic-instance-{index}"}],
+        }
+
+    def describe_instances(self, params):
+        """
+        ec2 DescribeInstances, one reservation per instance
+        """
+        return paged(
+            params,
+            lambda start, stop: [
+                {"Instances": [self.instance(index)]} for index in range(start, stop)
+            ],
+            "Reservations",
+            total=self.scale["instances"],
+            size=1000,
+        )
+
+    def describe_instance_types(self, params):
+        """
+        ec2 DescribeInstanceTypes
+        """
+        return paged(
+            params,
+            lambda start, stop: [
+                {
+                    "InstanceType": kind,
+                    "CurrentGeneration": True,
+                    "BurstablePerformanceSupported": burstable,
+                    "VCpuInfo": {"DefaultVCpus": vcpus},
+                    "MemoryInfo": {"SizeInMiB": memory},
+                    "ProcessorInfo": {"SupportedArchitectures": [architecture]},
+                    "NetworkInfo": {"NetworkPerformance": "Up to 12.5 Gigabit"},
+                }
+                for kind, vcpus, memory, architecture, burstable, _ in self.types[
+                    start:stop
+                ]
+            ],
+            "InstanceTypes",
+            total=len(self.types),
+            size=100,
+        )
+
+    def describe_volumes(self, params):
+        """
+        ec2 DescribeVolumes, a third of them unattached
+        """
+        return paged(
+            params,
+            lambda start, stop: [
+                {
+                    "VolumeId": f"vol-{index:017x}",
+                    "Size": 8 * (1 + spread(index, 64)),
+                    "VolumeType": VOLUME_TYPES[spread(index, len(VOLUME_TYPES), 1)],
+                    "State": "in-use" if spread(index, 3, 2) else "available",
+                    "CreateTime": NOW - timedelta(days=spread(index, 900, 3)),
+                    "Attachments": (
+                        [{"InstanceId": f"i-{index:017x}"}]
+                        if spread(index, 3, 2)
+                        else []
+                    ),
+                }
+                for index in range(start, stop)
+            ],
+            "Volumes",
+            total=self.scale["volumes"],
+            size=500,
+        )
+
+    def describe_snapshots(self, params):
+        """
+        ec2 DescribeSnapshots, every tenth one archived
+        """
+        return paged(
+            params,
+            lambda start, stop: [
+                {
+                    "SnapshotId": f"snap-{index:017x}",
+                    "Description": f"Created by synthetic backup {index}",
+                    "VolumeSize": 8 * (1 + spread(index, 64)),
+                    "FullSnapshotSizeInBytes": spread(index, 500, 1) * 1024**3,
+                    "State": "completed",
+                    "StartTime": NOW - timedelta(days=spread(index, 900, 2)),
+                    "StorageTier": "archive"
+                    if spread(index, 10, 3) == 0
+                    else "standard",
+                }
+                for index in range(start, stop)
+            ],
+            "Snapshots",
+            total=self.scale["snapshots"],
+            size=1000,
+        )
+
+    def describe_amis(self, params):
+        """
+        ec2 DescribeImages of the account
+        """
+        return paged(
+            params,
+            lambda start, stop: [
+                {
+                    "ImageId": f"ami-{index:017x}",
+                    "Name": f"synthetic-image-{index}",
+                    "State": "available",
+                    "CreationDate": (NOW - timedelta(days=spread(index, 900))).strftime(
+                        "%Y-%m-%dT%H:%M:%S.000Z"
+                    ),
+                    "BlockDeviceMappings": [{"Ebs": {"VolumeSize": 8}}],
+                }
+                for index in range(start, stop)
+            ],
+            "Images",
+            total=self.scale["amis"],
+            size=1000,
+        )
+
+    def db_instance(self, index):
+        """
+        RDS instance at a position of the account, aurora ones come in
+        clusters of two
+        """
+        engine, _, version, storage_types = DB_ENGINES[spread(index // 2, 3)]
+        family = ["t3", "m5", "r5", "r6g"][spread(index, 4, 1)]
+        size = "medium" if family == "t3" else SIZES[1 + spread(index, 2, 2)][0]
+        return {
+            "DBInstanceIdentifier": f"synthetic-db-{index}",
+            "DBInstanceClass": f"db.{family}.{size}",
+            "Engine": engine,
+            "EngineVersion": version,
+            "StorageType": storage_types[0],
+            "DBInstanceStatus": "available" if spread(index, 10, 3) else "stopped",
+            "MultiAZ": not engine.startswith("aurora") and spread(index, 3, 4) == 0,
+        }
+
+    def describe_db_clusters(self, params):
+        """
+        rds DescribeDBClusters
+        """
+        clusters = [
+            index
+            for index in range(0, self.scale["db_instances"], 2)
+            if self.db_instance(index)["Engine"].startswith("aurora")
+        ]
+        return paged(
+            params,
+            lambda start, stop: [
+                {
+                    "DBClusterIdentifier": f"synthetic-cluster-{index}",
+                    "DBClusterMembers": [
+                        {
+                            "DBInstanceIdentifier": f"synthetic-db-{member}",
+                            "IsClusterWriter": member == index,
+                        }
+                        for member in (index, index + 1)
+                        if member < self.scale["db_instances"]
+                    ],
+                }
+                for index in clusters[start:stop]
+            ],
+            "DBClusters",
+            total=len(clusters),
+            size=100,
+            token_in="Marker",
+            limit="MaxRecords",
+        )
+
+    def describe_db_instances(self, params):
+        """
+        rds DescribeDBInstances
+        """
+        return paged(
+            params,
+            lambda start, stop: [
+                self.db_instance(index) for index in range(start, stop)
+            ],
+            "DBInstances",
+            total=self.scale["db_instances"],
+            size=100,
+            token_in="Marker",
+            limit="MaxRecords",
+        )
+
+    def describe_orderable_options(self, params):
+        """
+        rds DescribeOrderableDBInstanceOptions of an engine version
+        """
+        storage_types = next(
+            engine[3] for engine in DB_ENGINES if engine[0] == params["Engine"]
+        )
+        options = [
+            {
+                "Engine": params["Engine"],
+                "EngineVersion": params.get("EngineVersion"),
+                "DBInstanceClass": f"db.{kind}",
+                "StorageType": storage_type,
+                "MultiAZCapable": True,
+            }
+            for kind, *_ in self.types
+            if kind.split(".")[0] in DB_FAMILIES
+            for storage_type in storage_types
+        ]
+        return paged(
+            params,
+            lambda start, stop: options[start:stop],
+            "OrderableDBInstanceOptions",
+            total=len(options),
+            size=100,
+            token_in="Marker",
+            limit="MaxRecords",
+        )
+
+    def series(self, query, start_time, end_time):
+        """
+        Datapoints of a GetMetricData query, hourly CPU between 0 and 60%
+        """
+        period = query["MetricStat"]["Period"]
+        count = min(
+            int((end_time - start_time).total_seconds() // period), self.datapoints
+        )
+        level = spread(zlib.crc32(str(query["MetricStat"]).encode("utf-8")), 60)
+        return (
+            [end_time - timedelta(seconds=period * step) for step in range(count)],
+            [float((level + step % 7) % 61) for step in range(count)],
+        )
+
+    def get_metric_data(self, params):
+        """
+        monitoring GetMetricData, pages hold at most 100,800 datapoints
+        """
+        queries = params["MetricDataQueries"]
+        start = int(params.get("NextToken") or 0)
+        results = []
+        datapoints = 0
+        for position in range(start, len(queries)):
+            timestamps, values = self.series(
+                queries[position], params["StartTime"], params["EndTime"]
+            )
+            if results and datapoints + len(values) > 100800:
+                return {"MetricDataResults": results, "NextToken": str(position)}
+            datapoints += len(values)
+            results.append(
+                {
+                    "Id": queries[position]["Id"],
+                    "Timestamps": timestamps,
+                    "Values": values,
+                    "StatusCode": "Complete",
+                }
+            )
+
+        return {"MetricDataResults": results}
+
+    def describe_log_groups(self, params):
+        """
+        logs DescribeLogGroups
+        """
+        return paged(
+            params,
+            lambda start, stop: [
+                {
+                    "logGroupName": f"/synthetic/service-{index % 97}/group-{index}",
+                    "creationTime": int(
+                        (NOW - timedelta(days=spread(index, 900))).timestamp() * 1000
+                    ),
+                    "storedBytes": spread(index, 50, 1) * 1024**3,
+                    **({"retentionInDays": 30} if spread(index, 2, 2) else {}),
+                    "logGroupClass": "STANDARD",
+                }
+                for index in range(start, stop)
+            ],
+            "logGroups",
+            total=self.scale["log_groups"],
+            size=50,
+            token_in="nextToken",
+            limit="limit",
+        )
+
+    def describe_repositories(self, params):
+        """
+        ecr DescribeRepositories
+        """
+        return paged(
+            params,
+            lambda start, stop: [
+                {"repositoryName": f"synthetic/repository-{index}"}
+                for index in range(start, stop)
+            ],
+            "repositories",
+            total=self.scale["repositories"],
+            size=100,
+            token_in="nextToken",
+            limit="maxResults",
+        )
+
+    def describe_repository_images(self, params):
+        """
+        ecr DescribeImages of a repository, half of them not pulled for a year
+        """
+        repository = params["repositoryName"]
+        return paged(
+            params,
+            lambda start, stop: [
+                {
+                    "imageDigest": f"sha256:{index:064x}",
+                    "imageTags": [f"build-{index}"],
+                    "imagePushedAt": NOW - timedelta(days=30 + spread(index, 700)),
+                    "lastRecordedPullTime": NOW
+                    - timedelta(days=365 if spread(index, 2, 1) else 7),
+                    "imageSizeInBytes": (1 + spread(index, 900, 2)) * 1024**2,
+                    "repositoryName": repository,
+                }
+                for index in range(start, stop)
+            ],
+            "imageDetails",
+            total=self.scale["repository_images"],
+            size=100,
+            token_in="nextToken",
+            limit="maxResults",
+        )
+
+    def describe_classic_lbs(self, params):
+        """
+        elb DescribeLoadBalancers, a quarter of the load balancers are classic
+        """
+        return paged(
+            params,
+            lambda start, stop: [
+                {"LoadBalancerName": f"synthetic-classic-{index}"}
+                for index in range(start, stop)
+            ],
+            "LoadBalancerDescriptions",
+            total=self.scale["load_balancers"] // 4,
+            size=400,
+            token_in="Marker",
+            token_out="NextMarker",
+            limit="PageSize",
+        )
+
+    def describe_lbs(self, params):
+        """
+        elbv2 DescribeLoadBalancers
+        """
+        return paged(
+            params,
+            lambda start, stop: [
+                {
+                    "LoadBalancerName": f"synthetic-lb-{index}",
+                    "LoadBalancerArn": (
+                        "arn:aws:elasticloadbalancing:"
+                        f"{self.region}:123456789012:loadbalancer/app/"
+                        f"synthetic-lb-{index}/{index:016x}"
+                    ),
+                    "Type": "application" if index % 2 else "network",
+                }
+                for index in range(start, stop)
+            ],
+            "LoadBalancers",
+            total=self.scale["load_balancers"] - self.scale["load_balancers"] // 4,
+            size=400,
+            token_in="Marker",
+            token_out="NextMarker",
+            limit="PageSize",
+        )
+
+    def price_list(self):
+        """
+        (lower-cased attributes, Price List item) of every product
+        """
+        products = []
+
+        def add(product_family, attributes, usd):
+            sku = f"SKU{len(products):08d}"
+            products.append(
+                (
+                    {
+                        name: value.lower()
+                        for name, value in {
+                            **attributes,
+                            "productFamily": product_family,
+                            "regionCode": self.region,
+                        }.items()
+                    },
+                    price_item(
+                        sku,
+                        product_family,
+                        {**attributes, "regionCode": self.region},
+                        usd,
+                    ),
+                )
+            )
+
+        for kind, vcpus, _, _, _, usd in self.types:
+            for operating_system, license_cost in (("Linux", 0), ("Windows", 0.046)):
+                add(
+                    "Compute Instance",
+                    {
+                        "instanceType": kind,
+                        "operatingSystem": operating_system,
+                        "tenancy": "Shared",
+                        "preInstalledSw": "NA",
+                        "capacitystatus": "Used",
+                        "licenseModel": "No License required",
+                        "usagetype": f"{USAGE_PREFIX}-BoxUsage:{kind}",
+                    },
+                    usd + vcpus * license_cost,
+                )
+            if kind.split(".")[0] not in DB_FAMILIES:
+                continue
+            for _, engine_name, _, storage_types in DB_ENGINES:
+                storages = (
+                    ["EBS Only", "Aurora IO Optimization Mode"]
+                    if "aurora" in storage_types
+                    else ["EBS Only"]
+                )
+                for storage in storages:
+                    for deployment, factor in (("Single-AZ", 1.0), ("Multi-AZ", 2.0)):
+                        add(
+                            "Database Instance",
+                            {
+                                "instanceType": f"db.{kind}",
+                                "databaseEngine": engine_name,
+                                "deploymentOption": deployment,
+                                "storage": storage,
+                                "usagetype": f"{USAGE_PREFIX}-InstanceUsage:db.{kind}",
+                            },
+                            usd * 1.7 * factor,
+                        )
+        for volume_type, usd in zip(VOLUME_TYPES, (0.119, 0.0952, 0.149, 0.054)):
+            add(
+                "Storage",
+                {
+                    "volumeApiName": volume_type,
+                    "usagetype": f"{USAGE_PREFIX}-EBS:VolumeUsage.{volume_type}",
+                },
+                usd,
+            )
+        add(
+            "Storage Snapshot",
+            {"usagetype": f"{USAGE_PREFIX}-EBS:SnapshotUsage"},
+            0.054,
+        )
+        add(
+            "Storage Snapshot",
+            {"usagetype": f"{USAGE_PREFIX}-EBS:SnapshotArchiveStorage"},
+            0.0135,
+        )
+        add(
+            "Storage Snapshot",
+            {"usagetype": f"{USAGE_PREFIX}-TimedStorage-ByteHrs"},
+            0.0324,
+        )
+        add("Load Balancer", {"usagetype": f"{USAGE_PREFIX}-LoadBalancerUsage"}, 0.0252)
+
+        return products
+
+    def get_products(self, params):
+        """
+        pricing GetProducts, TERM_MATCH filters compared case-insensitively
+        """
+        filters = tuple(
+            (item["Field"], item["Value"].lower()) for item in params["Filters"]
+        )
+        if filters not in self.queries:
+            self.queries[filters] = [
+                item
+                for attributes, item in self.products
+                if all(attributes.get(field) == value for field, value in filters)
+            ]
+        matches = self.queries[filters]
+
+        return paged(
+            params,
+            lambda start, stop: matches[start:stop],
+            "PriceList",
+            total=len(matches),
+            size=100,
+        )
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Price List decoding benchmark
+
+Compares the json.loads based decoding pricing/price.py used to do with
+pricing/parser.py over recorded get_products responses (a JSON list of pages
+as returned by the API) or a synthetic region of products
+"""
+import re
+import json
+import timeit
+import click
+from pricing.parser import usd_price, first_match, SNAPSHOT_USAGE
+
+
+def synthetic_price_list(count):
+    """
+    Price List items shaped like real get_products output
+    """
+    price_list = []
+    for number in range(count):
+        usagetype = (
+            f"EUC1-EBS:Usage{number}"
+            if number < count - 1
+            else "EUC1-EBS:SnapshotUsage"
+        )
+        sku = f"SKU{number:08d}"
+        reserved = {
+            f"{sku}.R{term}": {
+                "priceDimensions": {
+                    f"{sku}.R{term}.D": {
+                        "unit": "Hrs",
+                        "pricePerUnit": {"USD": "0.0300000000"},
+                        "description": "reserved",
+                    }
+                },
+                "termAttributes": {"LeaseContractLength": "1yr"},
+            }
+            for term in range(6)
+        }
+        price_list.append(
+            json.dumps(
+                {
+                    "product": {
+                        "productFamily": "Storage Snapshot",
+                        "attributes": {
+                            "regionCode": "eu-central-1",
+                            "usagetype": usagetype,
+                            "servicecode": "AmazonEC2",
+                            "location": "EU (Frankfurt)",
+                        },
+                        "sku": sku,
+                    },
+                    "serviceCode": "AmazonEC2",
+                    "terms": {
+                        "Reserved": reserved,
+                        "OnDemand": {
+                            f"{sku}.OD": {
+                                "priceDimensions": {
+                                    f"{sku}.OD.D": {
+                                        "unit": "GB-Mo",
+                                        "pricePerUnit": {"USD": "0.0540000000"},
+                                        "description": "on demand",
+                                    }
+                                },
+                            }
+                        },
+                    },
+                }
+            )
+        )
+
+    return price_list
+
+
+def legacy_first_match(price_list, usagetype):
+    """
+    Decoding as done before pricing/parser.py
+    """
+    gb_cost = "UNKN"
+    for unit in price_list:
+        unit = json.loads(unit)
+        od = unit["terms"]["OnDemand"]
+        id1 = list(od)[0]
+        id2 = list(od[id1]["priceDimensions"])[0]
+
+        if re.match(f".*{usagetype}$", unit["product"]["attributes"]["usagetype"]):
+            gb_cost = float(od[id1]["priceDimensions"][id2]["pricePerUnit"]["USD"])
+
+    return gb_cost
+
+
+def legacy_on_demand(price_item):
+    """
+    Single product decoding as done before pricing/parser.py
+    """
+    od = json.loads(price_item)["terms"]["OnDemand"]
+    id1 = list(od)[0]
+    id2 = list(od[id1]["priceDimensions"])[0]
+
+    return float(od[id1]["priceDimensions"][id2]["pricePerUnit"]["USD"])
+
+
+@click.command(context_settings={"show_default": True})
+@click.help_option("-h", "--help")
+@click.option("--responses", help="Recorded get_products pages (JSON list)")
+@click.option("--products", type=int, default=500, help="Synthetic product count")
+@click.option("--repeat", type=int, default=20)
+def main(**options):
+    """
+    Price List decoding benchmark
+    """
+    if options["responses"]:
+        with open(options["responses"], encoding="utf-8") as responses_file:
+            pages = json.load(responses_file)
+        price_list = [item for page in pages for item in page["PriceList"]]
+    else:
+        price_list = synthetic_price_list(options["products"])
+
+    repeat = options["repeat"]
+    results = {
+        "usagetype scan (legacy)": timeit.timeit(
+            lambda: legacy_first_match(price_list, "SnapshotUsage"), number=repeat
+        ),
+        "usagetype scan (parser)": timeit.timeit(
+            lambda: first_match(price_list, SNAPSHOT_USAGE), number=repeat
+        ),
+        "on-demand price (legacy)": timeit.timeit(
+            lambda: [legacy_on_demand(item) for item in price_list], number=repeat
+        ),
+        "on-demand price (parser)": timeit.timeit(
+            lambda: [usd_price(item) for item in price_list], number=repeat
+        ),
+    }
+
+    print(f"{len(price_list)} products, {repeat} rounds")
+    for name, seconds in results.items():
+        print(f"{name:<28} {seconds / repeat * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Scanner benchmark
+
+Runs every scanner and main end to end against a synthetic account served by
+benchmark/stub.py, with a simulated API round trip, and reports wall time,
+API calls per operation and peak memory of each; every scenario runs in a
+fresh process so caches and memory peaks do not leak between them
+"""
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import tempfile
+import multiprocessing
+from collections import deque
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+import click
+
+SCALE_OPTIONS = [
+    "instances",
+    "db_instances",
+    "volumes",
+    "snapshots",
+    "amis",
+    "log_groups",
+    "repositories",
+    "repository_images",
+    "load_balancers",
+]
+# scanner name: (main mode, position of its function in MODE_FUNCTIONS)
+SCANNERS = {
+    "ec2": ("ec2", 0),
+    "rds": ("rds", 0),
+    "ebs": ("ebs", 0),
+    "ebs_snapshots": ("ebs", 1),
+    "lb": ("lb", 0),
+    "ami": ("ami", 0),
+    "ecr": ("ecr", 0),
+    "cloudwatch_groups": ("cw", 0),
+}
+# no cache outlives a scenario
+NO_CACHES = [
+    "--price-cache",
+    "",
+    "--instance-catalog",
+    "",
+    "--rds-orderable",
+    "",
+    "--metrics-store",
+    "",
+]
+
+
+def peak_memory_mb():
+    """
+    Peak resident memory of the process, ru_maxrss is in bytes on macOS
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak /= 1024
+
+    return round(peak / 1024, 1)
+
+
+def run_scenario(options, engine, scanner):
+    """
+    Measure one scanner, or main for "main", in the calling process
+    """
+    # pylint: disable=import-outside-toplevel
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+    os.environ["AWS_DEFAULT_REGION"] = options["region"]
+    import main
+    from benchmark.fleet import SyntheticAccount
+    from benchmark.stub import StubbedAws
+
+    account = SyntheticAccount(
+        options["region"],
+        {name: options[name] for name in SCALE_OPTIONS},
+        options["datapoints"],
+    )
+    stub = StubbedAws(account, options["latency"] / 1000).install()
+    sys.stdout = open(os.devnull, "w", encoding="utf-8")  # scanners report progress
+    result = {"memory_before_mb": peak_memory_mb()}
+    started = time.perf_counter()
+
+    if scanner == "main":
+        with tempfile.TemporaryDirectory() as export_dir:
+            main.main.main(
+                args=[
+                    "-r",
+                    options["region"],
+                    "-m",
+                    ",".join(main.MODE_FUNCTIONS),
+                    "--engine",
+                    engine,
+                    "--format",
+                    options["export_format"],
+                    "-e",
+                    os.path.join(export_dir, f"export.{options['export_format']}"),
+                    "--quiet",
+                    *NO_CACHES,
+                ],
+                standalone_mode=False,
+            )
+    else:
+        mode, position = SCANNERS[scanner]
+        scan_options = main.main.make_context(
+            "main",
+            ["-r", options["region"], "-m", mode, "--engine", engine, *NO_CACHES],
+        ).params
+        main.configure(scan_options)
+        jobs = main.scan_jobs(scan_options)[position : position + 1]
+        for _, scan, exception in main.run_scans(scan_options, jobs):
+            if exception:
+                result["error"] = str(exception)
+                continue
+            rows = deque(enumerate(scan[1], 1), maxlen=1)
+            result["rows"] = rows[0][0] if rows else 0
+
+    result["wall_seconds"] = round(time.perf_counter() - started, 3)
+    result["peak_memory_mb"] = peak_memory_mb()
+    result["api_calls"] = stub.reset()
+    result["total_calls"] = sum(result["api_calls"].values())
+
+    return result
+
+
+def measure(options, engine, scanner):
+    """
+    run_scenario in a fresh process
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_scenario, options, engine, scanner).result()
+
+
+def change(value, baseline):
+    """
+    Relative change to a baseline value, empty without one
+    """
+    if not isinstance(value, (int, float)) or not baseline:
+        return ""
+
+    return f"{(value - baseline) / baseline:+.0%}"
+
+
+def print_results(results, baseline):
+    """
+    One line per scenario, with the changes to the baseline run
+    """
+    print(
+        f"{'scenario':<28} {'rows':>8} {'wall s':>9} {'':>5} "
+        f"{'calls':>8} {'':>5} {'peak MB':>9} {'':>5}"
+    )
+    for engine, scenarios in results.items():
+        for scanner, result in scenarios.items():
+            before = baseline.get(engine, {}).get(scanner, {})
+            name = f"{engine}/{scanner}"
+            if "error" in result:
+                name += " (failed)"
+            print(
+                f"{name:<28} {result.get('rows', ''):>8} "
+                f"{result['wall_seconds']:>9.2f} "
+                f"{change(result['wall_seconds'], before.get('wall_seconds')):>5} "
+                f"{result['total_calls']:>8} "
+                f"{change(result['total_calls'], before.get('total_calls')):>5} "
+                f"{result['peak_memory_mb']:>9.1f} "
+                f"{change(result['peak_memory_mb'], before.get('peak_memory_mb')):>5}"
+            )
+
+
+@click.command(context_settings={"show_default": True})
+@click.help_option("-h", "--help")
+@click.option("--instances", type=int, default=10000)
+@click.option("--db-instances", type=int, default=1000)
+@click.option("--volumes", type=int, default=10000)
+@click.option("--snapshots", type=int, default=200000)
+@click.option("--amis", type=int, default=1000)
+@click.option("--log-groups", type=int, default=50000)
+@click.option("--repositories", type=int, default=2000)
+@click.option(
+    "--repository-images", type=int, default=20, help="Images per ECR repository"
+)
+@click.option("--load-balancers", type=int, default=500)
+@click.option(
+    "--datapoints",
+    type=int,
+    default=720,
+    help="Datapoints per CloudWatch series, at most one per period",
+)
+@click.option("--latency", type=float, default=20, help="Per-call latency in ms")
+@click.option("--region", default="eu-central-1")
+@click.option(
+    "--engines",
+    default="thread",
+    help="Comma separated engines to run, thread and/or async",
+)
+@click.option(
+    "--scanners",
+    default=",".join([*SCANNERS, "main"]),
+    help="Comma separated scanners, main runs every mode end to end",
+)
+@click.option(
+    "--export-format",
+    type=click.Choice(["xlsx", "csv", "jsonl", "parquet"]),
+    default="xlsx",
+    help="Export format of the main scenario",
+)
+@click.option("-o", "--output", help="Write the results to this JSON file")
+@click.option("--baseline", help="Results JSON of an earlier run to compare to")
+def main(**options):
+    """
+    Scanner benchmark against a synthetic account
+    """
+    engines = options["engines"].split(",")
+    scanners = options["scanners"].split(",")
+    unknown = set(scanners) - {*SCANNERS, "main"}
+    if unknown:
+        raise click.UsageError(f"Unknown scanners: {', '.join(sorted(unknown))}")
+    if set(engines) - {"thread", "async"}:
+        raise click.UsageError("--engines takes thread and/or async")
+
+    baseline = {}
+    if options["baseline"]:
+        with open(options["baseline"], encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+
+    results = {}
+    for engine in engines:
+        results[engine] = {}
+        for scanner in scanners:
+            print(f"Running {engine}/{scanner}", file=sys.stderr)
+            results[engine][scanner] = measure(options, engine, scanner)
+
+    print_results(results, baseline)
+    if options["output"]:
+        with open(options["output"], "w", encoding="utf-8") as output_file:
+            json.dump(
+                {
+                    "created": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "options": options,
+                    "results": results,
+                },
+                output_file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
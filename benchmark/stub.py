@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for AWS
+
+Every client created while it is installed answers its calls from a
+synthetic account after a simulated round trip, the requests never leave
+the process, and the calls are counted per operation
+"""
+import time
+import asyncio
+import threading
+from botocore.awsrequest import AWSResponse
+from aws.clients import add_client_hook
+
+
+class StubbedAws:
+    """
+    Answers API calls from account, each one after latency seconds
+    """
+
+    def __init__(self, account, latency=0.0):
+        self.account = account
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def install(self):
+        """
+        Stub every client created afterwards
+        """
+        add_client_hook(self.hook)
+
+        return self
+
+    def reset(self):
+        """
+        {service.Operation: calls} since the last reset
+        """
+        with self.lock:
+            calls, self.calls = self.calls, {}
+
+        return dict(sorted(calls.items()))
+
+    def hook(self, client):
+        """
+        Stub the calls of a sync or async client
+        """
+        events = client.meta.events
+        events.register("before-parameter-build", self.keep_params)
+        if hasattr(client, "__aenter__"):
+            events.register("before-call", self.async_respond)
+        else:
+            events.register("before-call", self.respond)
+
+    @staticmethod
+    def keep_params(params, context, **_):
+        """
+        before-call only sees the serialized request, keep the API parameters
+        """
+        context["benchmark_params"] = dict(params)
+
+    def answer(self, model, context):
+        """
+        Count a call and build its response
+        """
+        service = model.service_model.service_name
+        with self.lock:
+            key = f"{service}.{model.name}"
+            self.calls[key] = self.calls.get(key, 0) + 1
+        parsed = self.account.respond(
+            service, model.name, context.get("benchmark_params", {})
+        )
+        parsed.setdefault("ResponseMetadata", {"HTTPStatusCode": 200})
+
+        return AWSResponse(None, 200, {}, None), parsed
+
+    def respond(self, model, context, **_):
+        """
+        Sync before-call handler, its response replaces the HTTP request
+        """
+        if self.latency:
+            time.sleep(self.latency)
+
+        return self.answer(model, context)
+
+    async def async_respond(self, model, context, **_):
+        """
+        Async before-call handler
+        """
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        return self.answer(model, context)
@@ -2,85 +2,123 @@
 """
 CloudWatch Group scanner
 """
-import boto3
+from typing import NamedTuple
 from datetime import datetime, timedelta
 from pricing.price import get_log_group_storage_costs
+from aws.clients import get_client
+from common.records import NOT_AVAILABLE, scaled
+from cloudwatch.metrics import MetricBatch
 
-SESSION = boto3.Session()
 INSTANCE_PRICE_MAP = {}
 START_TIME = datetime.now() - timedelta(days=30)
 END_TIME = datetime.now()
+TABLE_HEAD = [
+    "Group Name",
+    "Retention",
+    "Creation Time",
+    "Stored GB",
+    "Incoming GB",
+    "Monthly Storage Cost *",
+    "Log Group Class",
+]
+LogGroupRow = NamedTuple(
+    "LogGroupRow",
+    [
+        ("group_name", str),
+        ("retention", int),
+        ("created", str),
+        ("stored_gb", float),
+        ("incoming_gb", float),
+        ("storage_cost", float),
+        ("log_group_class", str),
+    ],
+)
 
 
-def get_log_group_incoming_bytes(cloudwatch_client, log_group_name):
+def get_log_group_incoming_bytes(data_points):
     """
     Get log group incoming bytes
     """
-    response = cloudwatch_client.get_metric_statistics(
-        Namespace="AWS/Logs",
-        MetricName="IncomingBytes",
-        Dimensions=[
-            {"Name": "LogGroupName", "Value": log_group_name}
-        ],
-        StartTime=START_TIME,
-        EndTime=END_TIME,
-        Period=2592000,
-        Statistics=["Sum"],
-    )
+    if data_points:
+        return round(sum(data_points) / 1024 / 1024 / 1024, 2)
 
-    if response["Datapoints"]:
-        return round(response["Datapoints"][0]["Sum"] / 1024 / 1024 / 1024, 2)
+    return NOT_AVAILABLE
 
-    return "N/A"
+
+def log_group_rows(region, groups, metric_batch):
+    """
+    Log group rows, IncomingBytes series are added to metric_batch
+    """
+    log_group_storage_costs = get_log_group_storage_costs(INSTANCE_PRICE_MAP, region)
+    pending = {}
+
+    for group in groups:
+        group_name = group["logGroupName"]
+        creation_time = group.get("creationTime")
+        if creation_time:
+            human_creation_time = datetime.fromtimestamp(creation_time / 1000).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            )
+        else:
+            human_creation_time = NOT_AVAILABLE
+        gigabytes = scaled(group.get("storedBytes", NOT_AVAILABLE), 1 / 1024**3)
+        metric_batch.add(
+            group_name,
+            "AWS/Logs",
+            "IncomingBytes",
+            [{"Name": "LogGroupName", "Value": group_name}],
+            "Sum",
+            86400,
+        )
+
+        pending[group_name] = LogGroupRow(
+            group_name[:80],
+            group.get("retentionInDays", NOT_AVAILABLE),
+            human_creation_time,
+            scaled(gigabytes, 1, 2),
+            NOT_AVAILABLE,
+            scaled(log_group_storage_costs, gigabytes, 2),
+            group.get("logGroupClass", NOT_AVAILABLE),
+        )
+
+    return pending
+
+
+def apply_log_group_metrics(metrics, pending):
+    """
+    Incoming GB of log groups
+    """
+    return [
+        group_data._replace(
+            incoming_gb=get_log_group_incoming_bytes(
+                metrics[group_name]["IncomingBytes"]
+            )
+        )
+        for group_name, group_data in pending.items()
+    ]
+
+
+def log_group_page_rows(region, page_iterator):
+    """
+    Rows of every describe_log_groups page, yielded once its metrics are in
+    """
+    cloudwatch_client = get_client("cloudwatch", region)
+    for page in page_iterator:
+        metric_batch = MetricBatch(region, START_TIME, END_TIME)
+        pending = log_group_rows(region, page["logGroups"], metric_batch)
+        yield from apply_log_group_metrics(
+            metric_batch.fetch(cloudwatch_client), pending
+        )
 
 
 def query_cloudwatch_groups(region):
     """
     CloudWatch Group entrypoint
     """
-    # pylint: disable=too-many-locals,too-many-branches
-    cloudwatch_client = SESSION.client("cloudwatch", region_name=region)
-    cloudwatch_logs_client = SESSION.client("logs", region_name=region)
-
-    table_head = [
-        "Group Name",
-        "Retention",
-        "Creation Time",
-        "Stored GB",
-        "Incoming GB",
-        "Monthly Storage Cost *",
-        "Log Group Class",
-    ]
-    table_data = []
+    cloudwatch_logs_client = get_client("logs", region)
 
-    log_group_storage_costs = get_log_group_storage_costs(INSTANCE_PRICE_MAP, region)
     print(f"\n\n✨  Running in CloudWatch Group mode {region}")
     paginator = cloudwatch_logs_client.get_paginator("describe_log_groups")
     page_iterator = paginator.paginate()
 
-    for page in page_iterator:
-        for group in page["logGroups"]:
-            group_name = group["logGroupName"]
-            retention = group.get("retentionInDays", "N/A")
-            creation_time = group.get("creationTime", "N/A")
-            human_creation_time = datetime.fromtimestamp(creation_time / 1000).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            stored_bytes = group.get("storedBytes", "N/A")
-            gigabytes = stored_bytes / 1024 / 1024 / 1024
-            log_group_class = group.get("logGroupClass", "N/A")
-            incoming_bytes = get_log_group_incoming_bytes(cloudwatch_client, group_name)
-
-            table_data.append(
-                [
-                    group_name[:80],
-                    retention,
-                    human_creation_time,
-                    round(gigabytes, 2),
-                    incoming_bytes,
-                    round(log_group_storage_costs * gigabytes, 2),
-                    log_group_class,
-                ]
-            )
-
-    return table_head, table_data
+    return TABLE_HEAD, log_group_page_rows(region, page_iterator)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Batched CloudWatch metrics
+"""
+from datetime import datetime, timezone
+from cloudwatch.store import MetricStore, series_key
+
+# GetMetricData limit
+MAX_QUERIES = 500
+METRIC_STORE = None
+
+
+def load_metric_store(store_path):
+    """
+    Keep fetched series on disk and only request the missing tail
+    """
+    global METRIC_STORE  # pylint: disable=global-statement
+
+    METRIC_STORE = MetricStore(store_path)
+
+    return METRIC_STORE
+
+
+def use_metric_scope(scope):
+    """
+    Series stored afterwards belong to scope, e.g. an account
+    """
+    if METRIC_STORE:
+        METRIC_STORE.scope = scope
+
+
+def metric_results(page):
+    """
+    (query id, timestamps, values) of a GetMetricData page
+    """
+    for result in page["MetricDataResults"]:
+        timestamps = [int(timestamp.timestamp()) for timestamp in result["Timestamps"]]
+        yield result["Id"], timestamps, result["Values"]
+
+
+def metric_data_params(queries, start, end):
+    """
+    GetMetricData parameters of queries between two epochs
+    """
+    return {
+        "MetricDataQueries": queries,
+        "StartTime": datetime.fromtimestamp(start, timezone.utc),
+        "EndTime": datetime.fromtimestamp(end, timezone.utc),
+        "ScanBy": "TimestampAscending",
+    }
+
+
+def get_metric_data(cloudwatch_client, queries, start, end):
+    """
+    (query id, timestamps, values) of queries between two epochs
+    """
+    paginator = cloudwatch_client.get_paginator("get_metric_data")
+    for offset in range(0, len(queries), MAX_QUERIES):
+        page_iterator = paginator.paginate(
+            **metric_data_params(queries[offset : offset + MAX_QUERIES], start, end)
+        )
+        for page in page_iterator:
+            yield from metric_results(page)
+
+
+class MetricBatch:
+    """
+    Metric requests of a scanner in a region, fetched with GetMetricData
+    """
+
+    def __init__(self, region, start_time, end_time):
+        self.scope = f"{METRIC_STORE.scope if METRIC_STORE else ''}|{region}"
+        self.start = int(start_time.timestamp())
+        self.end = int(end_time.timestamp())
+        self.queries = []
+        self.resources = {}
+
+    def add(
+        self, resource_id, namespace, metric_name, dimensions, stat, period=3600
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        """
+        Request a metric series of a resource
+        """
+        query_id = f"q{len(self.queries)}"
+        self.resources[query_id] = (resource_id, metric_name)
+        self.queries.append(
+            {
+                "Id": query_id,
+                "MetricStat": {
+                    "Metric": {
+                        "Namespace": namespace,
+                        "MetricName": metric_name,
+                        "Dimensions": dimensions,
+                    },
+                    "Period": period,
+                    "Stat": stat,
+                },
+                "ReturnData": True,
+            }
+        )
+
+    def windows(self):
+        """
+        (start, queries) to request, series stored by an earlier run only
+        need the window since then
+        """
+        if not METRIC_STORE:
+            return [(self.start, self.queries)]
+
+        # the last stored period is fetched again as it may have been partial
+        windows = {}
+        for query in self.queries:
+            period = query["MetricStat"]["Period"]
+            fetched_until = METRIC_STORE.fetched_until(series_key(self.scope, query))
+            start = self.start
+            if fetched_until:
+                start = max(start, fetched_until - fetched_until % period - period)
+            windows.setdefault(start, []).append(query)
+
+        return list(windows.items())
+
+    def results(self, series):
+        """
+        {resource_id: {metric_name: [values]}} from fetched
+        (query id, timestamps, values)
+        """
+        results = {}
+        for resource_id, metric_name in self.resources.values():
+            results.setdefault(resource_id, {})[metric_name] = []
+
+        if not METRIC_STORE:
+            for query_id, _, values in series:
+                resource_id, metric_name = self.resources[query_id]
+                results[resource_id][metric_name].extend(values)
+            return results
+
+        keys = {query["Id"]: series_key(self.scope, query) for query in self.queries}
+        for query_id, timestamps, values in series:
+            METRIC_STORE.append(
+                self.scope, keys[query_id], timestamps, values, self.end
+            )
+
+        METRIC_STORE.prune(self.scope, self.start)
+        for query_id, (resource_id, metric_name) in self.resources.items():
+            results[resource_id][metric_name] = METRIC_STORE.values(
+                keys[query_id], self.start, self.end
+            )
+
+        return results
+
+    def fetch(self, cloudwatch_client):
+        """
+        Values of every requested series as {resource_id: {metric_name: [values]}}
+        """
+        return self.results(
+            result
+            for start, queries in self.windows()
+            for result in get_metric_data(cloudwatch_client, queries, start, self.end)
+        )
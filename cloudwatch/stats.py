@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Utilization statistics
+"""
+import numpy as np
+
+STAT_COLUMNS = ["AVG", "MAX", "MIN", "P50", "P95", "P99", "Idle hours"]
+# record field suffixes and types of STAT_COLUMNS
+STAT_FIELDS = ["avg", "max", "min", "p50", "p95", "p99", "idle_hours"]
+STAT_TYPES = [float, float, float, float, float, float, int]
+
+
+def series_stats(series, idle_below, periods=None):
+    """
+    avg/max/min/p50/p95/p99 and the count of datapoints under idle_below of
+    every series in one pass, empty series give zeros; with periods, series
+    are padded with zeros to that many datapoints, as CloudWatch reports no
+    datapoint for the periods of a sum without any traffic
+    """
+    if not series:
+        return []
+    if periods:
+        series = [[*values, *[0.0] * (periods - len(values))] for values in series]
+
+    width = max(len(values) for values in series) or 1
+    data = np.full((len(series), width), np.nan)
+    for row, values in enumerate(series):
+        data[row, : len(values)] = values
+
+    filled = ~np.isnan(data).all(axis=1)
+    stats = np.zeros((len(series), len(STAT_COLUMNS)))
+    if filled.any():
+        data = data[filled]
+        stats[filled, 0] = np.nanmean(data, axis=1)
+        stats[filled, 1] = np.nanmax(data, axis=1)
+        stats[filled, 2] = np.nanmin(data, axis=1)
+        stats[filled, 3:6] = np.nanpercentile(data, [50, 95, 99], axis=1).T
+        stats[filled, 6] = (data < idle_below).sum(axis=1)
+
+    stats = np.round(stats, 2)
+
+    return [[*row[:-1], int(row[-1])] for row in stats.tolist()]
+
+
+def stat_fields(prefix):
+    """
+    Record fields of the statistics of a metric
+    """
+    return [f"{prefix}_{field}" for field in STAT_FIELDS]
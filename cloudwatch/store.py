@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Local metrics store, keeps fetched series between runs
+
+Series are keyed by their scope, the account and region they were fetched in,
+as resource names such as DB instance identifiers repeat across both
+"""
+import os
+import json
+import sqlite3
+import threading
+
+# bump when the tables change, older stores are dropped
+SCHEMA_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    series_id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    series_key TEXT NOT NULL UNIQUE,
+    fetched_until INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS series_scope ON series (scope);
+CREATE TABLE IF NOT EXISTS points (
+    series_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (series_id, ts)
+) WITHOUT ROWID;
+"""
+
+
+def series_key(scope, query):
+    """
+    scope/namespace/metric/dimensions/period/statistic of a GetMetricData query
+    """
+    metric_stat = query["MetricStat"]
+    metric = metric_stat["Metric"]
+    dimensions = sorted(
+        (dimension["Name"], dimension["Value"]) for dimension in metric["Dimensions"]
+    )
+
+    return json.dumps(
+        [
+            scope,
+            metric["Namespace"],
+            metric["MetricName"],
+            dimensions,
+            metric_stat["Period"],
+            metric_stat["Stat"],
+        ]
+    )
+
+
+class MetricStore:
+    """
+    SQLite store of metric series
+    """
+
+    def __init__(self, path):
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.scope = ""
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version != SCHEMA_VERSION:
+            self.connection.executescript(
+                "DROP TABLE IF EXISTS points; DROP TABLE IF EXISTS series; "
+                f"PRAGMA user_version = {SCHEMA_VERSION};"
+            )
+        self.connection.executescript(SCHEMA)
+
+    def fetched_until(self, key):
+        """
+        End of the window already stored for a series
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT fetched_until FROM series WHERE series_key = ?", [key]
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def append(
+        self, scope, key, timestamps, values, fetched_until
+    ):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        """
+        Store new points of a series of a scope
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT INTO series (scope, series_key, fetched_until) "
+                "VALUES (?, ?, ?) "
+                "ON CONFLICT (series_key) DO UPDATE SET fetched_until = ?",
+                [scope, key, fetched_until, fetched_until],
+            )
+            (series_id,) = self.connection.execute(
+                "SELECT series_id FROM series WHERE series_key = ?", [key]
+            ).fetchone()
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO points VALUES (?, ?, ?)",
+                [(series_id, ts, value) for ts, value in zip(timestamps, values)],
+            )
+
+    def values(self, key, start, end):
+        """
+        Stored values of a series within a window
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT value FROM points JOIN series USING (series_id) "
+                "WHERE series_key = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                [key, start, end],
+            ).fetchall()
+
+        return [value for (value,) in rows]
+
+    def prune(self, scope, start):
+        """
+        Drop points of a scope older than its lookback window
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM points WHERE ts < ? AND series_id IN "
+                "(SELECT series_id FROM series WHERE scope = ?)",
+                [start, scope],
+            )
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Thread-safe memoization with in-flight request coalescing
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+LOCK = threading.Lock()
+IN_FLIGHT = {}
+ASYNC_IN_FLIGHT = {}
+
+
+def single_flight(store, key, fetch):
+    """
+    store[key], calling fetch() once when missing; concurrent callers
+    missing on the same key wait for the first one instead of fetching
+    """
+    flight_id = (id(store), key)
+    with LOCK:
+        if key in store:
+            return store[key]
+        future = IN_FLIGHT.get(flight_id)
+        leader = future is None
+        if leader:
+            future = Future()
+            IN_FLIGHT[flight_id] = future
+
+    if not leader:
+        return future.result()
+
+    try:
+        value = fetch()
+    except BaseException as exception:
+        with LOCK:
+            del IN_FLIGHT[flight_id]
+        future.set_exception(exception)
+        raise
+
+    with LOCK:
+        store[key] = value
+        del IN_FLIGHT[flight_id]
+    future.set_result(value)
+
+    return value
+
+
+def store_many(store, values):
+    """
+    Set several keys of a single_flight store at once, e.g. from a bulk fetch
+    """
+    with LOCK:
+        store.update(values)
+
+
+async def async_single_flight(store, key, fetch):
+    """
+    single_flight for coroutines of one event loop, fetch() returns an awaitable
+    """
+    if key in store:
+        return store[key]
+
+    flight_id = (id(store), key)
+    future = ASYNC_IN_FLIGHT.get(flight_id)
+    if future is not None:
+        return await future
+
+    future = asyncio.get_running_loop().create_future()
+    ASYNC_IN_FLIGHT[flight_id] = future
+    try:
+        value = await fetch()
+    except BaseException as exception:
+        del ASYNC_IN_FLIGHT[flight_id]
+        if isinstance(exception, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(exception)
+            # followers re-raise it, nobody waiting is not an error
+            future.exception()
+        raise
+
+    store[key] = value
+    del ASYNC_IN_FLIGHT[flight_id]
+    future.set_result(value)
+
+    return value
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Row records and missing value markers
+
+Scanner rows are NamedTuples, one type per table with its column types, so
+numbers stay numbers and rows carry no per-instance dict. Values that could
+not be determined are Missing markers instead of strings mixed into numeric
+columns
+"""
+
+
+class Missing:
+    """
+    Missing value and the reason it is missing, falsy and printed as the reason
+    """
+
+    __slots__ = ("reason",)
+
+    def __init__(self, reason):
+        self.reason = reason
+
+    def __bool__(self):
+        return False
+
+    def __str__(self):
+        return self.reason
+
+    def __repr__(self):
+        return self.reason
+
+    def __reduce__(self):
+        return missing, (self.reason,)
+
+
+NOT_AVAILABLE = Missing("N/A")
+# no Price List product matched the query
+UNKNOWN = Missing("UNKN")
+# several Price List products matched the query
+MULTIPLE = Missing("MULT")
+MARKERS = {marker.reason: marker for marker in (NOT_AVAILABLE, UNKNOWN, MULTIPLE)}
+
+
+def missing(reason):
+    """
+    Marker of a reason, the shared one when there is one
+    """
+    return MARKERS[reason] if reason in MARKERS else Missing(reason)
+
+
+def is_missing(value):
+    """
+    None or a missing value marker
+    """
+    return value is None or isinstance(value, Missing)
+
+
+def scaled(value, factor, digits=None):
+    """
+    value * factor rounded to digits, a missing value or factor is passed on
+    """
+    for operand in (value, factor):
+        if is_missing(operand):
+            return operand
+
+    product = value * factor
+    return product if digits is None else round(product, digits)
+
+
+def difference(current, future, digits=2):
+    """
+    current - future rounded to digits, a missing value is passed on
+    """
+    for operand in (current, future):
+        if is_missing(operand):
+            return operand
+
+    return round(current - future, digits)
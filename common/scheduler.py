@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Parallel scan scheduler
+
+Scans run on a bounded pool and hand their rows to the consumer through
+bounded queues, the consumer reads scans in submission order while later
+scans keep producing
+"""
+import queue
+import threading
+import multiprocessing
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# rows are handed over in chunks, at most STREAM_CHUNKS chunks per scan wait
+CHUNK_ROWS = 500
+STREAM_CHUNKS = 8
+END = object()
+
+
+class ScanCancelled(Exception):
+    """
+    The consumer stopped reading a scan
+    """
+
+
+def parse_limits(limits):
+    """
+    "ec2=2,rds=1" -> {"ec2": 2, "rds": 1}
+    """
+    parsed = {}
+    for limit in filter(None, (limits or "").split(",")):
+        mode, _, value = limit.partition("=")
+        parsed[mode.strip()] = int(value)
+
+    return parsed
+
+
+def chunks(rows, size=CHUNK_ROWS):
+    """
+    Lists of at most size rows
+    """
+    rows = iter(rows)
+    chunk = list(islice(rows, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, size))
+
+
+class RowStream:
+    """
+    Table head and row chunks of one scan, produced and consumed by
+    different threads
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue(STREAM_CHUNKS)
+        self.started = threading.Event()
+        self.table_head = None
+        self.exception = None
+        self.cancelled = False
+
+    def start(self, table_head):
+        """
+        Scan started, rows follow
+        """
+        self.table_head = table_head
+        self.started.set()
+
+    def put(self, chunk):
+        """
+        Hand over rows, waits while the consumer is behind
+        """
+        while not self.cancelled:
+            try:
+                self.queue.put(chunk, timeout=1)
+                return
+            except queue.Full:
+                continue
+        raise ScanCancelled()
+
+    def offer(self, chunk):
+        """
+        Hand over rows unless the consumer is behind, False when it is
+        """
+        if self.cancelled:
+            raise ScanCancelled()
+        try:
+            self.queue.put_nowait(chunk)
+        except queue.Full:
+            return False
+
+        return True
+
+    def finish(self, exception=None):
+        """
+        Scan over, exception ends it as failed; the end marker still follows
+        """
+        self.exception = exception
+        self.started.set()
+
+    def close(self, exception=None):
+        """
+        No more rows, exception ends the scan as failed
+        """
+        self.finish(exception)
+        try:
+            self.put(END)
+        except ScanCancelled:
+            pass
+
+    def cancel(self):
+        """
+        Stop waiting for the consumer, the producer gives up at its next chunk
+        """
+        self.cancelled = True
+
+    def head(self):
+        """
+        Table head, raises when the scan failed before any row
+        """
+        self.started.wait()
+        if self.table_head is None:
+            raise self.exception
+
+        return self.table_head
+
+    def rows(self):
+        """
+        Rows as they arrive, raises when the scan fails
+        """
+        while True:
+            chunk = self.queue.get()
+            if chunk is END:
+                break
+            yield from chunk
+        if self.exception:
+            raise self.exception
+
+
+def stream_results(jobs, streams):
+    """
+    (job, (table_head, rows), exception) of every stream in submission order
+    """
+    try:
+        for job, stream in zip(jobs, streams):
+            try:
+                yield job, (stream.head(), stream.rows()), None
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                yield job, None, exception
+            # rows left unread are not waited for
+            stream.cancel()
+    finally:
+        for stream in streams:
+            stream.cancel()
+
+
+class OrderedSemaphore:
+    """
+    Semaphore granted in ticket order, a scan never waits on a later one
+    """
+
+    def __init__(self, limit):
+        self.condition = threading.Condition()
+        self.limit = limit
+        self.running = 0
+        self.tickets = 0
+        self.next_ticket = 0
+
+    def ticket(self):
+        """
+        Place in line, taken at submission
+        """
+        with self.condition:
+            self.tickets += 1
+            return self.tickets - 1
+
+    def acquire(self, ticket, stream):
+        """
+        Wait for the turn of ticket and a free slot, False when the stream
+        was cancelled meanwhile
+        """
+        with self.condition:
+            while not (ticket == self.next_ticket and self.running < self.limit):
+                if stream.cancelled:
+                    return False
+                self.condition.wait(timeout=1)
+            self.next_ticket += 1
+            self.running += 1
+            self.condition.notify_all()
+
+        return True
+
+    def release(self):
+        """
+        Free a slot
+        """
+        with self.condition:
+            self.running -= 1
+            self.condition.notify_all()
+
+
+def run_jobs(jobs, max_workers, mode_limits=None):
+    """
+    Run (region, mode, query_func) jobs on a bounded pool, at most
+    mode_limits[mode] at once per mode; yields (job, (table_head, rows),
+    exception) in submission order, rows stream in while later jobs run
+    """
+    semaphores = {
+        mode: OrderedSemaphore(limit) for mode, limit in (mode_limits or {}).items()
+    }
+
+    def run(job, stream, ticket):
+        region, mode, query_func = job
+        semaphore = semaphores.get(mode)
+        if semaphore and not semaphore.acquire(ticket, stream):
+            return
+        try:
+            table_head, rows = query_func(region)
+            stream.start(table_head)
+            for chunk in chunks(rows):
+                stream.put(chunk)
+            stream.close()
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            stream.close(exception)
+        finally:
+            if semaphore:
+                semaphore.release()
+
+    streams = [RowStream() for _ in jobs]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for job, stream in zip(jobs, streams):
+            semaphore = semaphores.get(job[1])
+            executor.submit(run, job, stream, semaphore.ticket() if semaphore else None)
+        try:
+            yield from stream_results(jobs, streams)
+        finally:
+            # scans not started yet are dropped when the consumer stops early
+            executor.shutdown(cancel_futures=True)
+
+
+def run_processes(func, items, max_workers, initializer=None, initargs=()):
+    """
+    func(item) of every item on a spawned process pool, initializer runs
+    once per worker; yields (item, result, exception) in submission order
+    """
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+        initargs=initargs,
+    ) as executor:
+        futures = [executor.submit(func, item) for item in items]
+        for item, future in zip(items, futures):
+            try:
+                yield item, future.result(), None
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                yield item, None, exception
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Row spool files
+
+Account worker processes write the rows of every scan to a spool file as
+they stream in, the parent reads them back a line at a time, so neither
+side holds a whole result set
+"""
+import os
+from common.state import encode_row, decode_values
+
+
+def spool_rows(path, rows):
+    """
+    Write rows to a spool file
+    """
+    with open(path, "w", encoding="utf-8") as spool_file:
+        for row in rows:
+            spool_file.write(encode_row(row) + "\n")
+
+
+def spooled_rows(path, prefix=()):
+    """
+    Rows of a spool file as lists starting with prefix, the file is removed
+    once read
+    """
+    try:
+        with open(path, encoding="utf-8") as spool_file:
+            for line in spool_file:
+                yield [*prefix, *decode_values(line)]
+    finally:
+        os.remove(path)
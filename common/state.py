@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Inventory state of incremental scans
+
+Rows are stored with a fingerprint of the resource attributes they were built
+from; a resource whose fingerprint is unchanged gets its stored row back
+instead of being priced, checked for recommendations and measured again,
+until the row is older than the refresh cadence
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from common.records import Missing, missing
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    resource_key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    row_values TEXT NOT NULL,
+    refreshed_at INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+# resources not refreshed for this long are gone
+RETENTION = 30 * 86400
+STATE = None
+
+
+def load_inventory_state(state_path, refresh_hours=24):
+    """
+    Serve unchanged resources from a local state store
+    """
+    global STATE  # pylint: disable=global-statement
+
+    STATE = InventoryState(state_path, refresh_hours)
+
+    return STATE
+
+
+def use_state_scope(scope):
+    """
+    Resources stored afterwards belong to scope, e.g. an account
+    """
+    if STATE:
+        STATE.scope = scope
+
+
+def fingerprint(attributes):
+    """
+    Digest of the attributes a row is built from
+    """
+    encoded = json.dumps(attributes, default=str, sort_keys=True)
+
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def encode_row(row):
+    """
+    Row as JSON, missing value markers as {"missing": reason}
+    """
+    return json.dumps(
+        [
+            {"missing": value.reason} if isinstance(value, Missing) else value
+            for value in row
+        ]
+    )
+
+
+def decode_values(encoded):
+    """
+    Values of encode_row() JSON
+    """
+    return [
+        missing(value["missing"]) if isinstance(value, dict) else value
+        for value in json.loads(encoded)
+    ]
+
+
+def decode_row(record_type, encoded):
+    """
+    Row record of encode_row() JSON
+    """
+    return record_type(*decode_values(encoded))
+
+
+class InventoryState:
+    """
+    SQLite store of the last row built for every resource
+    """
+
+    def __init__(self, path, refresh_hours=24):
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.refresh = refresh_hours * 3600
+        self.scope = ""
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM resources WHERE refreshed_at < ?",
+                [int(time.time()) - max(RETENTION, 2 * self.refresh)],
+            )
+
+    def rows(self, keys):
+        """
+        {key: (fingerprint, encoded row, refreshed at)} of stored resources
+        """
+        with self.lock:
+            found = self.connection.execute(
+                "SELECT resource_key, fingerprint, row_values, refreshed_at "
+                "FROM resources WHERE resource_key IN "
+                f"({', '.join('?' * len(keys))})",
+                keys,
+            ).fetchall()
+
+        return {key: stored for key, *stored in found}
+
+    def store(self, resources):
+        """
+        Store (key, fingerprint, row) resources refreshed now
+        """
+        now = int(time.time())
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?)",
+                [
+                    (key, resource_fingerprint, encode_row(row), now)
+                    for key, resource_fingerprint, row in resources
+                ],
+            )
+
+
+class StateBatch:
+    """
+    Resources of a scanner page, rows of unchanged resources come from the
+    state and the rows built instead are stored once the page is complete
+    """
+
+    def __init__(self, kind, region, record_type):
+        self.prefix = f"{STATE.scope if STATE else ''}|{kind}|{region}|"
+        self.record_type = record_type
+        self.fingerprints = {}
+        self.stored = {}
+        self.built = {}
+
+    def load(self, resources):
+        """
+        Look up (resource id, attributes) of a page at once
+        """
+        if not STATE:
+            return
+
+        for resource_id, attributes in resources:
+            self.fingerprints[resource_id] = fingerprint(attributes)
+        # SQLite caps the variables of a statement
+        resource_ids = list(self.fingerprints)
+        for offset in range(0, len(resource_ids), 500):
+            keys = [self.prefix + key for key in resource_ids[offset : offset + 500]]
+            for key, stored in STATE.rows(keys).items():
+                self.stored[key[len(self.prefix) :]] = stored
+
+    def row(self, resource_id):
+        """
+        Stored row of an unchanged resource refreshed within the cadence,
+        None when the row has to be built
+        """
+        stored = self.stored.get(resource_id)
+        if not stored:
+            return None
+
+        stored_fingerprint, encoded, refreshed_at = stored
+        if stored_fingerprint != self.fingerprints[resource_id]:
+            return None
+        if time.time() - refreshed_at >= STATE.refresh:
+            return None
+
+        return decode_row(self.record_type, encoded)
+
+    def add(self, resource_id, row_index):
+        """
+        Row built for a resource, stored by save()
+        """
+        if STATE:
+            self.built[resource_id] = row_index
+
+    def save(self, table_data):
+        """
+        Store the rows built for the page
+        """
+        if not STATE or not self.built:
+            return
+
+        STATE.store(
+            (
+                self.prefix + resource_id,
+                self.fingerprints[resource_id],
+                table_data[index],
+            )
+            for resource_id, index in self.built.items()
+        )
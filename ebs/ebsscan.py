@@ -2,140 +2,258 @@
 """
 EBS scanner
 """
+from typing import NamedTuple
 from datetime import datetime
-import boto3
 from pricing.price import get_ebs_price, get_snapshot_price
+from aws.clients import get_client
+from common.records import NOT_AVAILABLE, is_missing, scaled, difference
+from common.state import StateBatch
 
-SESSION = boto3.Session()
 EBS_PRICE_MAP = {}
 SNAPSHOT_PRICE_MAP = {}
+VOLUME_TABLE_HEAD = [
+    "VolumeId",
+    "Created",
+    "Status",
+    "Attachment",
+    "Size",
+    "Type",
+    "Cost",
+    "Future cost",
+    "Saving",
+]
+SNAPSHOT_TABLE_HEAD = [
+    "SnapshotId",
+    "Description (crop 100)",
+    "Volume size",
+    "Snapshot size *",
+    "State",
+    "Start time",
+    "Tier",
+    "Cost/GB",
+    "Cost/Month",
+]
+VolumeRow = NamedTuple(
+    "VolumeRow",
+    [
+        ("volume_id", str),
+        ("created", str),
+        ("status", str),
+        ("attachment", str),
+        ("size", int),
+        ("volume_type", str),
+        ("cost", float),
+        ("future_cost", float),
+        ("saving", float),
+    ],
+)
+SnapshotRow = NamedTuple(
+    "SnapshotRow",
+    [
+        ("snapshot_id", str),
+        ("description", str),
+        ("volume_size", int),
+        ("snapshot_size", int),
+        ("state", str),
+        ("start_time", str),
+        ("tier", str),
+        ("gb_cost", float),
+        ("monthly_cost", float),
+    ],
+)
+
+
+def volume_attributes(volume):
+    """
+    EBS volume attributes a row is built from
+    """
+    return [
+        volume["Size"],
+        volume["VolumeType"],
+        volume["State"],
+        volume["CreateTime"],
+        [attachment.get("InstanceId") for attachment in volume.get("Attachments", [])],
+    ]
+
+
+def volume_state(region, volumes):
+    """
+    Stored rows of a page of volumes
+    """
+    state_batch = StateBatch("ebs", region, VolumeRow)
+    state_batch.load(
+        (volume["VolumeId"], volume_attributes(volume)) for volume in volumes
+    )
+
+    return state_batch
+
+
+def volume_rows(region, volumes, state_batch):
+    """
+    EBS volume rows, unchanged volumes come from state_batch
+    """
+    table_data = []
+
+    for volume in volumes:
+        stored_row = state_batch.row(volume["VolumeId"])
+        if stored_row:
+            table_data.append(stored_row)
+            continue
+
+        volume_size = volume["Size"]
+        volume_type = volume["VolumeType"]
+        volume_attachment = volume.get("Attachments")
+        ec2_attachment = NOT_AVAILABLE
+        if volume_attachment:
+            ec2_attachment = volume_attachment[0].get("InstanceId") or NOT_AVAILABLE
+
+        current_cost = scaled(
+            get_ebs_price(EBS_PRICE_MAP, volume_type, region), volume_size, 3
+        )
+        future_cost = saving = NOT_AVAILABLE
+        if not ec2_attachment:
+            saving = current_cost
+        elif volume_type == "gp2":
+            future_cost = scaled(
+                get_ebs_price(EBS_PRICE_MAP, "gp3", region), volume_size, 3
+            )
+            saving = difference(current_cost, future_cost)
+
+        state_batch.add(volume["VolumeId"], len(table_data))
+        table_data.append(
+            VolumeRow(
+                volume["VolumeId"],
+                volume["CreateTime"].strftime("%Y-%m-%d"),
+                volume["State"],
+                ec2_attachment,
+                volume_size,
+                volume_type,
+                current_cost,
+                future_cost,
+                saving,
+            )
+        )
+
+    return table_data
 
 
 def query_ebs(region):
     """
     EBS entry point
     """
-    # pylint: disable=too-many-locals,too-many-branches
     print(f"\n\n✨  Running in EBS volume mode {region}")
 
-    client = SESSION.client("ec2", region_name=region)
+    client = get_client("ec2", region)
     paginator = client.get_paginator("describe_volumes")
     page_iterator = paginator.paginate()
 
-    table_head = [
-        "VolumeId",
-        "Created",
-        "Status",
-        "Attachment",
-        "Size",
-        "Type",
-        "Cost",
-        "Future cost",
-        "Saving",
+    return VOLUME_TABLE_HEAD, volume_page_rows(region, page_iterator)
+
+
+def volume_page_rows(region, page_iterator):
+    """
+    Rows of every describe_volumes page
+    """
+    for page in page_iterator:
+        volumes = page["Volumes"]
+        state_batch = volume_state(region, volumes)
+        table_data = volume_rows(region, volumes, state_batch)
+        state_batch.save(table_data)
+        yield from table_data
+
+
+def snapshot_attributes(snapshot):
+    """
+    EBS snapshot attributes a row is built from
+    """
+    return [
+        snapshot.get("Description"),
+        snapshot.get("VolumeSize"),
+        snapshot.get("FullSnapshotSizeInBytes"),
+        snapshot["State"],
+        snapshot["StartTime"],
+        snapshot.get("StorageTier"),
     ]
+
+
+def snapshot_state(region, snapshots):
+    """
+    Stored rows of a page of snapshots
+    """
+    state_batch = StateBatch("snapshot", region, SnapshotRow)
+    state_batch.load(
+        (snapshot["SnapshotId"], snapshot_attributes(snapshot))
+        for snapshot in snapshots
+    )
+
+    return state_batch
+
+
+def snapshot_rows(region, snapshots, state_batch):
+    """
+    EBS snapshot rows, unchanged snapshots come from state_batch
+    """
     table_data = []
 
-    for page in page_iterator:
-        for volume in page["Volumes"]:
-            volume_id = volume["VolumeId"]
-            volume_size = volume["Size"]
-            volume_state = volume["State"]
-            volume_date = volume["CreateTime"].strftime("%Y-%m-%d")
-            volume_type = volume["VolumeType"]
-            volume_attachment = volume.get("Attachments")
-            ec2_attachment = None
-            if volume_attachment:
-                ec2_attachment = volume_attachment[0].get("InstanceId")
-
-            volume_data = [
-                volume_id,
-                volume_date,
-                volume_state,
-                ec2_attachment,
-                volume_size,
-                volume_type,
-            ]
+    for snapshot in snapshots:
+        stored_row = state_batch.row(snapshot["SnapshotId"])
+        if stored_row:
+            table_data.append(stored_row)
+            continue
+
+        snapshot_description = snapshot.get("Description")
+        snapshot_tier = snapshot.get("StorageTier", NOT_AVAILABLE)
+        snapshot_size_gb = scaled(
+            snapshot.get("FullSnapshotSizeInBytes", NOT_AVAILABLE), 1 / 1073741824
+        )
+
+        snapshot_cost, snapshot_price = get_snapshot_price(
+            SNAPSHOT_PRICE_MAP, snapshot_tier, snapshot_size_gb, region
+        )
 
-            current_cost = round(
-                get_ebs_price(EBS_PRICE_MAP, volume_type, region) * volume_size, 3
+        state_batch.add(snapshot["SnapshotId"], len(table_data))
+        table_data.append(
+            SnapshotRow(
+                snapshot["SnapshotId"],
+                (snapshot_description[:100] if snapshot_description else NOT_AVAILABLE),
+                snapshot.get("VolumeSize", NOT_AVAILABLE),
+                (
+                    snapshot_size_gb
+                    if is_missing(snapshot_size_gb)
+                    else int(snapshot_size_gb)
+                ),
+                snapshot["State"],
+                datetime.strftime(snapshot["StartTime"], "%Y-%m-%d"),
+                snapshot_tier,
+                snapshot_cost,
+                snapshot_price,
             )
-            if ec2_attachment:
-                if volume_type == "gp2":
-                    future_cost = round(
-                        get_ebs_price(EBS_PRICE_MAP, "gp3", region) * volume_size, 3
-                    )
-                    if isinstance(current_cost, str) and isinstance(future_cost, str):
-                        saving = "N/A"
-                    else:
-                        saving = round((current_cost - future_cost), 2)
-                    volume_data.append(current_cost)
-                    volume_data.append(future_cost)
-                    volume_data.append(saving)
-                else:
-                    volume_data.append(current_cost)
-            else:
-                volume_data.append(current_cost)
-                volume_data.append(None)
-                volume_data.append(current_cost)
-
-            table_data.append(volume_data)
-
-    return table_head, table_data
+        )
+
+    return table_data
 
 
 def query_ebs_snapshots(region):
     """
     EBS snapshot entrypoint
     """
-    # pylint: disable=too-many-locals,too-many-branches
     print(f"\n\n✨  Running in EBS snapshot mode {region}")
 
-    ec2_client = SESSION.client("ec2", region_name=region)
-    account_id = SESSION.client("sts").get_caller_identity().get("Account")
+    ec2_client = get_client("ec2", region)
+    account_id = get_client("sts").get_caller_identity().get("Account")
     paginator = ec2_client.get_paginator("describe_snapshots")
     page_iterator = paginator.paginate(OwnerIds=[account_id])
 
-    table_head = [
-        "SnapshotId",
-        "Description (crop 100)",
-        "Volume size",
-        "Snapshot size *",
-        "State",
-        "Start time",
-        "Tier",
-        "Cost/GB",
-        "Cost/Month",
-    ]
-    table_data = []
-
-    for page in page_iterator:
-        for snapshot in page["Snapshots"]:
-            snapshot_id = snapshot["SnapshotId"]
-            snapshot_description = snapshot.get("Description", "N/A")
-            volume_size = snapshot.get("VolumeSize", "N/A")
-            snapshot_size = round(snapshot.get("FullSnapshotSizeInBytes", "N/A"))
-            snapshot_state = snapshot["State"]
-            snapshot_start_time = datetime.strftime(snapshot["StartTime"], "%Y-%m-%d")
-            snapshot_tier = snapshot.get("StorageTier", "N/A")
-            snapshot_size_gb = (
-                snapshot_size / 1073741824 if snapshot_size != "N/A" else "N/A"
-            )
-
-            snapshot_cost, snapshot_price = get_snapshot_price(
-                SNAPSHOT_PRICE_MAP, snapshot_tier, snapshot_size_gb, region
-            )
+    return SNAPSHOT_TABLE_HEAD, snapshot_page_rows(region, page_iterator)
 
-            snapshot_data = [
-                snapshot_id,
-                snapshot_description[:100],
-                volume_size,
-                int(snapshot_size_gb),
-                snapshot_state,
-                snapshot_start_time,
-                snapshot_tier,
-                snapshot_cost,
-                round(snapshot_price, 2),
-            ]
-            table_data.append(snapshot_data)
 
-    return table_head, table_data
+def snapshot_page_rows(region, page_iterator):
+    """
+    Rows of every describe_snapshots page
+    """
+    for page in page_iterator:
+        snapshots = page["Snapshots"]
+        state_batch = snapshot_state(region, snapshots)
+        table_data = snapshot_rows(region, snapshots, state_batch)
+        state_batch.save(table_data)
+        yield from table_data
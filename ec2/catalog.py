@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+EC2 instance type catalog
+
+One paginated describe_instance_types sweep per region, kept on disk, tells
+which instance types a region offers and their shape
+"""
+import os
+import json
+import time
+from common.memo import single_flight
+
+# bump when the catalog entry format changes, older files are swept again
+CATALOG_VERSION = 2
+CATALOG_DIR = "~/.cache/costs-optimizer/instance-types"
+TTL_HOURS = 168
+CATALOGS = {}
+
+
+def configure_catalog(catalog_dir=CATALOG_DIR, ttl_hours=168):
+    """
+    Directory catalogs are kept in, empty to sweep every run, and their TTL
+    """
+    global CATALOG_DIR, TTL_HOURS  # pylint: disable=global-statement
+
+    CATALOG_DIR = catalog_dir
+    TTL_HOURS = ttl_hours
+
+
+def type_spec(instance_type):
+    """
+    Catalog entry of a describe_instance_types item
+    """
+    return {
+        "vcpus": instance_type["VCpuInfo"]["DefaultVCpus"],
+        "memory": instance_type["MemoryInfo"]["SizeInMiB"],
+        "architectures": instance_type["ProcessorInfo"]["SupportedArchitectures"],
+        "network": instance_type.get("NetworkInfo", {}).get("NetworkPerformance"),
+        "current_generation": instance_type.get("CurrentGeneration", False),
+        "burstable": instance_type.get("BurstablePerformanceSupported", False),
+    }
+
+
+def type_shape(entry):
+    """
+    (vcpus, memory, burstable) of a catalog entry, None for unknown types
+    """
+    if not entry:
+        return None
+
+    return entry["vcpus"], entry["memory"], entry["burstable"]
+
+
+def build_catalog(instance_types):
+    """
+    {instance type: entry} of describe_instance_types items
+    """
+    return {
+        instance_type["InstanceType"]: type_spec(instance_type)
+        for instance_type in instance_types
+    }
+
+
+def catalog_path(region):
+    """
+    On-disk catalog of a region
+    """
+    return os.path.join(os.path.expanduser(CATALOG_DIR), f"{region}.json")
+
+
+def read_catalog(region):
+    """
+    Catalog of a region on disk, None when missing, expired or of another version
+    """
+    if not CATALOG_DIR or not os.path.exists(catalog_path(region)):
+        return None
+    try:
+        with open(catalog_path(region), encoding="utf-8") as catalog_file:
+            content = json.load(catalog_file)
+    except (OSError, ValueError):
+        return None
+    if content.get("version") != CATALOG_VERSION:
+        return None
+    if time.time() - content.get("fetched_at", 0) >= TTL_HOURS * 3600:
+        return None
+
+    return content.get("types")
+
+
+def write_catalog(region, catalog):
+    """
+    Keep the catalog of a region on disk
+    """
+    if not CATALOG_DIR:
+        return
+
+    path = catalog_path(region)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as catalog_file:
+        json.dump(
+            {"version": CATALOG_VERSION, "fetched_at": time.time(), "types": catalog},
+            catalog_file,
+        )
+    os.replace(temp_path, path)
+
+
+def instance_catalog(client):
+    """
+    Instance type catalog of the region of an EC2 client
+    """
+    region = client.meta.region_name
+
+    def load():
+        catalog = read_catalog(region)
+        if catalog is None:
+            paginator = client.get_paginator("describe_instance_types")
+            catalog = build_catalog(
+                instance_type
+                for page in paginator.paginate(PaginationConfig={"PageSize": 100})
+                for instance_type in page["InstanceTypes"]
+            )
+            write_catalog(region, catalog)
+        return catalog
+
+    return single_flight(CATALOGS, region, load)
@@ -3,231 +3,309 @@
 EC2 scanner
 """
 import re
+from typing import NamedTuple
 from datetime import datetime, timedelta
-import boto3
-from botocore.exceptions import ClientError
-from pricing.price import get_ec2_price
+from pricing.price import (
+    get_ec2_price,
+    prefetch_ec2_prices,
+    prefetched_price,
+    ec2_cost_id,
+)
+from aws.clients import get_client
+from common.memo import single_flight
+from common.records import Missing, NOT_AVAILABLE
+from common.state import StateBatch
+from cloudwatch.metrics import MetricBatch
+from cloudwatch.stats import series_stats, stat_fields, STAT_COLUMNS, STAT_TYPES
+from ec2.catalog import instance_catalog, type_shape
+from rightsizing.engine import CandidateTable, SizingBatch
 
-SESSION = boto3.Session()
-AVAILABLE_INSTANCE_TYPES = set()
 INSTANCE_PRICE_MAP = {}
+CANDIDATE_TABLES = {}
+IDLE_CPU = 5
 END_TIME = datetime.now()
 START_TIME = END_TIME - timedelta(days=30)
+TABLE_HEAD = [
+    "InstanceId",
+    "Name (crop 20)",
+    "OS",
+    "Started",
+    "Monitoring",
+    "Type",
+    "Price",
+    "Type x86",
+    "Price x86",
+    "Saving x86",
+    "Type arm",
+    "Price arm",
+    "Saving arm",
+    "State",
+    *[f"30 days CPU {column}" for column in STAT_COLUMNS],
+]
+CPU_FIELDS = stat_fields("cpu")
+Ec2Row = NamedTuple(
+    "Ec2Row",
+    [
+        ("instance_id", str),
+        ("name", str),
+        ("os", str),
+        ("started", str),
+        ("monitoring", str),
+        ("instance_type", str),
+        ("price", float),
+        ("x86_type", str),
+        ("x86_price", float),
+        ("x86_saving", float),
+        ("arm_type", str),
+        ("arm_price", float),
+        ("arm_saving", float),
+        ("state", str),
+        *zip(CPU_FIELDS, STAT_TYPES),
+    ],
+)
+NO_GRAVITON = Missing("no Graviton for Windows")
+ARCHITECTURES = {"x86": "x86_64", "arm": "arm64"}
 
 
 def check_instance_name(instance):
     """
     EC2 name
     """
-    instance_name = "N/A"
+    instance_name = NOT_AVAILABLE
     instance_tags = instance.get("Tags")
     if instance_tags:
         for tag in instance_tags:
             if tag["Key"] == "Name":
-                instance_name = tag.get("Value")
+                instance_name = tag.get("Value") or NOT_AVAILABLE
 
     return instance_name
 
 
-def check_instance_type(client, recommended_instance):
+def type_architecture(entry):
     """
-    EC2 type existence
+    x86/arm of a catalog entry, None for other architectures such as Mac
     """
-    result = False
+    for mode, architecture in ARCHITECTURES.items():
+        if architecture in entry["architectures"]:
+            return mode
 
-    if recommended_instance not in AVAILABLE_INSTANCE_TYPES:
-        try:
-            result = client.describe_instance_types(
-                InstanceTypes=[recommended_instance]
+    return None
+
+
+def candidate_table(ec2_client, region, instance_os):
+    """
+    Current generation types of a region priced for an OS
+    """
+
+    def build():
+        prefetch_ec2_prices(INSTANCE_PRICE_MAP, region)
+        return CandidateTable(
+            (
+                instance_type,
+                entry["vcpus"],
+                entry["memory"],
+                type_architecture(entry),
+                entry["burstable"],
+                prefetched_price(
+                    INSTANCE_PRICE_MAP,
+                    "ec2",
+                    ec2_cost_id(region, instance_type, instance_os),
+                ),
             )
-        except ClientError as exception:
-            if exception.response["Error"]["Code"] == "InvalidInstanceType":
-                pass
-            else:
-                raise
-    else:
-        result = True
-
-    return result
-
-
-def check_recommendation(client, instance_kind, mode):
-    """
-    EC2 recommendation check
-    """
-    instance_class = instance_kind.split(".")[0]
-    instance_size = instance_kind.split(".")[1]
-    instance_type = instance_class[0]
-    instance_generation = instance_class[1]
-    instance_recommendation = False
-
-    if re.match("^t", instance_type):
-        if instance_generation in ["2", "3"]:
-            recommended_instance = instance_type
-            if mode == "arm":
-                recommended_instance += f"4g.{instance_size}"
-            else:
-                recommended_instance += f"3a.{instance_size}"
-            if check_instance_type(client, recommended_instance):
-                AVAILABLE_INSTANCE_TYPES.add(recommended_instance)
-                instance_recommendation = recommended_instance
-
-    elif re.match("^c|^m|^r", instance_type):
-        if re.match("2|3|4|5|6|7", instance_generation):
-            recommended_instance = instance_type
-            if mode == "arm":
-                recommended_instance += f"6g.{instance_size}"
-            else:
-                recommended_instance += f"6a.{instance_size}"
-            if (
-                check_instance_type(client, recommended_instance)
-                and recommended_instance != instance_kind
-            ):
-                AVAILABLE_INSTANCE_TYPES.add(recommended_instance)
-                instance_recommendation = recommended_instance
-
-    if instance_recommendation == instance_kind:
-        return "N/A"
-
-    return instance_recommendation
-
-
-def check_ec2_utilization(cloudwatch_client, instance_id):
-    """
-    EC2 utilization check
-    """
-    response = cloudwatch_client.get_metric_statistics(
-        Namespace="AWS/EC2",
-        MetricName="CPUUtilization",
-        Dimensions=[
-            {"Name": "InstanceId", "Value": instance_id},
-        ],
-        StartTime=START_TIME,
-        EndTime=END_TIME,
-        Period=3600,
-        Statistics=["Average"],
-    )
+            for instance_type, entry in instance_catalog(ec2_client).items()
+            if entry["current_generation"] and type_architecture(entry)
+        )
+
+    return single_flight(CANDIDATE_TABLES, (region, instance_os), build)
+
+
+def instance_platform(instance):
+    """
+    EC2 OS as named by the Price List
+    """
+    instance_os = instance["PlatformDetails"]
+    if instance_os == "Linux/UNIX":
+        instance_os = "Linux"
 
-    data_points = response["Datapoints"]
-    total_usage = sum(data_point["Average"] for data_point in data_points)
-    if len(data_points):
-        average_usage = total_usage / len(data_points)
-        max_usage = max(data_point["Average"] for data_point in data_points)
-        min_usage = min(data_point["Average"] for data_point in data_points)
-    else:
-        average_usage = 0
-        max_usage = 0
-        min_usage = 0
+    return instance_os
 
-    return f"AVG: {round(average_usage, 2)}, MAX: {round(max_usage, 2)}, MIN: {round(min_usage, 2)}"
+
+def page_instances(page):
+    """
+    Instances of a describe_instances page
+    """
+    for reservation in page["Reservations"]:
+        yield from reservation["Instances"]
 
 
-def check_replacement(ec2_client, instance_data, instance_config_map, instance_arch):
+def instance_attributes(instance):
     """
-    EC2 replacement check
+    EC2 attributes a row is built from
     """
-    instance_kind = instance_config_map["instance_kind"]
-    instance_os = instance_config_map["instance_os"]
-    region = instance_config_map["instance_region"]
-    current_node_price = instance_config_map["instance_price"]
+    return [
+        instance["InstanceType"],
+        instance.get("PlatformDetails"),
+        instance["State"]["Name"],
+        instance.get("StateTransitionReason"),
+        instance.get("Tags"),
+        instance["Monitoring"]["State"],
+        instance["LaunchTime"],
+    ]
+
 
-    instance_replacement = check_recommendation(
-        ec2_client, instance_kind, instance_arch
+def ec2_state(region, instances):
+    """
+    Stored rows of a page of instances
+    """
+    state_batch = StateBatch("ec2", region, Ec2Row)
+    state_batch.load(
+        (instance["InstanceId"], instance_attributes(instance))
+        for instance in instances
     )
-    if instance_replacement:
-        if instance_os == "Windows" and instance_arch == "arm":
-            instance_data.append("no Graviton for Windows")
+
+    return state_batch
+
+
+def ec2_rows(
+    region, ec2_client, instances, metric_batch, state_batch, sizing_batch
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    EC2 rows and {instance id: row index} of running instances, whose CPU
+    series are added to metric_batch and which are right-sized by
+    sizing_batch; unchanged instances come from state_batch
+    """
+    catalog = instance_catalog(ec2_client)
+    table_data = []
+    running_instances = {}
+
+    for instance in instances:
+        instance_id = instance["InstanceId"]
+        stored_row = state_batch.row(instance_id)
+        if stored_row:
+            table_data.append(stored_row)
+            continue
+
+        instance_name = check_instance_name(instance)
+        print(f"Processing {instance_id}")
+
+        instance_state = instance["State"]["Name"]
+        instance_kind = instance["InstanceType"]
+        instance_os = instance_platform(instance)
+        instance_date = datetime.strftime(instance["LaunchTime"], "%Y-%m-%d")
+        instance_monitoring = instance["Monitoring"]["State"]
+
+        current_node_price = get_ec2_price(
+            INSTANCE_PRICE_MAP, instance_kind, instance_os, region
+        )
+        if instance_state == "running":
+            metric_batch.add(
+                instance_id,
+                "AWS/EC2",
+                "CPUUtilization",
+                [{"Name": "InstanceId", "Value": instance_id}],
+                "Average",
+            )
+            running_instances[instance_id] = len(table_data)
         else:
-            future_node_price = get_ec2_price(
-                INSTANCE_PRICE_MAP, instance_replacement, instance_os, region
+            stopped_reason = instance["StateTransitionReason"]
+            stopped_time = re.findall("[0-9]{4}-[0-9]{2}-[0-9]{2}", stopped_reason)
+            instance_state = f"stopped: {stopped_time}"
+
+        sizing_batch.add(
+            instance_os,
+            len(table_data),
+            instance_kind,
+            type_shape(catalog.get(instance_kind)),
+            current_node_price,
+        )
+        state_batch.add(instance_id, len(table_data))
+        table_data.append(
+            Ec2Row(
+                instance_id,
+                instance_name[:20] if instance_name else instance_name,
+                instance_os[:10],  # here could be some exotic OS'
+                instance_date,
+                instance_monitoring,
+                instance_kind,
+                current_node_price,
+                *[NOT_AVAILABLE] * 6,
+                instance_state,
+                *[NOT_AVAILABLE] * len(CPU_FIELDS),
+            )
+        )
+
+    return table_data, running_instances
+
+
+def apply_ec2_metrics(metrics, table_data, running_instances, sizing_batch):
+    """
+    CPU statistics of running instances, their peaks are handed to sizing_batch
+    """
+    stats = series_stats(
+        [metrics[instance_id]["CPUUtilization"] for instance_id in running_instances],
+        IDLE_CPU,
+    )
+    for (instance_id, row_index), instance_stats in zip(
+        running_instances.items(), stats
+    ):
+        table_data[row_index] = table_data[row_index]._replace(
+            **dict(zip(CPU_FIELDS, instance_stats))
+        )
+        if metrics[instance_id]["CPUUtilization"]:
+            sizing_batch.peak(row_index, table_data[row_index].cpu_max)
+
+
+def apply_ec2_rightsizing(region, ec2_client, table_data, sizing_batch):
+    """
+    Cheapest x86 and arm candidates of the rows of a page
+    """
+
+    def table(instance_os):
+        return candidate_table(ec2_client, region, instance_os)
+
+    for mode in ARCHITECTURES:
+        fields = [f"{mode}_type", f"{mode}_price", f"{mode}_saving"]
+        for row_index, replacement in sizing_batch.recommend(table, mode).items():
+            if mode == "arm" and table_data[row_index].os == "Windows":
+                replacement = (NO_GRAVITON, NOT_AVAILABLE, NOT_AVAILABLE)
+            table_data[row_index] = table_data[row_index]._replace(
+                **dict(zip(fields, replacement))
             )
-            if isinstance(current_node_price, str) or isinstance(
-                future_node_price, str
-            ):
-                instance_data.append("N/A")
-            else:
-                saving = round((current_node_price - future_node_price), 2)
-                instance_data.append(
-                    f"{instance_replacement} {future_node_price} (save:{saving})"
-                )
-    else:
-        instance_data.append("N/A")
 
 
 def query_ec2(region):
     """
     EC2 entrypoint
     """
-    # pylint: disable=too-many-locals,too-many-branches
     print(f"\n\n✨  Running in EC2 instance mode {region}")
+    prefetch_ec2_prices(INSTANCE_PRICE_MAP, region)
 
-    ec2_client = SESSION.client("ec2", region_name=region)
+    ec2_client = get_client("ec2", region)
     paginator = ec2_client.get_paginator("describe_instances")
     page_iterator = paginator.paginate()
 
-    table_head = [
-        "InstanceId",
-        "Name (crop 20)",
-        "OS",
-        "Started",
-        "Monitoring",
-        "Current",
-        "Future x86",
-        "Future arm",
-        "30 days load",
-    ]
-    table_data = []
+    return TABLE_HEAD, ec2_page_rows(region, ec2_client, page_iterator)
+
 
+def ec2_page_rows(region, ec2_client, page_iterator):
+    """
+    Rows of every describe_instances page, yielded once its metrics are in
+    """
+    cloudwatch_client = get_client("cloudwatch", region)
     for page in page_iterator:
-        for reservation in page["Reservations"]:
-            for instance in reservation["Instances"]:
-                instance_id = instance["InstanceId"]
-                instance_name = check_instance_name(instance)
-                print(f"Processing {instance_id}")
-
-                instance_state = instance["State"]["Name"]
-                instance_kind = instance["InstanceType"]
-                instance_os = instance["PlatformDetails"]
-                instance_date = datetime.strftime(instance["LaunchTime"], "%Y-%m-%d")
-                if instance_os == "Linux/UNIX":
-                    instance_os = "Linux"
-                instance_monitoring = instance["Monitoring"]["State"]
-
-                current_node_price = get_ec2_price(
-                    INSTANCE_PRICE_MAP, instance_kind, instance_os, region
-                )
-                instance_data = [
-                    instance_id,
-                    instance_name[:20],
-                    instance_os[:10],  # here could be some exotic OS'
-                    instance_date,
-                    instance_monitoring,
-                    f"{instance_kind} {current_node_price}",
-                ]
-
-                instance_config_map = {
-                    "instance_kind": instance_kind,
-                    "instance_data": instance_data,
-                    "instance_os": instance_os,
-                    "instance_region": region,
-                    "instance_price": current_node_price,
-                }
-
-                check_replacement(ec2_client, instance_data, instance_config_map, "x86")
-                check_replacement(ec2_client, instance_data, instance_config_map, "arm")
-
-                cloudwatch_client = SESSION.client("cloudwatch", region_name=region)
-                if instance_state == "running":
-                    instance_data.append(
-                        check_ec2_utilization(cloudwatch_client, instance_id)
-                    )
-                else:
-                    stopped_reason = instance["StateTransitionReason"]
-                    stopped_time = re.findall(
-                        "[0-9]{4}-[0-9]{2}-[0-9]{2}", stopped_reason
-                    )
-                    instance_data.append(f"stopped: {stopped_time}")
-
-                table_data.append(instance_data)
-
-    return table_head, table_data
+        instances = list(page_instances(page))
+        state_batch = ec2_state(region, instances)
+        metric_batch = MetricBatch(region, START_TIME, END_TIME)
+        sizing_batch = SizingBatch()
+        table_data, running_instances = ec2_rows(
+            region, ec2_client, instances, metric_batch, state_batch, sizing_batch
+        )
+        apply_ec2_metrics(
+            metric_batch.fetch(cloudwatch_client),
+            table_data,
+            running_instances,
+            sizing_batch,
+        )
+        apply_ec2_rightsizing(region, ec2_client, table_data, sizing_batch)
+        state_batch.save(table_data)
+        yield from table_data
@@ -2,49 +2,111 @@
 """
 ECR Images scanner
 """
+from typing import NamedTuple
 from datetime import datetime, timezone, timedelta
-import boto3
+from concurrent.futures import ThreadPoolExecutor
+from aws.clients import get_client
+from common.records import NOT_AVAILABLE
 
+REPOSITORY_WORKERS = 8
+TAG_STATUS = None
+MIN_AGE_DAYS = None
 
-SESSION = boto3.Session()
+TABLE_HEAD = [
+    "Repo name",
+    "Image digest",
+    "Image tags",
+    "Image pushed at",
+    "Image last pulled",
+    "MB",
+]
+ImageRow = NamedTuple(
+    "ImageRow",
+    [
+        ("repository", str),
+        ("digest", str),
+        ("tags", str),
+        ("pushed_at", str),
+        ("last_pulled", str),
+        ("size_mb", int),
+    ],
+)
 
 
-def process_repository(ecr_client, repo_name, table_data):
-    # pylint: disable=too-many-locals,too-many-branches
+def configure_ecr(repository_workers=8, tag_status=None, min_age_days=None):
     """
-    Process a repository and get vulnerability findings for the most recent image
+    Repositories listed at once, server-side tagStatus filter and a
+    minimum age of the images reported
+    """
+    global REPOSITORY_WORKERS, TAG_STATUS, MIN_AGE_DAYS  # pylint: disable=global-statement
+
+    REPOSITORY_WORKERS = repository_workers
+    TAG_STATUS = tag_status
+    MIN_AGE_DAYS = min_age_days
+
+
+def image_filter():
+    """
+    describe_images filter parameters
+    """
+    if TAG_STATUS:
+        return {"filter": {"tagStatus": TAG_STATUS}}
+
+    return {}
+
+
+def image_rows(repo_name, images):
+    """
+    Rows of images not pulled within six months
+    """
+    table_data = []
+    now = datetime.now(timezone.utc)
+    six_month_ago = now - timedelta(days=180)
+    pushed_before = now - timedelta(days=MIN_AGE_DAYS) if MIN_AGE_DAYS else None
+
+    for image in images:
+        image_digest = image.get("imageDigest")
+        image_tags = image.get("imageTags", [])
+        image_pushed_at = image.get("imagePushedAt")
+        image_last_pulled = image.get("lastRecordedPullTime")
+        image_size_in_bytes = image.get("imageSizeInBytes")
+        if image_size_in_bytes:
+            image_size_in_megabytes = int(image_size_in_bytes / (1000 * 1000))
+        else:
+            image_size_in_megabytes = NOT_AVAILABLE
+
+        if pushed_before and image_pushed_at and image_pushed_at > pushed_before:
+            continue
+
+        if not image_last_pulled or image_last_pulled <= six_month_ago:
+            table_data.append(
+                ImageRow(
+                    repo_name,
+                    image_digest,
+                    str(image_tags),
+                    str(image_pushed_at) if image_pushed_at else NOT_AVAILABLE,
+                    str(image_last_pulled) if image_last_pulled else NOT_AVAILABLE,
+                    image_size_in_megabytes,
+                )
+            )
+
+    return table_data
+
+
+def process_repository(ecr_client, repo_name):
+    """
+    Rows of a repository
     """
     print(f"Processing repository: {repo_name}")
 
-    six_month_ago = datetime.now(timezone.utc) - timedelta(days=180)
     images_paginator = ecr_client.get_paginator("describe_images")
-    images_page_iterator = images_paginator.paginate(repositoryName=repo_name)
+    images_page_iterator = images_paginator.paginate(
+        repositoryName=repo_name, **image_filter()
+    )
 
+    table_data = []
     for page in images_page_iterator:
-        images = page.get("imageDetails", [])
-
-        for image in images:
-            image_digest = image.get("imageDigest")
-            image_tags = image.get("imageTags", [])
-            image_pushed_at = image.get("imagePushedAt")
-            image_last_pulled = image.get("lastRecordedPullTime")
-            image_size_in_bytes = image.get("imageSizeInBytes")
-            if image_size_in_bytes:
-                image_size_in_megabytes = image_size_in_bytes / (1000 * 1000)
-            else:
-                image_size_in_megabytes = "N/A"
-
-            if not image_last_pulled or image_last_pulled <= six_month_ago:
-                table_data.append(
-                    [
-                        repo_name,
-                        image_digest,
-                        str(image_tags),
-                        str(image_pushed_at),
-                        str(image_last_pulled),
-                        int(image_size_in_megabytes),
-                    ]
-                )
+        table_data.extend(image_rows(repo_name, page.get("imageDetails", [])))
 
     return table_data
 
@@ -57,23 +119,23 @@ def query_ecr_images(region):
         f"\n\n✨  Running in ECR Images mode {region} for images not used within 90 days"
     )
 
-    ecr_client = SESSION.client("ecr", region_name=region)
+    ecr_client = get_client("ecr", region)
     paginator = ecr_client.get_paginator("describe_repositories")
     page_iterator = paginator.paginate()
 
-    table_head = [
-        "Repo name",
-        "Image digest",
-        "Image tags",
-        "Image pushed at",
-        "Image last pulled",
-        "MB",
-    ]
-    table_data = []
+    return TABLE_HEAD, repository_page_rows(ecr_client, page_iterator)
 
-    for page in page_iterator:
-        for repo in page["repositories"]:
-            repo_name = repo["repositoryName"]
-            process_repository(ecr_client, repo_name, table_data)
 
-    return table_head, table_data
+def repository_page_rows(ecr_client, page_iterator):
+    """
+    Rows of every describe_repositories page, its repositories are listed in
+    parallel and rows keep the repository order
+    """
+    with ThreadPoolExecutor(max_workers=REPOSITORY_WORKERS) as executor:
+        for page in page_iterator:
+            repo_names = [repo["repositoryName"] for repo in page["repositories"]]
+            for repo_rows in executor.map(
+                lambda repo_name: process_repository(ecr_client, repo_name),
+                repo_names,
+            ):
+                yield from repo_rows
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Typed export columns
+
+Columns take the types declared by the row records, other rows are typed
+from their values; missing value markers become nulls, and a column is
+widened when a later cell does not fit its type
+"""
+import numbers
+from itertools import islice
+from common.records import is_missing
+
+BATCH_ROWS = 10000
+KINDS = {bool: "bool", int: "int", float: "float", str: "string"}
+
+
+def column_type(values):
+    """
+    "bool", "int", "float" or "string" type of column values
+    """
+    kinds = set()
+    for value in values:
+        if is_missing(value):
+            continue
+        if isinstance(value, bool):
+            kinds.add("bool")
+        elif isinstance(value, numbers.Integral):
+            kinds.add("int")
+        elif isinstance(value, numbers.Real):
+            kinds.add("float")
+        else:
+            return "string"
+
+    if kinds == {"bool"}:
+        return "bool"
+    if kinds == {"int"}:
+        return "int"
+    if kinds and kinds <= {"int", "float"}:
+        return "float"
+
+    return "string"
+
+
+def record_kinds(row, width):
+    """
+    Column types declared by a row record, None for other rows
+    """
+    annotations = getattr(type(row), "__annotations__", None)
+    if not annotations or len(annotations) != width:
+        return None
+
+    return [KINDS.get(kind, "string") for kind in annotations.values()]
+
+
+def fits(value, kind):
+    """
+    Whether a cell can be written as a value of a column type
+    """
+    if is_missing(value) or kind == "string":
+        return True
+    if kind == "bool":
+        return isinstance(value, bool)
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        return False
+
+    return kind == "float" or float(value).is_integer()
+
+
+def wider_kind(kind, values):
+    """
+    Narrowest column type, kind or wider, every value fits
+    """
+    if all(fits(value, kind) for value in values):
+        return kind
+    if kind == "int" and all(fits(value, "float") for value in values):
+        return "float"
+
+    return "string"
+
+
+def typed_value(value, kind):
+    """
+    Cell as a value of its column type, the cell must fit it
+    """
+    if is_missing(value):
+        return None
+    if kind == "string":
+        return str(value)
+    if kind == "bool":
+        return value
+    if kind == "int":
+        return int(value)
+
+    return float(value)
+
+
+def typed_batches(table_head, rows):
+    """
+    (column types, batch of typed rows) of rows; types are declared by the
+    row records, or come from all rows of a list or the first batch of other
+    iterables, and are widened by the batches that do not fit them
+    """
+    rows = iter(rows) if not isinstance(rows, list) else rows
+    batch = rows if isinstance(rows, list) else list(islice(rows, BATCH_ROWS))
+    kinds = (record_kinds(batch[0], len(table_head)) if batch else None) or [
+        column_type(row[index] for row in batch) for index in range(len(table_head))
+    ]
+
+    def typed(batch):
+        kinds[:] = [
+            wider_kind(kind, (row[index] for row in batch))
+            for index, kind in enumerate(kinds)
+        ]
+        return list(kinds), [
+            [typed_value(value, kind) for value, kind in zip(row, kinds)]
+            for row in batch
+        ]
+
+    if isinstance(rows, list):
+        for offset in range(0, len(rows), BATCH_ROWS):
+            yield typed(rows[offset : offset + BATCH_ROWS])
+        return
+
+    while batch:
+        yield typed(batch)
+        batch = list(islice(rows, BATCH_ROWS))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Line-oriented exports, one CSV or JSONL file per region/mode scan
+"""
+import os
+import csv
+import json
+from abc import ABC, abstractmethod
+from export.columns import typed_batches
+
+
+class LineExporter(ABC):
+    """
+    Files named after the scan in a directory, rows written per batch
+    """
+
+    extension = None
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, region, mode, query_name, table_head, rows):
+        """
+        File of a scan
+        """
+        # pylint: disable=too-many-arguments,too-many-positional-arguments,unused-argument
+        path = os.path.join(self.directory, f"{region}_{query_name}.{self.extension}")
+        with open(path, "w", encoding="utf-8", newline="") as export_file:
+            self.write_rows(export_file, table_head, rows)
+
+    @abstractmethod
+    def write_rows(self, export_file, table_head, rows):
+        """
+        Rows of a scan
+        """
+
+    def close(self):
+        """
+        Files are closed per scan
+        """
+
+
+class CsvExporter(LineExporter):
+    """
+    CSV files, missing values are empty
+    """
+
+    extension = "csv"
+
+    def write_rows(self, export_file, table_head, rows):
+        writer = csv.writer(export_file)
+        writer.writerow(table_head)
+        for _, batch in typed_batches(table_head, rows):
+            writer.writerows(batch)
+
+
+class JsonlExporter(LineExporter):
+    """
+    JSON Lines files, one object per row, missing values are null
+    """
+
+    extension = "jsonl"
+
+    def write_rows(self, export_file, table_head, rows):
+        for _, batch in typed_batches(table_head, rows):
+            for row in batch:
+                export_file.write(json.dumps(dict(zip(table_head, row))) + "\n")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Parquet export partitioned by region and scan, the scans of a mode such as
+EBS volumes and snapshots have different columns
+"""
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+from export.columns import typed_batches
+
+ARROW_TYPES = {
+    "bool": pa.bool_(),
+    "int": pa.int64(),
+    "float": pa.float64(),
+    "string": pa.string(),
+}
+
+
+def arrow_schema(table_head, kinds):
+    """
+    Schema of typed columns
+    """
+    return pa.schema(
+        [(column, ARROW_TYPES[kind]) for column, kind in zip(table_head, kinds)]
+    )
+
+
+def widened_column(column, arrow_type):
+    """
+    Column written before its type was widened, strings as export.columns
+    writes them
+    """
+    if column.type == arrow_type:
+        return column
+    if arrow_type == pa.string():
+        return pa.array(
+            [None if value is None else str(value) for value in column.to_pylist()],
+            pa.string(),
+        )
+
+    return column.cast(arrow_type)
+
+
+def widened_writer(path, schema):
+    """
+    Writer of path, its batches written so far are rewritten with widened
+    column types
+    """
+    narrow = f"{path}.narrow"
+    os.replace(path, narrow)
+    writer = pq.ParquetWriter(path, schema, compression="zstd")
+    with pq.ParquetFile(narrow) as source:
+        for batch in source.iter_batches():
+            writer.write_batch(
+                pa.record_batch(
+                    [
+                        widened_column(column, field.type)
+                        for column, field in zip(batch.columns, schema)
+                    ],
+                    schema=schema,
+                )
+            )
+    os.remove(narrow)
+
+    return writer
+
+
+class ParquetExporter:
+    """
+    region=<region>/scan=<scan>/<scan>.parquet files, rows written per batch
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def write(self, region, mode, query_name, table_head, rows):
+        """
+        File of a scan
+        """
+        # pylint: disable=too-many-arguments,too-many-positional-arguments,unused-argument
+        partition = os.path.join(
+            self.directory, f"region={region}", f"scan={query_name}"
+        )
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, f"{query_name}.parquet")
+
+        # written aside so that widened columns can rewrite earlier batches,
+        # hidden from readers of the partition meanwhile
+        partial = os.path.join(partition, f".{query_name}.parquet")
+        schema = None
+        writer = None
+        try:
+            for kinds, batch in typed_batches(table_head, rows):
+                if writer and arrow_schema(table_head, kinds) != schema:
+                    writer.close()
+                    writer = widened_writer(partial, arrow_schema(table_head, kinds))
+                schema = arrow_schema(table_head, kinds)
+                if writer is None:
+                    writer = pq.ParquetWriter(partial, schema, compression="zstd")
+                writer.write_batch(
+                    pa.record_batch(
+                        [list(column) for column in zip(*batch)], schema=schema
+                    )
+                )
+        finally:
+            if writer:
+                writer.close()
+                os.replace(partial, path)
+
+    def close(self):
+        """
+        Files are closed per scan
+        """
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Terminal tables
+
+A table is rendered once, from at most MAX_ROWS rows picked while the rows
+stream through; the rows past them are counted, never rendered
+"""
+import heapq
+import numbers
+from itertools import islice
+from tabulate import tabulate
+from common.records import is_missing
+
+MAX_ROWS = 2000
+SORT_BY = None
+QUIET = False
+
+
+def configure_terminal(max_rows=2000, sort_by=None, quiet=False):
+    """
+    Rows shown per table, their order and whether tables are shown at all
+    """
+    global MAX_ROWS, SORT_BY, QUIET  # pylint: disable=global-statement
+
+    MAX_ROWS = max_rows
+    SORT_BY = sort_by
+    QUIET = quiet
+
+
+def sort_column(table_head):
+    """
+    (column index, descending) of --sort-by "column[:desc]", None when the
+    table has no such column
+    """
+    if not SORT_BY:
+        return None
+
+    column, _, order = SORT_BY.partition(":")
+    names = [name.lower() for name in table_head]
+    if column.strip().lower() not in names:
+        return None
+
+    return names.index(column.strip().lower()), order.strip().lower() == "desc"
+
+
+def ascending_key(index):
+    """
+    Sort key, numbers before text, missing values last
+    """
+
+    def key(row):
+        value = row[index]
+        if is_missing(value):
+            return (1, 0, 0)
+        if isinstance(value, numbers.Real):
+            return (0, 0, value)
+        return (0, 1, str(value))
+
+    return key
+
+
+def descending_key(index):
+    """
+    Reverse sort key, missing values still last
+    """
+
+    def key(row):
+        value = row[index]
+        if is_missing(value):
+            return (0, 0, 0)
+        if isinstance(value, numbers.Real):
+            return (1, 1, value)
+        return (1, 0, str(value))
+
+    return key
+
+
+def shown_rows(table_head, rows):
+    """
+    First MAX_ROWS rows in --sort-by order, without sorting the whole table
+    """
+    sort = sort_column(table_head)
+    if sort:
+        index, descending = sort
+        if descending:
+            return heapq.nlargest(MAX_ROWS, rows, key=descending_key(index))
+        return heapq.nsmallest(MAX_ROWS, rows, key=ascending_key(index))
+
+    return list(islice(rows, MAX_ROWS))
+
+
+class TableSample:
+    """
+    Rows to show of a streamed table, kept while the rows pass through;
+    keep_all also keeps every row, e.g. for the AI suggestions
+    """
+
+    def __init__(self, table_head, keep=True, keep_all=False):
+        self.table_head = table_head
+        self.keep = keep
+        self.keep_all = keep_all
+        self.sorted = sort_column(table_head) is not None
+        self.kept = []
+        self.all_rows = []
+        self.total = 0
+
+    def watch(self, rows):
+        """
+        Pass rows through, counting them and keeping the ones to show
+        """
+        for row in rows:
+            self.total += 1
+            if self.keep_all:
+                self.all_rows.append(row)
+            if self.keep and (self.sorted or len(self.kept) < MAX_ROWS):
+                self.kept.append(row)
+                # at most twice the shown rows are held before selecting
+                if len(self.kept) > 2 * MAX_ROWS:
+                    self.kept = shown_rows(self.table_head, self.kept)
+            yield row
+
+    def rows(self):
+        """
+        Rows to show
+        """
+        return shown_rows(self.table_head, self.kept)
+
+
+def table_text(table_head, rows):
+    """
+    Rows as a GitHub table
+    """
+    return tabulate(rows, headers=table_head, tablefmt="github", floatfmt=".2f")
+
+
+def print_table(table_head, rows, total_rows):
+    """
+    Print the rows to show as one table, at most MAX_ROWS are rendered
+    """
+    if QUIET:
+        return
+
+    print(table_text(table_head, rows))
+
+    if total_rows > len(rows):
+        print(
+            f"❗ {total_rows - len(rows)} more rows not shown, "
+            "raise --max-rows or use --export-file"
+        )
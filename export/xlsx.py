@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Streaming Excel export
+"""
+import re
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from common.records import Missing
+
+# Excel sheet title limits
+MAX_TITLE = 31
+INVALID_TITLE = re.compile(r"[\[\]:*?/\\]")
+
+
+class XlsxExporter:
+    """
+    Write-only workbook, rows are flushed to disk as they are appended
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.titles = set()
+        self.header_font = Font(bold=True)
+
+    def sheet_title(self, name):
+        """
+        Unique valid sheet title, truncated names get a counter
+        """
+        base = INVALID_TITLE.sub("_", name)
+        title = base[:MAX_TITLE]
+        counter = 1
+        while title.lower() in self.titles:
+            counter += 1
+            suffix = f"~{counter}"
+            title = base[: MAX_TITLE - len(suffix)] + suffix
+        self.titles.add(title.lower())
+
+        return title
+
+    def write(self, region, mode, query_name, table_head, rows):
+        """
+        Sheet with a bold header row and rows, missing values as their reason
+        """
+        # pylint: disable=too-many-arguments,too-many-positional-arguments,unused-argument
+        sheet = self.workbook.create_sheet(self.sheet_title(f"{region}_{query_name}"))
+
+        header = []
+        for column in table_head:
+            cell = WriteOnlyCell(sheet, value=column)
+            cell.font = self.header_font
+            header.append(cell)
+        sheet.append(header)
+
+        for row in rows:
+            sheet.append(
+                [value.reason if isinstance(value, Missing) else value for value in row]
+            )
+
+    def close(self):
+        """
+        Write the workbook file
+        """
+        self.workbook.save(self.path)
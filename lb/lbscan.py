@@ -3,101 +3,143 @@
 Load Balancer scanner
 """
 import re
+from typing import NamedTuple
 from datetime import datetime, timedelta
-import boto3
 from pricing.price import get_load_balancer_price
+from aws.clients import get_client
+from cloudwatch.metrics import MetricBatch
+from common.records import NOT_AVAILABLE
+from cloudwatch.stats import series_stats, stat_fields, STAT_COLUMNS, STAT_TYPES
 
-SESSION = boto3.Session()
 END_TIME = datetime.now()
 START_TIME = END_TIME - timedelta(days=30)
+# hourly traffic sums of the window, hours without traffic have no datapoint
+TRAFFIC_PERIODS = int((END_TIME - START_TIME).total_seconds() // 3600)
 INSTANCE_PRICE_MAP = {}
+TABLE_HEAD = [
+    "LoadBalancerId",
+    "Name (crop 20)",
+    "Type",
+    *[
+        f"30 days RequestCount/ActiveConnectionCount {column}"
+        for column in STAT_COLUMNS
+    ],
+    "Monthly hour cost",
+]
+TRAFFIC_FIELDS = stat_fields("traffic")
+LoadBalancerRow = NamedTuple(
+    "LoadBalancerRow",
+    [
+        ("lb_id", str),
+        ("name", str),
+        ("lb_type", str),
+        *zip(TRAFFIC_FIELDS, STAT_TYPES),
+        ("monthly_cost", float),
+    ],
+)
 
 
-def check_lb_utilization(
-    cloudwatch_client, dimension_name, metric_name, namespace, lb_name
-):
+def classic_rows(region, load_balancers, metric_batch):
     """
-    LB utilization check
+    Classic LB rows, RequestCount series are added to metric_batch
     """
-    response = cloudwatch_client.get_metric_statistics(
-        Namespace=namespace,
-        MetricName=metric_name,
-        Dimensions=[
-            {"Name": dimension_name, "Value": lb_name},
-        ],
-        StartTime=START_TIME,
-        EndTime=END_TIME,
-        Period=3600,
-        Statistics=["Sum"],
+    lbv1_price = get_load_balancer_price(INSTANCE_PRICE_MAP, region, "classic")
+    pending = {}
+
+    for lb in load_balancers:
+        lb_type = "classic"
+        lb_name = lb["LoadBalancerName"]
+        metric_batch.add(
+            ("classic", lb_name),
+            "AWS/ELB",
+            "RequestCount",
+            [{"Name": "LoadBalancerName", "Value": lb_name}],
+            "Sum",
+        )
+        pending[("classic", lb_name)] = LoadBalancerRow(
+            lb_name,
+            lb_name,
+            lb_type,
+            *[NOT_AVAILABLE] * len(TRAFFIC_FIELDS),
+            lbv1_price,
+        )
+
+    return pending
+
+
+def lb_v2_rows(region, load_balancers, metric_batch):
+    """
+    LB v2 rows, ActiveConnectionCount series are added to metric_batch
+    """
+    lbv2_price = get_load_balancer_price(INSTANCE_PRICE_MAP, region, "application")
+    pending = {}
+
+    for lb in load_balancers:
+        lb_type = lb["Type"]
+        lb_name = lb["LoadBalancerName"]
+        lb_arn = lb["LoadBalancerArn"]
+        lb_id = re.sub(r".*loadbalancer/", "", lb_arn)
+        metric_batch.add(
+            ("v2", lb_id),
+            "AWS/ApplicationELB",
+            "ActiveConnectionCount",
+            [{"Name": "LoadBalancer", "Value": lb_id}],
+            "Sum",
+        )
+        pending[("v2", lb_id)] = LoadBalancerRow(
+            lb_id,
+            lb_name,
+            lb_type,
+            *[NOT_AVAILABLE] * len(TRAFFIC_FIELDS),
+            lbv2_price,
+        )
+
+    return pending
+
+
+def apply_lb_metrics(metrics, pending):
+    """
+    Traffic statistics of load balancers
+    """
+    stats = series_stats(
+        [next(iter(metrics[lb].values())) for lb in pending], 1, TRAFFIC_PERIODS
     )
 
-    data_points = response["Datapoints"]
-    total_usage = sum(data_point["Sum"] for data_point in data_points)
-    if len(data_points):
-        average_usage = total_usage / len(data_points)
-        max_usage = max(data_point["Sum"] for data_point in data_points)
-        min_usage = min(data_point["Sum"] for data_point in data_points)
-    else:
-        average_usage = 0
-        max_usage = 0
-        min_usage = 0
+    return [
+        lb_data._replace(**dict(zip(TRAFFIC_FIELDS, lb_stats)))
+        for lb_data, lb_stats in zip(pending.values(), stats)
+    ]
+
 
-    return f"AVG: {int(average_usage)}, MAX: {int(max_usage)}, MIN: {int(min_usage)}"
+def lb_page_rows(region, page_iterator, rows, page_key):
+    """
+    Rows of every describe_load_balancers page, yielded once its metrics are in
+    """
+    cloudwatch_client = get_client("cloudwatch", region)
+    for page in page_iterator:
+        metric_batch = MetricBatch(region, START_TIME, END_TIME)
+        pending = rows(region, page[page_key], metric_batch)
+        yield from apply_lb_metrics(metric_batch.fetch(cloudwatch_client), pending)
 
 
 def query_lb(region):
     """
     LB entrypoint
     """
-    # pylint: disable=too-many-locals,too-many-branches
-    elbv1_client = SESSION.client("elb", region_name=region)
-    elbv2_client = SESSION.client("elbv2", region_name=region)
-    cloudwatch_client = SESSION.client("cloudwatch", region_name=region)
+    elbv1_client = get_client("elb", region)
+    elbv2_client = get_client("elbv2", region)
 
     paginator_v1 = elbv1_client.get_paginator("describe_load_balancers")
     page_iterator_v1 = paginator_v1.paginate()
     paginator_v2 = elbv2_client.get_paginator("describe_load_balancers")
     page_iterator_v2 = paginator_v2.paginate()
 
-    table_head = [
-        "LoadBalancerId",
-        "Name (crop 20)",
-        "Type",
-        "30 days RequestCount/ActiveConnectionCount",
-        "Monthly hour cost",
-    ]
-    table_data = []
+    def load_balancer_rows():
+        print(f"\n\n✨  Running in Load Balancer V1 mode {region}")
+        yield from lb_page_rows(
+            region, page_iterator_v1, classic_rows, "LoadBalancerDescriptions"
+        )
+        print(f"✨  Running in Load Balancer V2 mode {region}")
+        yield from lb_page_rows(region, page_iterator_v2, lb_v2_rows, "LoadBalancers")
 
-    print(f"\n\n✨  Running in Load Balancer V1 mode {region}")
-    lbv1_price = get_load_balancer_price(INSTANCE_PRICE_MAP, region, "classic")
-    for page in page_iterator_v1:
-        for lb in page["LoadBalancerDescriptions"]:
-            lb_type = "classic"
-            lb_name = lb["LoadBalancerName"]
-            lb_data = check_lb_utilization(
-                cloudwatch_client,
-                "LoadBalancerName",
-                "RequestCount",
-                "AWS/ELB",
-                lb_name,
-            )
-            table_data.append([lb_name, lb_name, lb_type, lb_data, lbv1_price])
-
-    print(f"✨  Running in Load Balancer V2 mode {region}")
-    lbv2_price = get_load_balancer_price(INSTANCE_PRICE_MAP, region, "application")
-    for page in page_iterator_v2:
-        for lb in page["LoadBalancers"]:
-            lb_type = lb["Type"]
-            lb_name = lb["LoadBalancerName"]
-            lb_arn = lb["LoadBalancerArn"]
-            lb_id = re.sub(r".*loadbalancer/", "", lb_arn)
-            lb_data = check_lb_utilization(
-                cloudwatch_client,
-                "LoadBalancer",
-                "ActiveConnectionCount",
-                "AWS/ApplicationELB",
-                lb_id,
-            )
-            table_data.append([lb_id, lb_name, lb_type, lb_data, lbv2_price])
-
-    return table_head, table_data
+    return TABLE_HEAD, load_balancer_rows()
@@ -2,52 +2,258 @@
 """
 Main entrypoint
 """
+import os
+import tempfile
+import importlib.util
+from collections import deque
+from functools import partial
 import click
-from tabulate import tabulate
-import openpyxl
-from openpyxl.styles import Font
 from gpt.ask import query_gpt
+from export.xlsx import XlsxExporter
+from export.lines import CsvExporter, JsonlExporter
+from export import terminal
+from export.terminal import (
+    configure_terminal,
+    print_table,
+    table_text,
+    TableSample,
+)
+from aws.clients import configure_clients
+from aws.accounts import use_account, caller_account
+from aws.ratelimit import configure_rate_limits
+from aws.profiler import enable_api_profile, take_api_profile
+from aws.profiler import TABLE_HEAD as API_PROFILE_HEAD
+from cloudwatch.metrics import load_metric_store, use_metric_scope
+from common.spool import spool_rows, spooled_rows
+from ec2.catalog import configure_catalog
+from rds.orderable import configure_orderable
+from rightsizing.engine import configure_rightsizing
+from common.scheduler import parse_limits, run_jobs, run_processes
+from common.state import load_inventory_state, use_state_scope
+from pricing.price import (
+    load_price_index,
+    load_price_cache,
+    save_price_cache,
+)
 from ec2.ec2scan import query_ec2
 from ebs.ebsscan import query_ebs, query_ebs_snapshots
 from rds.rdsscan import query_rds
 from ami.amiscan import query_ami
-from ecr.ecrscan import query_ecr_images
+from ecr.ecrscan import query_ecr_images, configure_ecr
 from lb.lbscan import query_lb
 from cloudwatch.group import query_cloudwatch_groups
 
+MODE_FUNCTIONS = {
+    "ebs": [query_ebs, query_ebs_snapshots],
+    "ec2": [query_ec2],
+    "rds": [query_rds],
+    "lb": [query_lb],
+    "ami": [query_ami],
+    "ecr": [query_ecr_images],
+    "cw": [query_cloudwatch_groups],
+}
+
 
-def export_data(workbook, query_func, region, table_head, table_data):
+def open_exporter(export_format, export_file):
     """
-    Export data
+    Exporter of a format, formats other than xlsx write to a directory
+    named after the export file
     """
+    if export_format == "xlsx":
+        return XlsxExporter(export_file)
+
+    directory = os.path.splitext(export_file)[0]
+    if export_format == "csv":
+        return CsvExporter(directory)
+    if export_format == "jsonl":
+        return JsonlExporter(directory)
 
-    sheet_name = f"{region}_{query_func.__name__}"[:30]
-    sheet = workbook.create_sheet(sheet_name)
-    sheet.append(table_head)
+    # pylint: disable=import-outside-toplevel
+    from export.parquet import ParquetExporter
 
-    bold_font = Font(bold=True)
-    for col_num in range(1, len(table_head) + 1):
-        sheet.cell(row=1, column=col_num).font = bold_font
+    return ParquetExporter(directory)
+
+
+def export_data(exporter, query_func, region, mode, table_head, table_data):
+    """
+    Export data
+    """
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
 
-    for row in table_data:
-        sheet.append(row)
+    exporter.write(region, mode, query_func.__name__, table_head, table_data)
 
 
-def tabulate_data(ai, mode, table_head, table_data):
+def tabulate_data(ai, mode, table_head, sample):
     """
     Tabulate data
     """
 
-    tabulated_data = tabulate(
-        table_data, headers=table_head, tablefmt="github", floatfmt=".2f"
-    )
-    if len(table_data) < 2000:
-        print(tabulated_data)
-    else:
-        print("❗ Too many rows to print, use --export-file to export to Excel")
+    if terminal.QUIET and not ai:
+        return
+
+    print_table(table_head, sample.rows(), sample.total)
 
     if ai:
-        query_gpt(mode, table_head, tabulated_data)
+        # suggestions are asked for the whole table, not the rows shown
+        query_gpt(mode, table_head, table_text(table_head, sample.all_rows))
+
+
+def configure(options, ingest_offers=True):
+    """
+    Clients, pricing and metrics settings of this process
+    """
+    configure_rate_limits(options["rate_limits"], options["rate_limit"])
+    if options["profile_api"]:
+        enable_api_profile()
+    configure_clients(
+        max_pool_connections=options["max_pool_connections"],
+        retry_mode=options["retry_mode"],
+        timeout=options["api_timeout"],
+        endpoint_url=options["endpoint_url"],
+    )
+
+    if options["price_index"]:
+        load_price_index(
+            options["price_index"], options["price_offers"] if ingest_offers else None
+        )
+    if options["metrics_store"]:
+        load_metric_store(options["metrics_store"])
+    if options["incremental"]:
+        load_inventory_state(options["state_store"], options["state_refresh"])
+    if options["price_cache"]:
+        load_price_cache(
+            options["price_cache"],
+            options["price_cache_ttl"],
+            options["refresh_prices"],
+        )
+    configure_catalog(options["instance_catalog"], options["instance_catalog_ttl"])
+    configure_orderable(options["rds_orderable"], options["rds_orderable_ttl"])
+    configure_rightsizing(options["rightsizing_target"])
+    configure_terminal(options["max_rows"], options["sort_by"], options["quiet"])
+    configure_ecr(
+        options["ecr_workers"], options["ecr_tag_status"], options["ecr_min_age"]
+    )
+    if options["engine"] == "async":
+        # pylint: disable=import-outside-toplevel
+        from aio.clients import configure_async_clients
+
+        configure_async_clients(options["async_concurrency"])
+
+
+def report_api_profile(profile_file):
+    """
+    API calls by total time and their JSON dump
+    """
+    profile = enable_api_profile()
+    print("\n\n✨  API calls by total time")
+    print(table_text(API_PROFILE_HEAD, profile.rows()))
+    profile.dump(profile_file)
+    print(f"API profile written to {profile_file}")
+
+
+def scan_jobs(options):
+    """
+    (region, mode, query_func) jobs of the selected modes and engine
+    """
+    mode_functions = MODE_FUNCTIONS
+    if options["engine"] == "async":
+        # pylint: disable=import-outside-toplevel
+        from aio.scanners import MODE_FUNCTIONS as mode_functions
+
+    return [
+        (region, mode, query_func)
+        for region in options["regions"].split(",")
+        for mode in options["modes"].split(",")
+        if mode in mode_functions
+        for query_func in mode_functions[mode]
+    ]
+
+
+def run_scans(options, jobs):
+    """
+    Run jobs on the selected engine, yields (job, result, exception)
+    """
+    mode_limits = parse_limits(options["service_concurrency"])
+    if options["engine"] == "async":
+        # pylint: disable=import-outside-toplevel
+        from aio.engine import run_async_jobs
+
+        return run_async_jobs(jobs, options["max_workers"], mode_limits)
+
+    return run_jobs(jobs, options["max_workers"], mode_limits)
+
+
+def scan_account(options, spool_dir, account_id):
+    """
+    Every job in one account, runs in an account worker process; rows are
+    written to spool files of spool_dir as they stream in
+    """
+    use_account(account_id, options["role_name"])
+    use_state_scope(account_id)
+    use_metric_scope(account_id)
+    results = []
+    for position, (_, result, exception) in enumerate(
+        run_scans(options, scan_jobs(options))
+    ):
+        try:
+            if exception:
+                raise exception
+            table_head, rows = result
+            spool_path = os.path.join(spool_dir, f"{account_id}-{position}.jsonl")
+            spool_rows(spool_path, rows)
+            results.append(((table_head, spool_path), None))
+        except Exception as scan_exception:  # pylint: disable=broad-exception-caught
+            results.append((None, str(scan_exception)))
+    save_price_cache()
+
+    return results, take_api_profile()
+
+
+def merged_rows(spools):
+    """
+    Spooled rows of every account with an Account column
+    """
+    for account_id, spool_path in spools:
+        yield from spooled_rows(spool_path, [account_id])
+
+
+def scan_accounts(options, jobs):
+    """
+    Jobs of every account on a process pool, rows merged with an Account column
+    """
+    merged = [[None, []] for _ in jobs]
+    with tempfile.TemporaryDirectory(prefix="costs-optimizer-") as spool_dir:
+        for account_id, account_scan, exception in run_processes(
+            partial(scan_account, options, spool_dir),
+            options["accounts"].split(","),
+            options["account_processes"],
+            configure,
+            (options, False),
+        ):
+            if exception:
+                print(f"❗ account {account_id} failed: {exception}")
+                continue
+            account_results, api_profile = account_scan
+            if api_profile:
+                enable_api_profile().merge(api_profile)
+
+            for (region, _, query_func), merged_result, (result, error) in zip(
+                jobs, merged, account_results
+            ):
+                if error:
+                    print(
+                        f"❗ {query_func.__name__} failed in {account_id} {region}: "
+                        f"{error}"
+                    )
+                    continue
+                table_head, spool_path = result
+                merged_result[0] = ["Account", *table_head]
+                merged_result[1].append((account_id, spool_path))
+
+        for job, (table_head, spools) in zip(jobs, merged):
+            # jobs that failed in every account were reported above
+            if table_head:
+                yield job, (table_head, merged_rows(spools)), None
 
 
 @click.command(context_settings={"show_default": True})
@@ -76,43 +282,267 @@ def tabulate_data(ai, mode, table_head, table_data):
     required=False,
     default="costs-optimizer.xlsx",
 )
+@click.option(
+    "--format",
+    help="Export format, csv/jsonl/parquet write a directory named after --export-file",
+    type=click.Choice(["xlsx", "csv", "jsonl", "parquet"]),
+    default="xlsx",
+)
+@click.option(
+    "--max-rows",
+    help="Rows printed per table, larger tables print these rows as one table and a note",
+    type=int,
+    default=2000,
+)
+@click.option(
+    "--sort-by",
+    help='Column printed tables are sorted by, "column" or "column:desc"',
+    required=False,
+)
+@click.option(
+    "-q",
+    "--quiet",
+    help="Print no tables",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--price-index",
+    help="Offline price index path (SQLite), used instead of the Pricing API",
+    required=False,
+)
+@click.option(
+    "--price-offers",
+    help="AWS bulk offer file or directory (JSON/CSV) to ingest into --price-index",
+    required=False,
+)
+@click.option(
+    "--price-cache",
+    help="Persistent price cache path, empty to disable",
+    required=False,
+    default="~/.cache/costs-optimizer/prices.json",
+)
+@click.option(
+    "--price-cache-ttl",
+    help="Price cache TTL in hours",
+    type=int,
+    default=24,
+)
+@click.option(
+    "--refresh-prices",
+    help="Ignore cached prices and fetch them again",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--max-pool-connections",
+    help="HTTP connections kept per AWS client",
+    type=int,
+    default=50,
+)
+@click.option(
+    "--retry-mode",
+    help="botocore retry mode",
+    type=click.Choice(["standard", "adaptive"]),
+    default="adaptive",
+)
+@click.option(
+    "--api-timeout",
+    help="AWS API read timeout in seconds",
+    type=int,
+    default=60,
+)
+@click.option(
+    "--rate-limit/--no-rate-limit",
+    help="Rate limit AWS requests per service, operation and region",
+    default=True,
+)
+@click.option(
+    "--rate-limits",
+    help="Requests per second, e.g. pricing=5,ec2.DescribeInstances=20; "
+    "others start at 20 and adapt to throttling",
+    required=False,
+)
+@click.option(
+    "--instance-catalog",
+    help="Directory of the EC2 instance type catalogs per region, empty to disable",
+    default="~/.cache/costs-optimizer/instance-types",
+)
+@click.option(
+    "--instance-catalog-ttl",
+    help="EC2 instance type catalog TTL in hours",
+    type=int,
+    default=168,
+)
+@click.option(
+    "--rds-orderable",
+    help="Directory of the RDS orderable options per region and engine version, "
+    "empty to disable",
+    default="~/.cache/costs-optimizer/rds-orderable",
+)
+@click.option(
+    "--rds-orderable-ttl",
+    help="RDS orderable options TTL in hours",
+    type=int,
+    default=168,
+)
+@click.option(
+    "--rightsizing-target",
+    help="CPU utilization in percent the 30 days CPU peak may reach on a "
+    "recommended type",
+    type=click.IntRange(1, 100),
+    default=80,
+)
+@click.option(
+    "--metrics-store",
+    help="Local metrics store path (SQLite), empty to disable",
+    required=False,
+    default="~/.cache/costs-optimizer/metrics.db",
+)
+@click.option(
+    "--incremental",
+    help="Serve unchanged EC2/RDS/EBS resources from --state-store",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--state-store",
+    help="Inventory state path (SQLite) of --incremental",
+    default="~/.cache/costs-optimizer/inventory.db",
+)
+@click.option(
+    "--state-refresh",
+    help="Hours after which unchanged resources are priced and measured again",
+    type=int,
+    default=24,
+)
+@click.option(
+    "--max-workers",
+    help="Region/mode scans run in parallel",
+    type=int,
+    default=8,
+)
+@click.option(
+    "--service-concurrency",
+    help="Per mode parallel scan caps, e.g. ec2=2,rds=1",
+    required=False,
+)
+@click.option(
+    "--engine",
+    help="Scan on a thread pool or on one asyncio event loop (aiobotocore)",
+    type=click.Choice(["thread", "async"]),
+    default="thread",
+)
+@click.option(
+    "--async-concurrency",
+    help="AWS requests in flight at once with --engine async",
+    type=int,
+    default=64,
+)
+@click.option(
+    "--ecr-workers",
+    help="ECR repositories listed in parallel",
+    type=int,
+    default=8,
+)
+@click.option(
+    "--ecr-tag-status",
+    help="Only list ECR images with this tag status (server-side filter)",
+    type=click.Choice(["TAGGED", "UNTAGGED", "ANY"]),
+    required=False,
+)
+@click.option(
+    "--ecr-min-age",
+    help="Only report ECR images pushed at least this many days ago",
+    type=int,
+    required=False,
+)
+@click.option(
+    "--accounts",
+    help="Comma separated account ids scanned through --role-name, one workbook",
+    required=False,
+)
+@click.option(
+    "--role-name",
+    help="Role assumed in every --accounts account",
+    default="OrganizationAccountAccessRole",
+)
+@click.option(
+    "--account-processes",
+    help="Accounts scanned in parallel processes",
+    type=int,
+    default=os.cpu_count(),
+)
+@click.option(
+    "--endpoint-url",
+    help="Send every AWS call to this endpoint, e.g. a local stub",
+    required=False,
+)
+@click.option(
+    "--profile-api",
+    help="Count calls, retries, throttles, bytes and latency per API operation",
+    is_flag=True,
+    default=False,
+)
+@click.option(
+    "--profile-api-file",
+    help="JSON dump of --profile-api",
+    default="costs-optimizer-api.json",
+)
 def main(**options):
     """
     Main entrypoint
     """
 
-    modes = options["modes"]
-    regions = options["regions"]
     ai = options["ai_suggestions"]
     export_file = options["export_file"]
 
-    workbook = openpyxl.Workbook()
-    workbook.remove(workbook["Sheet"])
-
-    mode_functions = {
-        "ebs": [query_ebs, query_ebs_snapshots],
-        "ec2": [query_ec2],
-        "rds": [query_rds],
-        "lb": [query_lb],
-        "ami": [query_ami],
-        "ecr": [query_ecr_images],
-        "cw": [query_cloudwatch_groups],
-    }
-
-    for region in regions.split(","):
-        for mode in modes.split(","):
-            if mode in mode_functions:
-                for query_func in mode_functions[mode]:
-                    table_head, table_data = query_func(region)
-                    if table_head and table_data:
-                        tabulate_data(ai, mode, table_head, table_data)
-
-                    if export_file:
-                        export_data(
-                            workbook, query_func, region, table_head, table_data
-                        )
-
-    workbook.save(export_file)
+    if options["price_offers"] and not options["price_index"]:
+        raise click.UsageError("--price-offers requires --price-index")
+    if options["engine"] == "async" and not importlib.util.find_spec("aiobotocore"):
+        raise click.UsageError("--engine async requires aiobotocore")
+    if options["format"] == "parquet" and not importlib.util.find_spec("pyarrow"):
+        raise click.UsageError("--format parquet requires pyarrow")
+
+    configure(options)
+    if options["metrics_store"] and not options["accounts"]:
+        # series are stored per account, as resource names repeat across them
+        use_metric_scope(caller_account())
+
+    exporter = open_exporter(options["format"], export_file) if export_file else None
+
+    jobs = scan_jobs(options)
+    if options["accounts"]:
+        results = scan_accounts(options, jobs)
+    else:
+        results = run_scans(options, jobs)
+
+    for (region, mode, query_func), result, exception in results:
+        if exception:
+            print(f"❗ {query_func.__name__} failed in {region}: {exception}")
+            continue
+
+        # rows stream from the scan through the exporter, the rows to
+        # show are kept on the way
+        table_head, table_data = result
+        sample = TableSample(table_head, not terminal.QUIET, ai)
+        rows = sample.watch(table_data)
+        try:
+            if exporter:
+                export_data(exporter, query_func, region, mode, table_head, rows)
+            else:
+                deque(rows, maxlen=0)
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            print(f"❗ {query_func.__name__} failed in {region}: {exception}")
+
+        if table_head and sample.total:
+            tabulate_data(ai, mode, table_head, sample)
+
+    save_price_cache()
+    if exporter:
+        exporter.close()
+    if options["profile_api"]:
+        report_api_profile(options["profile_api_file"])
 
 
 if __name__ == "__main__":
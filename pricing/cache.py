@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Persistent cross-run price cache
+"""
+import os
+import json
+import time
+import threading
+from common.records import Missing, missing
+
+# bump when the cached value format changes, older files are dropped
+CACHE_VERSION = 1
+
+
+class PriceCache:
+    """
+    On-disk price cache with TTL
+    """
+
+    def __init__(self, path, ttl_hours=24, refresh=False):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl_hours * 3600
+        self.lock = threading.Lock()
+        self.prices = {}
+        self.dirty = False
+
+        if not refresh:
+            self.prices = self.read()
+
+    def read(self):
+        """
+        Prices on disk, empty when missing or of another version
+        """
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as cache_file:
+                content = json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+        if content.get("version") != CACHE_VERSION:
+            return {}
+
+        return content.get("prices", {})
+
+    def get(self, key):
+        """
+        Cached price or None when missing/expired
+        """
+        with self.lock:
+            entry = self.prices.get(key)
+        if entry and time.time() - entry[0] < self.ttl:
+            # missing price markers are stored as their reason
+            return missing(entry[1]) if isinstance(entry[1], str) else entry[1]
+
+        return None
+
+    def set(self, key, value):
+        """
+        Store price
+        """
+        if isinstance(value, Missing):
+            value = value.reason
+        with self.lock:
+            self.prices[key] = [time.time(), value]
+            self.dirty = True
+
+    def save(self):
+        """
+        Write cache to disk, dropping expired entries
+        """
+        if not self.dirty:
+            return
+
+        now = time.time()
+        with self.lock:
+            prices = dict(self.prices)
+        # other processes may have saved prices since this cache was read
+        for key, entry in self.read().items():
+            if key not in prices or prices[key][0] < entry[0]:
+                prices[key] = entry
+        prices = {
+            key: entry for key, entry in prices.items() if now - entry[0] < self.ttl
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as cache_file:
+            json.dump({"version": CACHE_VERSION, "prices": prices}, cache_file)
+        os.replace(temp_path, self.path)
+        self.dirty = False
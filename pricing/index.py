@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Offline price index built from AWS Price List bulk offer files
+"""
+import os
+import csv
+import json
+import sqlite3
+import threading
+from common.scheduler import chunks
+
+INDEXED_SERVICES = ["AmazonEC2", "AmazonRDS", "AmazonCloudWatch"]
+# characters read at once from JSON offer files, rows inserted at once
+READ_CHUNK = 1 << 20
+INGEST_ROWS = 10000
+
+# attribute name -> indexed column
+INDEXED_FIELDS = {
+    "regionCode": "region",
+    "productFamily": "family",
+    "instanceType": "instance_type",
+    "operatingSystem": "os",
+    "databaseEngine": "engine",
+    "deploymentOption": "deployment",
+    "volumeApiName": "volume",
+}
+
+# bulk CSV column -> Price List API attribute name
+CSV_FIELDS = {
+    "Product Family": "productFamily",
+    "Region Code": "regionCode",
+    "Instance Type": "instanceType",
+    "Operating System": "operatingSystem",
+    "Database Engine": "databaseEngine",
+    "Deployment Option": "deploymentOption",
+    "Volume API Name": "volumeApiName",
+    "usageType": "usagetype",
+    "Storage": "storage",
+    "Tenancy": "tenancy",
+    "Pre Installed S/W": "preInstalledSw",
+    "CapacityStatus": "capacitystatus",
+    "License Model": "licenseModel",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    service TEXT NOT NULL,
+    sku TEXT NOT NULL,
+    region TEXT COLLATE NOCASE,
+    family TEXT COLLATE NOCASE,
+    instance_type TEXT COLLATE NOCASE,
+    os TEXT COLLATE NOCASE,
+    engine TEXT COLLATE NOCASE,
+    deployment TEXT COLLATE NOCASE,
+    volume TEXT COLLATE NOCASE,
+    attributes TEXT NOT NULL,
+    usd TEXT NOT NULL,
+    PRIMARY KEY (service, sku)
+);
+CREATE INDEX IF NOT EXISTS prices_lookup ON prices (
+    service, region, instance_type, os, engine, deployment, volume
+);
+CREATE TABLE IF NOT EXISTS offers (
+    service TEXT NOT NULL,
+    region TEXT NOT NULL COLLATE NOCASE,
+    PRIMARY KEY (service, region)
+);
+"""
+
+# products and prices of a JSON offer file until both sections are read
+STAGING = """
+CREATE TEMP TABLE IF NOT EXISTS offer_products (
+    sku TEXT PRIMARY KEY,
+    region TEXT,
+    family TEXT,
+    instance_type TEXT,
+    os TEXT,
+    engine TEXT,
+    deployment TEXT,
+    volume TEXT,
+    attributes TEXT NOT NULL
+);
+CREATE TEMP TABLE IF NOT EXISTS offer_prices (sku TEXT PRIMARY KEY, usd TEXT NOT NULL);
+"""
+
+
+def offer_files(path):
+    """
+    Offer files under a path
+    """
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.endswith((".json", ".csv"))
+        )
+
+    return [path]
+
+
+class JsonStream:
+    """
+    Members of the JSON objects of a file read in chunks, values are decoded
+    one at a time so that only the current one is held in memory
+    """
+
+    decoder = json.JSONDecoder()
+
+    def __init__(self, json_file):
+        self.json_file = json_file
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Read the next chunk, False at the end of the file
+        """
+        if self.eof:
+            return False
+        chunk = self.json_file.read(READ_CHUNK)
+        self.eof = not chunk
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return not self.eof
+
+    def peek(self):
+        """
+        Next character that is not whitespace
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise ValueError(f"unexpected end of {self.json_file.name}")
+
+    def next_char(self):
+        """
+        Next character that is not whitespace, consumed
+        """
+        char = self.peek()
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Next value, decoded
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # a number may go on in the next chunk
+            if end < len(self.buffer) or not self.fill():
+                self.pos = end
+                return value
+
+    def members(self):
+        """
+        Keys of the next object, the caller consumes each value with
+        value() or members() before asking for the next key
+        """
+        if self.next_char() != "{":
+            raise ValueError(f"JSON object expected in {self.json_file.name}")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            if self.next_char() != ":":
+                raise ValueError(f"':' expected in {self.json_file.name}")
+            yield key
+            separator = self.next_char()
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError(f"',' expected in {self.json_file.name}")
+
+
+def first_usd(terms):
+    """
+    USD price of the first dimension of the first term of a product
+    """
+    for term in terms.values():
+        for dimension in term["priceDimensions"].values():
+            return dimension["pricePerUnit"].get("USD")
+
+    return None
+
+
+def read_json_offer(path):
+    """
+    Read a bulk JSON offer file as a stream of ("offer", service),
+    ("product", sku, attributes) and ("price", sku, usd) entries; the
+    products and terms sections are never loaded whole, the files of large
+    services are several GB
+    """
+    with open(path, encoding="utf-8") as offer_file:
+        stream = JsonStream(offer_file)
+        for key in stream.members():
+            if key == "offerCode":
+                yield ("offer", stream.value())
+            elif key == "products":
+                for sku in stream.members():
+                    product = stream.value()
+                    attributes = dict(product.get("attributes", {}))
+                    attributes["productFamily"] = product.get("productFamily", "")
+                    yield ("product", sku, attributes)
+            elif key == "terms":
+                for term_type in stream.members():
+                    for sku in stream.members():
+                        terms = stream.value()
+                        usd = first_usd(terms) if term_type == "OnDemand" else None
+                        if usd is not None:
+                            yield ("price", sku, usd)
+            else:
+                stream.value()
+
+
+def read_csv_offer(path):
+    """
+    Read OnDemand USD prices from a bulk CSV offer file
+    """
+    with open(path, encoding="utf-8", newline="") as offer_file:
+        reader = csv.reader(offer_file)
+        service = None
+        for row in reader:
+            if row and row[0] == "OfferCode":
+                service = row[1]
+            if row and row[0] == "SKU":
+                header = row
+                break
+        else:
+            return
+
+        seen = set()
+        for row in csv.DictReader(offer_file, fieldnames=header):
+            if row["TermType"] != "OnDemand" or row["Currency"] != "USD":
+                continue
+            if row["SKU"] in seen:
+                continue
+            seen.add(row["SKU"])
+            attributes = {
+                attribute: row[column]
+                for column, attribute in CSV_FIELDS.items()
+                if row.get(column)
+            }
+            yield service, row["SKU"], attributes, row["PricePerUnit"]
+
+
+class PriceIndex:
+    """
+    Indexed on-disk store of OnDemand prices
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(SCHEMA + STAGING)
+        self.covered = {
+            (service, region.lower())
+            for service, region in self.connection.execute(
+                "SELECT service, region FROM offers"
+            )
+        }
+
+    def ingest(self, path):
+        """
+        Ingest bulk offer files (JSON or CSV) for the indexed services
+        """
+        count = 0
+        for offer_path in offer_files(path):
+            ingest = (
+                self.ingest_csv if offer_path.endswith(".csv") else self.ingest_json
+            )
+            with self.lock, self.connection:
+                service, offer_count = ingest(offer_path)
+                if offer_count:
+                    self.connection.execute(
+                        "INSERT OR IGNORE INTO offers SELECT DISTINCT service, region"
+                        " FROM prices WHERE service = ? AND region IS NOT NULL",
+                        [service],
+                    )
+            count += offer_count
+            print(f"Indexed {offer_path}")
+
+        self.covered = {
+            (service, region.lower())
+            for service, region in self.connection.execute(
+                "SELECT service, region FROM offers"
+            )
+        }
+
+        return count
+
+    def ingest_csv(self, offer_path):
+        """
+        (service, prices) of a CSV offer file, inserted in batches
+        """
+        service = None
+        count = 0
+        for rows in chunks(read_csv_offer(offer_path), INGEST_ROWS):
+            service = rows[0][0]
+            if service not in INDEXED_SERVICES:
+                break
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO prices VALUES (?,?,?,?,?,?,?,?,?,?,?)",
+                [
+                    [
+                        service,
+                        sku,
+                        *[attributes.get(field) for field in INDEXED_FIELDS],
+                        json.dumps(attributes),
+                        usd,
+                    ]
+                    for service, sku, attributes, usd in rows
+                ],
+            )
+            count += len(rows)
+
+        return service, count
+
+    def ingest_json(self, offer_path):
+        """
+        (service, prices) of a JSON offer file; its products and prices are
+        staged in batches and joined once both sections are read
+        """
+        self.clear_staging()
+        service = None
+        for entries in chunks(read_json_offer(offer_path), INGEST_ROWS):
+            offers = [entry[1] for entry in entries if entry[0] == "offer"]
+            if offers:
+                service = offers[0]
+            if service not in INDEXED_SERVICES:
+                return service, 0
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO offer_products VALUES (?,?,?,?,?,?,?,?,?)",
+                [
+                    [
+                        sku,
+                        *[attributes.get(field) for field in INDEXED_FIELDS],
+                        json.dumps(attributes),
+                    ]
+                    for _, sku, attributes in (
+                        entry for entry in entries if entry[0] == "product"
+                    )
+                ],
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO offer_prices VALUES (?,?)",
+                [entry[1:] for entry in entries if entry[0] == "price"],
+            )
+
+        count = self.connection.execute(
+            "INSERT OR REPLACE INTO prices SELECT ?, sku, region, family,"
+            " instance_type, os, engine, deployment, volume, attributes, usd"
+            " FROM offer_products JOIN offer_prices USING (sku)",
+            [service],
+        ).rowcount
+        self.clear_staging()
+
+        return service, count
+
+    def clear_staging(self):
+        """
+        Empty the staging tables of JSON offer files
+        """
+        self.connection.execute("DELETE FROM offer_products")
+        self.connection.execute("DELETE FROM offer_prices")
+
+    def covers(self, service_code, region):
+        """
+        Whether the index holds prices for a service in a region
+        """
+        return (service_code, region.lower()) in self.covered
+
+    def get_products(self, ServiceCode, Filters):  # pylint: disable=invalid-name
+        """
+        Answer a Price List get_products query from the index
+        """
+        where = ["service = ?"]
+        params = [ServiceCode]
+        extra = []
+        for resource_filter in Filters:
+            column = INDEXED_FIELDS.get(resource_filter["Field"])
+            if column:
+                where.append(f"{column} = ?")
+                params.append(resource_filter["Value"])
+            else:
+                extra.append(resource_filter)
+
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT attributes, usd FROM prices WHERE {' AND '.join(where)}",
+                params,
+            ).fetchall()
+
+        price_list = []
+        for attributes, usd in rows:
+            attributes = json.loads(attributes)
+            if all(
+                attributes.get(resource_filter["Field"], "").lower()
+                == resource_filter["Value"].lower()
+                for resource_filter in extra
+            ):
+                price_list.append(
+                    json.dumps(
+                        {
+                            "product": {
+                                "productFamily": attributes.get("productFamily"),
+                                "attributes": attributes,
+                            },
+                            "terms": {
+                                "OnDemand": {
+                                    "index": {
+                                        "priceDimensions": {
+                                            "index": {"pricePerUnit": {"USD": usd}}
+                                        }
+                                    }
+                                }
+                            },
+                        }
+                    )
+                )
+
+        return {"PriceList": price_list}
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Price List decoding
+
+get_products returns every product as a JSON document with all its terms,
+only the first OnDemand USD price and a few attributes are ever needed, so
+attributes are pulled out of the raw document and only the OnDemand terms
+are decoded
+"""
+import re
+import json
+
+USAGETYPE = re.compile(r'"usagetype"\s*:\s*"([^"]*)"')
+ON_DEMAND = re.compile(r'"OnDemand"\s*:\s*(?=\{)')
+DECODER = json.JSONDecoder()
+ATTRIBUTES = {}
+
+SNAPSHOT_USAGE = re.compile(r"SnapshotUsage$")
+SNAPSHOT_ARCHIVE_USAGE = re.compile(r"SnapshotArchiveStorage$")
+LOAD_BALANCER_USAGE = re.compile(r"LoadBalancerUsage")
+LOG_STORAGE_USAGE = re.compile(r"TimedStorage-ByteHrs")
+
+
+def on_demand_usd(on_demand):
+    """
+    First USD price of decoded OnDemand terms
+    """
+    for term in on_demand.values():
+        for dimension in term["priceDimensions"].values():
+            usd = dimension["pricePerUnit"].get("USD")
+            if usd is not None:
+                return float(usd)
+
+    return None
+
+
+def decoded_usd_price(price_item):
+    """
+    First OnDemand USD price, decoding the whole document
+    """
+    return on_demand_usd(json.loads(price_item)["terms"].get("OnDemand", {}))
+
+
+def usd_price(price_item):
+    """
+    First OnDemand USD price of a raw Price List item, the OnDemand object
+    is decoded on its own so that no other term's price can answer
+    """
+    on_demand = ON_DEMAND.search(price_item)
+    if on_demand:
+        return on_demand_usd(DECODER.raw_decode(price_item, on_demand.end())[0])
+
+    return decoded_usd_price(price_item)
+
+
+def usage_type(price_item):
+    """
+    usagetype attribute of a raw Price List item
+    """
+    match = USAGETYPE.search(price_item)
+
+    return match.group(1) if match else ""
+
+
+def attribute(price_item, name):
+    """
+    Product attribute of a raw Price List item
+    """
+    if name not in ATTRIBUTES:
+        ATTRIBUTES[name] = re.compile(rf'"{name}"\s*:\s*"([^"]*)"')
+    match = ATTRIBUTES[name].search(price_item)
+
+    return match.group(1) if match else None
+
+
+def first_match(price_items, matcher):
+    """
+    Price of the first item whose usagetype matches, stops reading on a hit
+    """
+    for price_item in price_items:
+        if matcher.search(usage_type(price_item)):
+            return usd_price(price_item)
+
+    return None
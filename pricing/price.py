@@ -2,72 +2,136 @@
 """
 Pricing functions
 """
-import re
-import json
-import boto3
+from collections import namedtuple
+from pricing.index import PriceIndex
+from pricing.cache import PriceCache
+from pricing.parser import (
+    usd_price,
+    attribute,
+    first_match,
+    SNAPSHOT_USAGE,
+    SNAPSHOT_ARCHIVE_USAGE,
+    LOAD_BALANCER_USAGE,
+    LOG_STORAGE_USAGE,
+)
+from aws.clients import get_client
+from common.memo import single_flight, store_many
+from common.records import UNKNOWN, MULTIPLE, scaled
+
+
+# a Price List query and how its products turn into a price, paginated
+# queries get every page lazily, the others only the first page
+PriceQuery = namedtuple(
+    "PriceQuery",
+    [
+        "cost_id",
+        "cache_key",
+        "service_code",
+        "resource_filter",
+        "paginate",
+        "interpret",
+    ],
+)
+PRICE_INDEX = None
+PRICE_CACHE = None
+PREFETCHED = {}
+ENGINE_NAMES = {
+    "aurora-postgresql": "Aurora PostgreSQL",
+    "aurora-mysql": "Aurora MySQL",
+    "mariadb": "MariaDB",
+    "postgres": "PostgreSQL",
+    "mysql": "MySQL",
+    "oracle": "Oracle",
+    "sqlserver": "SQL Server",
+}
+STORAGE_NAMES = {
+    "aurora": "EBS Only",
+    "gp2": "EBS Only",
+    "aurora-iopt1": "Aurora IO Optimization Mode",
+}
+
+
+def load_price_index(index_path, offers_path=None):
+    """
+    Answer price queries from an offline index
+    """
+    global PRICE_INDEX  # pylint: disable=global-statement
+
+    PRICE_INDEX = PriceIndex(index_path)
+    if offers_path:
+        PRICE_INDEX.ingest(offers_path)
+
+    return PRICE_INDEX
+
+
+def load_price_cache(cache_path, ttl_hours, refresh=False):
+    """
+    Keep prices on disk between runs
+    """
+    global PRICE_CACHE  # pylint: disable=global-statement
+
+    PRICE_CACHE = PriceCache(cache_path, ttl_hours, refresh)
+
+    return PRICE_CACHE
+
+
+def save_price_cache():
+    """
+    Persist prices fetched during this run
+    """
+    if PRICE_CACHE:
+        PRICE_CACHE.save()
 
 
-SESSION = boto3.Session()
+def get_products(service_code, resource_filter):
+    """
+    Price List query, served from the offline index when it covers the region
+    """
+    region = next(
+        item["Value"] for item in resource_filter if item["Field"] == "regionCode"
+    )
+    if PRICE_INDEX and PRICE_INDEX.covers(service_code, region):
+        return PRICE_INDEX.get_products(
+            ServiceCode=service_code, Filters=resource_filter
+        )
+
+    client = get_client("pricing", "us-east-1")
+    return client.get_products(ServiceCode=service_code, Filters=resource_filter)
+
+
+def iter_products(service_code, resource_filter):
+    """
+    All Price List items of a query, following NextToken
+    """
+    region = next(
+        item["Value"] for item in resource_filter if item["Field"] == "regionCode"
+    )
+    if PRICE_INDEX and PRICE_INDEX.covers(service_code, region):
+        yield from PRICE_INDEX.get_products(
+            ServiceCode=service_code, Filters=resource_filter
+        )["PriceList"]
+        return
+
+    client = get_client("pricing", "us-east-1")
+    paginator = client.get_paginator("get_products")
+    for page in paginator.paginate(
+        ServiceCode=service_code,
+        Filters=resource_filter,
+        PaginationConfig={"PageSize": 100},
+    ):
+        yield from page["PriceList"]
 
 
 def engine_filter(resource_filter, instance_engine):
     """
     Filter by engine
     """
-    if instance_engine == "aurora-postgresql":
-        resource_filter.append(
-            {
-                "Type": "TERM_MATCH",
-                "Field": "databaseEngine",
-                "Value": "Aurora PostgreSQL",
-            }
-        )
-    elif instance_engine == "aurora-mysql":
-        resource_filter.append(
-            {
-                "Type": "TERM_MATCH",
-                "Field": "databaseEngine",
-                "Value": "Aurora MySQL",
-            }
-        )
-    elif instance_engine == "mariadb":
-        resource_filter.append(
-            {
-                "Type": "TERM_MATCH",
-                "Field": "databaseEngine",
-                "Value": "MariaDB",
-            }
-        )
-    elif instance_engine == "postgres":
-        resource_filter.append(
-            {
-                "Type": "TERM_MATCH",
-                "Field": "databaseEngine",
-                "Value": "PostgreSQL",
-            }
-        )
-    elif instance_engine == "mysql":
-        resource_filter.append(
-            {
-                "Type": "TERM_MATCH",
-                "Field": "databaseEngine",
-                "Value": "MySQL",
-            }
-        )
-    elif instance_engine == "oracle":
-        resource_filter.append(
-            {
-                "Type": "TERM_MATCH",
-                "Field": "databaseEngine",
-                "Value": "Oracle",
-            }
-        )
-    elif instance_engine == "sqlserver":
+    if instance_engine in ENGINE_NAMES:
         resource_filter.append(
             {
                 "Type": "TERM_MATCH",
                 "Field": "databaseEngine",
-                "Value": "SQL Server",
+                "Value": ENGINE_NAMES[instance_engine],
             }
         )
 
@@ -94,16 +158,12 @@ def storage_filter(resource_filter, instance_storage):
     """
     Filter by storage
     """
-    if instance_storage in ["aurora", "gp2"]:
-        resource_filter.append(
-            {"Type": "TERM_MATCH", "Field": "storage", "Value": "EBS Only"}
-        )
-    elif instance_storage == "aurora-iopt1":
+    if instance_storage in STORAGE_NAMES:
         resource_filter.append(
             {
                 "Type": "TERM_MATCH",
                 "Field": "storage",
-                "Value": "Aurora IO Optimization Mode",
+                "Value": STORAGE_NAMES[instance_storage],
             }
         )
 
@@ -130,231 +190,413 @@ def serverless_filter(resource_filter, instance_class, instance_storage, instanc
     return mp_factor
 
 
-def calculate_on_demand(data, mp_factor):
+def calculate_on_demand(price_list, mp_factor):
     """
     Calculate On-Demand price
     """
 
-    if data.get("PriceList"):
-        od = json.loads(data["PriceList"][0])["terms"]["OnDemand"]
-        id1 = list(od)[0]
-        id2 = list(od[id1]["priceDimensions"])[0]
+    hour_cost = usd_price(price_list[0]) if price_list else None
+    if hour_cost is None:
+        return UNKNOWN
 
-        monthly_cost = (
-            float(od[id1]["priceDimensions"][id2]["pricePerUnit"]["USD"]) * mp_factor
-        )
-    else:
-        return "UNKN"
+    return round(hour_cost * mp_factor, 3)
 
-    return round(monthly_cost, 3)
 
+def single_product(mp_factor):
+    """
+    Price of a query expected to match one product
+    """
 
-def get_rds_price(price_map, instance_config_map, region):
+    def interpret(price_list):
+        if len(price_list) > 1:
+            return MULTIPLE
+        return calculate_on_demand(price_list, mp_factor)
+
+    return interpret
+
+
+def matching_product(matcher, mp_factor):
     """
-    RDS cost query
+    Price of the first product whose usagetype matches
+    """
+
+    def interpret(price_items):
+        hour_cost = first_match(price_items, matcher)
+        return UNKNOWN if hour_cost is None else hour_cost * mp_factor
+
+    return interpret
+
+
+def cached_price(price_map, cost_id, cache_key, fetch):
+    """
+    Price from the process map, then the on-disk cache, then fetch()
+    """
+
+    def load():
+        monthly_cost = PRICE_CACHE.get(cache_key) if PRICE_CACHE else None
+        if monthly_cost is None:
+            monthly_cost = fetch()
+            if PRICE_CACHE:
+                PRICE_CACHE.set(cache_key, monthly_cost)
+        return monthly_cost
+
+    return single_flight(price_map, cost_id, load)
+
+
+def fetch_price(query):
+    """
+    Run a price query
+    """
+    if query.paginate:
+        return query.interpret(iter_products(query.service_code, query.resource_filter))
+
+    data = get_products(query.service_code, query.resource_filter)
+    return query.interpret(data["PriceList"])
+
+
+def resolve_price(price_map, query):
+    """
+    Cached price of a query
     """
-    cost_id = (
-        region
-        + instance_config_map["instance_class"]
-        + instance_config_map["instance_storage"]
-        + str(instance_config_map["instance_az"])
+    return cached_price(
+        price_map, query.cost_id, query.cache_key, lambda: fetch_price(query)
     )
 
-    print(111, cost_id, instance_config_map)
-    if cost_id in price_map.keys():
-        monthly_cost = price_map[cost_id]
-    else:
-        client = SESSION.client("pricing", region_name="us-east-1")
-        resource_filter = [
-            {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"}
-        ]
-        # engine filter
-        engine_filter(resource_filter, instance_config_map["instance_engine"])
-
-        # serverless filter
-        mp_factor = serverless_filter(
-            resource_filter,
-            instance_config_map["instance_class"],
-            instance_config_map["instance_storage"],
-            instance_config_map["instance_az"],
-        )
 
-        data = client.get_products(ServiceCode="AmazonRDS", Filters=resource_filter)
-        if len(data["PriceList"]) > 1:
-            return "MULT"
-        monthly_cost = calculate_on_demand(data, mp_factor)
-        price_map[cost_id] = monthly_cost
+def ec2_cost_id(region, instance, os):
+    """
+    EC2 price key
+    """
+    return f"{region}|{instance}|{os}"
 
-    return monthly_cost
 
+def rds_cost_id(region, engine, instance_class, storage, deployment):
+    """
+    RDS price key, storage None matches any storage
+    """
+    return f"{region}|{engine}|{instance_class}|{storage or '*'}|{deployment}"
 
-def get_ebs_price(price_map, volume_type, region):
+
+def store_prefetched(price_map, kind, cost_ids, price_items):
     """
-    EBS cost query
+    Fill price_map from all region products of a service,
+    cost_ids(price_item) gives the keys a product answers
+    """
+    prices = {}
+    for price_item in price_items:
+        hour_cost = usd_price(price_item)
+        if hour_cost is None:
+            continue
+        for cost_id in cost_ids(price_item):
+            prices.setdefault(cost_id, []).append(round(hour_cost * 730, 3))
+
+    # several products for one key is what the live query reports as MULT
+    monthly_costs = {
+        cost_id: cost_prices[0] if len(cost_prices) == 1 else MULTIPLE
+        for cost_id, cost_prices in prices.items()
+    }
+    store_many(price_map, monthly_costs)
+    if PRICE_CACHE:
+        for cost_id, monthly_cost in monthly_costs.items():
+            PRICE_CACHE.set(f"{kind}|{cost_id}", monthly_cost)
+
+    return len(monthly_costs)
+
+
+def prefetch_prices(price_map, kind, query, cost_ids):
+    """
+    Page through all region products of a prefetch query once
     """
-    cost_id = region + volume_type
-    if cost_id in price_map.keys():
-        monthly_cost = price_map[cost_id]
-    else:
-        client = SESSION.client("pricing", region_name="us-east-1")
-        resource_filter = [
-            {"Field": "volumeApiName", "Value": volume_type, "Type": "TERM_MATCH"},
-            {"Field": "productFamily", "Value": "Storage", "Type": "TERM_MATCH"},
-            {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
-        ]
 
-        data = client.get_products(ServiceCode="AmazonEC2", Filters=resource_filter)
-        if len(data["PriceList"]) > 1:
-            return "MULT"
-        monthly_cost = calculate_on_demand(data, 1)
-        price_map[cost_id] = monthly_cost
+    def load():
+        if PRICE_CACHE and PRICE_CACHE.get(query.cache_key):
+            return True
+        price_items = iter_products(query.service_code, query.resource_filter)
+        count = store_prefetched(price_map, kind, cost_ids, price_items)
+        if PRICE_CACHE:
+            PRICE_CACHE.set(query.cache_key, count)
+        return True
 
-    return monthly_cost
+    single_flight(PREFETCHED, query.cost_id, load)
 
 
-def get_ec2_price(price_map, instance, os, region):
+def prefetched_price(price_map, kind, cost_id):
     """
-    EC2 instances cost query
+    Price a region-wide prefetch stored, UNKNOWN for keys it had no product for
     """
-    cost_id = instance + os
-    if cost_id in price_map.keys():
-        monthly_cost = price_map[cost_id]
-    else:
-        client = SESSION.client("pricing", region_name="us-east-1")
-        resource_filter = [
-            {"Field": "tenancy", "Value": "shared", "Type": "TERM_MATCH"},
-            {"Field": "operatingSystem", "Value": os, "Type": "TERM_MATCH"},
-            {"Field": "preInstalledSw", "Value": "NA", "Type": "TERM_MATCH"},
-            {"Field": "instanceType", "Value": instance, "Type": "TERM_MATCH"},
-            {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
-            {"Field": "capacitystatus", "Value": "Used", "Type": "TERM_MATCH"},
-        ]
+    monthly_cost = price_map.get(cost_id)
+    if monthly_cost is None and PRICE_CACHE:
+        monthly_cost = PRICE_CACHE.get(f"{kind}|{cost_id}")
+
+    return UNKNOWN if monthly_cost is None else monthly_cost
+
 
-        if os == "Windows":
-            resource_filter.append(
-                {
-                    "Field": "licenseModel",
-                    "Value": "No License required",
-                    "Type": "TERM_MATCH",
-                }
+def ec2_prefetch_query(region):
+    """
+    Region-wide EC2 instance prices query and the keys a product answers
+    """
+    resource_filter = [
+        {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
+        {"Field": "productFamily", "Value": "Compute Instance", "Type": "TERM_MATCH"},
+        {"Field": "tenancy", "Value": "shared", "Type": "TERM_MATCH"},
+        {"Field": "preInstalledSw", "Value": "NA", "Type": "TERM_MATCH"},
+        {"Field": "capacitystatus", "Value": "Used", "Type": "TERM_MATCH"},
+        {
+            "Field": "licenseModel",
+            "Value": "No License required",
+            "Type": "TERM_MATCH",
+        },
+    ]
+
+    def cost_ids(price_item):
+        return [
+            ec2_cost_id(
+                region,
+                attribute(price_item, "instanceType"),
+                attribute(price_item, "operatingSystem"),
             )
+        ]
 
-        data = client.get_products(ServiceCode="AmazonEC2", Filters=resource_filter)
-        if len(data["PriceList"]) > 1:
-            return "MULT"
-        monthly_cost = calculate_on_demand(data, 730)
-        price_map[cost_id] = monthly_cost
+    marker = f"prefetch|ec2|{region}"
+    query = PriceQuery(marker, marker, "AmazonEC2", resource_filter, True, None)
+    return "ec2", query, cost_ids
+
+
+def rds_prefetch_query(region):
+    """
+    Region-wide RDS instance prices query and the keys a product answers
+    """
+    resource_filter = [
+        {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
+        {"Field": "productFamily", "Value": "Database Instance", "Type": "TERM_MATCH"},
+    ]
 
-    return monthly_cost
+    def cost_ids(price_item):
+        key = [
+            region,
+            attribute(price_item, "databaseEngine"),
+            attribute(price_item, "instanceType"),
+        ]
+        deployment = attribute(price_item, "deploymentOption")
+        return [
+            rds_cost_id(*key, attribute(price_item, "storage"), deployment),
+            rds_cost_id(*key, None, deployment),
+        ]
 
+    marker = f"prefetch|rds|{region}"
+    query = PriceQuery(marker, marker, "AmazonRDS", resource_filter, True, None)
+    return "rds", query, cost_ids
 
-def get_snapshot_price(snapshot_price, snapshot_tier, snapshot_size, region):
+
+def prefetch_ec2_prices(price_map, region):
     """
-    EC2 snapshots cost query
+    Region-wide EC2 instance prices
     """
+    prefetch_prices(price_map, *ec2_prefetch_query(region))
 
-    gb_cost = "UNKN"
-    monthly_cost = "UNKN"
 
-    if snapshot_tier in snapshot_price.keys():
-        gb_cost = snapshot_price[snapshot_tier]
-        monthly_cost = gb_cost * snapshot_size
-        return gb_cost, monthly_cost
+def prefetch_rds_prices(price_map, region):
+    """
+    Region-wide RDS instance prices
+    """
+    prefetch_prices(price_map, *rds_prefetch_query(region))
 
-    if snapshot_tier not in ["archive", "standard"]:
-        return gb_cost, monthly_cost
 
-    client = SESSION.client("pricing", region_name="us-east-1")
+def rds_price_query(instance_config_map, region):
+    """
+    RDS cost query
+    """
+    cost_id = rds_cost_id(
+        region,
+        ENGINE_NAMES.get(instance_config_map["instance_engine"]),
+        instance_config_map["instance_class"],
+        STORAGE_NAMES.get(instance_config_map["instance_storage"]),
+        "Multi-AZ" if instance_config_map["instance_az"] else "Single-AZ",
+    )
+
+    resource_filter = [{"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"}]
+    # engine filter
+    engine_filter(resource_filter, instance_config_map["instance_engine"])
+
+    # serverless filter
+    mp_factor = serverless_filter(
+        resource_filter,
+        instance_config_map["instance_class"],
+        instance_config_map["instance_storage"],
+        instance_config_map["instance_az"],
+    )
+
+    return PriceQuery(
+        cost_id,
+        f"rds|{cost_id}",
+        "AmazonRDS",
+        resource_filter,
+        False,
+        single_product(mp_factor),
+    )
+
 
+def ebs_price_query(volume_type, region):
+    """
+    EBS cost query
+    """
+    cost_id = region + volume_type
     resource_filter = [
-        {"Field": "productFamily", "Value": "Storage Snapshot", "Type": "TERM_MATCH"},
+        {"Field": "volumeApiName", "Value": volume_type, "Type": "TERM_MATCH"},
+        {"Field": "productFamily", "Value": "Storage", "Type": "TERM_MATCH"},
+        {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
+    ]
+
+    return PriceQuery(
+        cost_id,
+        f"ebs|{cost_id}",
+        "AmazonEC2",
+        resource_filter,
+        False,
+        single_product(1),
+    )
+
+
+def ec2_price_query(instance, os, region):
+    """
+    EC2 instances cost query
+    """
+    cost_id = ec2_cost_id(region, instance, os)
+    resource_filter = [
+        {"Field": "tenancy", "Value": "shared", "Type": "TERM_MATCH"},
+        {"Field": "operatingSystem", "Value": os, "Type": "TERM_MATCH"},
+        {"Field": "preInstalledSw", "Value": "NA", "Type": "TERM_MATCH"},
+        {"Field": "instanceType", "Value": instance, "Type": "TERM_MATCH"},
         {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
+        {"Field": "capacitystatus", "Value": "Used", "Type": "TERM_MATCH"},
     ]
 
-    data = client.get_products(ServiceCode="AmazonEC2", Filters=resource_filter)
+    if os == "Windows":
+        resource_filter.append(
+            {
+                "Field": "licenseModel",
+                "Value": "No License required",
+                "Type": "TERM_MATCH",
+            }
+        )
 
-    usagetype = (
-        "SnapshotArchiveStorage" if snapshot_tier == "archive" else "SnapshotUsage"
+    return PriceQuery(
+        cost_id,
+        f"ec2|{cost_id}",
+        "AmazonEC2",
+        resource_filter,
+        False,
+        single_product(730),
     )
 
-    for unit in data["PriceList"]:
-        unit = json.loads(unit)
-        od = unit["terms"]["OnDemand"]
-        id1 = list(od)[0]
-        id2 = list(od[id1]["priceDimensions"])[0]
 
-        if re.match(f".*{usagetype}$", unit["product"]["attributes"]["usagetype"]):
-            gb_cost = float(od[id1]["priceDimensions"][id2]["pricePerUnit"]["USD"])
-            snapshot_price[snapshot_tier] = gb_cost
-            monthly_cost = gb_cost * snapshot_size
+def snapshot_price_query(snapshot_tier, region):
+    """
+    EC2 snapshots cost query, None for tiers without a price
+    """
+    if snapshot_tier not in ["archive", "standard"]:
+        return None
 
-    return gb_cost, monthly_cost
+    cost_id = region + snapshot_tier
+    resource_filter = [
+        {"Field": "productFamily", "Value": "Storage Snapshot", "Type": "TERM_MATCH"},
+        {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
+    ]
+    matcher = SNAPSHOT_ARCHIVE_USAGE if snapshot_tier == "archive" else SNAPSHOT_USAGE
+
+    return PriceQuery(
+        cost_id,
+        f"snapshot|{cost_id}",
+        "AmazonEC2",
+        resource_filter,
+        True,
+        matching_product(matcher, 1),
+    )
 
 
-def get_load_balancer_price(price_map, region, lb_type):
+def load_balancer_price_query(region, lb_type):
     """
     Load Balancer cost query
     """
     cost_id = region + lb_type
-    if cost_id in price_map.keys():
-        monthly_cost = price_map[cost_id]
-    else:
-        client = SESSION.client("pricing", region_name="us-east-1")
+    resource_filter = [
+        {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
+        {"Field": "productFamily", "Value": "Load Balancer", "Type": "TERM_MATCH"},
+    ]
 
-        resource_filter = [
-            {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
-            {"Field": "productFamily", "Value": "Load Balancer", "Type": "TERM_MATCH"},
-        ]
+    return PriceQuery(
+        cost_id,
+        f"lb|{cost_id}",
+        "AmazonEC2",
+        resource_filter,
+        True,
+        matching_product(LOAD_BALANCER_USAGE, 730),
+    )
+
+
+def log_group_price_query(region):
+    """
+    Log group storage costs query
+    """
+    cost_id = region
+    resource_filter = [
+        {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
+        {"Field": "productFamily", "Value": "Storage Snapshot", "Type": "TERM_MATCH"},
+    ]
 
-        data = client.get_products(ServiceCode="AmazonEC2", Filters=resource_filter)
-        monthly_cost = "UNKN"
-        for price_item in data["PriceList"]:
-            unit = json.loads(price_item)
-            usage_type = unit["product"]["attributes"]["usagetype"]
-            if re.match(f".*LoadBalancerUsage", usage_type):
-                od = unit["terms"]["OnDemand"]
-                id1 = list(od)[0]
-                id2 = list(od[id1]["priceDimensions"])[0]
-                monthly_cost = 730 * float(
-                    od[id1]["priceDimensions"][id2]["pricePerUnit"]["USD"]
-                )
-                return monthly_cost
+    return PriceQuery(
+        cost_id,
+        f"logs|{cost_id}",
+        "AmazonCloudWatch",
+        resource_filter,
+        True,
+        matching_product(LOG_STORAGE_USAGE, 1),
+    )
+
+
+def get_rds_price(price_map, instance_config_map, region):
+    """
+    RDS cost query
+    """
+    return resolve_price(price_map, rds_price_query(instance_config_map, region))
 
-    return monthly_cost
+
+def get_ebs_price(price_map, volume_type, region):
+    """
+    EBS cost query
+    """
+    return resolve_price(price_map, ebs_price_query(volume_type, region))
+
+
+def get_ec2_price(price_map, instance, os, region):
+    """
+    EC2 instances cost query
+    """
+    return resolve_price(price_map, ec2_price_query(instance, os, region))
+
+
+def get_snapshot_price(snapshot_price, snapshot_tier, snapshot_size, region):
+    """
+    EC2 snapshots (GB, monthly) cost query
+    """
+    query = snapshot_price_query(snapshot_tier, region)
+    if not query:
+        return UNKNOWN, UNKNOWN
+
+    gb_cost = resolve_price(snapshot_price, query)
+
+    return gb_cost, scaled(gb_cost, snapshot_size, 2)
+
+
+def get_load_balancer_price(price_map, region, lb_type):
+    """
+    Load Balancer cost query
+    """
+    return resolve_price(price_map, load_balancer_price_query(region, lb_type))
 
 
 def get_log_group_storage_costs(price_map, region):
     """
     Log group storage costs query
     """
-    cost_id = region
-    if cost_id in price_map.keys():
-        monthly_cost = price_map[cost_id]
-    else:
-        client = SESSION.client("pricing", region_name="us-east-1")
-        resource_filter = [
-            {"Field": "regionCode", "Value": region, "Type": "TERM_MATCH"},
-            {
-                "Field": "productFamily",
-                "Value": "Storage Snapshot",
-                "Type": "TERM_MATCH",
-            },
-        ]
-
-        data = client.get_products(
-            ServiceCode="AmazonCloudWatch", Filters=resource_filter
-        )
-        monthly_cost = "UNKN"
-        for price_item in data["PriceList"]:
-            unit = json.loads(price_item)
-            usage_type = unit["product"]["attributes"]["usagetype"]
-            if re.match(f".*TimedStorage-ByteHrs", usage_type):
-                od = unit["terms"]["OnDemand"]
-                id1 = list(od)[0]
-                id2 = list(od[id1]["priceDimensions"])[0]
-                monthly_cost = float(
-                    od[id1]["priceDimensions"][id2]["pricePerUnit"]["USD"]
-                )
-                return monthly_cost
-
-    return monthly_cost
+    return resolve_price(price_map, log_group_price_query(region))
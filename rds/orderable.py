@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+RDS orderable options index
+
+One paginated describe_orderable_db_instance_options sweep per region, engine
+and engine version, kept on disk, tells which classes can be ordered with
+which storage types and whether they can run Multi-AZ
+"""
+import os
+import json
+import time
+from common.memo import single_flight
+
+# bump when the index entry format changes, older files are swept again
+INDEX_VERSION = 1
+INDEX_DIR = "~/.cache/costs-optimizer/rds-orderable"
+TTL_HOURS = 168
+INDEXES = {}
+
+
+def configure_orderable(index_dir=INDEX_DIR, ttl_hours=168):
+    """
+    Directory indexes are kept in, empty to sweep every run, and their TTL
+    """
+    global INDEX_DIR, TTL_HOURS  # pylint: disable=global-statement
+
+    INDEX_DIR = index_dir
+    TTL_HOURS = ttl_hours
+
+
+def build_index(options):
+    """
+    {class: {"storage_types": [...], "multi_az": bool}} of
+    describe_orderable_db_instance_options items, one item per class,
+    storage type and availability zone set
+    """
+    index = {}
+    for option in options:
+        entry = index.setdefault(
+            option["DBInstanceClass"], {"storage_types": [], "multi_az": False}
+        )
+        storage_type = option.get("StorageType")
+        if storage_type and storage_type not in entry["storage_types"]:
+            entry["storage_types"].append(storage_type)
+        entry["multi_az"] = entry["multi_az"] or option.get("MultiAZCapable", False)
+
+    return index
+
+
+def index_path(region, engine, engine_version):
+    """
+    On-disk index of a region, engine and engine version
+    """
+    return os.path.join(
+        os.path.expanduser(INDEX_DIR), region, f"{engine}-{engine_version}.json"
+    )
+
+
+def read_index(region, engine, engine_version):
+    """
+    Index on disk, None when missing, expired or of another version
+    """
+    path = index_path(region, engine, engine_version)
+    if not INDEX_DIR or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as index_file:
+            content = json.load(index_file)
+    except (OSError, ValueError):
+        return None
+    if content.get("version") != INDEX_VERSION:
+        return None
+    if time.time() - content.get("fetched_at", 0) >= TTL_HOURS * 3600:
+        return None
+
+    return content.get("classes")
+
+
+def write_index(region, engine, engine_version, index):
+    """
+    Keep the index of a region, engine and engine version on disk
+    """
+    if not INDEX_DIR:
+        return
+
+    path = index_path(region, engine, engine_version)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as index_file:
+        json.dump(
+            {"version": INDEX_VERSION, "fetched_at": time.time(), "classes": index},
+            index_file,
+        )
+    os.replace(temp_path, path)
+
+
+def orderable_index(client, engine, engine_version):
+    """
+    Orderable classes of an engine version in the region of an RDS client
+    """
+    region = client.meta.region_name
+
+    def load():
+        index = read_index(region, engine, engine_version)
+        if index is None:
+            paginator = client.get_paginator("describe_orderable_db_instance_options")
+            index = build_index(
+                option
+                for page in paginator.paginate(
+                    Engine=engine,
+                    EngineVersion=engine_version,
+                    PaginationConfig={"PageSize": 1000},
+                )
+                for option in page["OrderableDBInstanceOptions"]
+            )
+            write_index(region, engine, engine_version, index)
+        return index
+
+    return single_flight(INDEXES, (region, engine, engine_version), load)
+
+
+def is_orderable(index, instance_class, storage_type, multi_az):
+    """
+    Class orderable with a storage type, and Multi-AZ when asked for
+    """
+    entry = index.get(instance_class)
+    if not entry:
+        return False
+    if entry["storage_types"] and storage_type not in entry["storage_types"]:
+        return False
+
+    return entry["multi_az"] or not multi_az
@@ -2,250 +2,369 @@
 """
 RDS scanner
 """
-import re
+from typing import NamedTuple
 from datetime import datetime, timedelta
-import boto3
-from pricing.price import get_rds_price
+from pricing.price import (
+    get_rds_price,
+    prefetch_rds_prices,
+    prefetched_price,
+    rds_price_query,
+)
+from aws.clients import get_client
+from common.memo import single_flight
+from common.records import NOT_AVAILABLE
+from common.state import StateBatch
+from cloudwatch.metrics import MetricBatch
+from cloudwatch.stats import series_stats, stat_fields, STAT_COLUMNS, STAT_TYPES
+from rds.orderable import orderable_index, is_orderable
+from ec2.catalog import instance_catalog, type_shape
+from rightsizing.engine import CandidateTable, SizingBatch
 
-SESSION = boto3.Session()
 RDS_PRICE_MAP = {}
-AVAILABLE_INSTANCE_TYPES = set()
+CANDIDATE_TABLES = {}
+IDLE_CPU = 5
 END_TIME = datetime.now()
 START_TIME = END_TIME - timedelta(days=30)
+TABLE_HEAD = [
+    "ClusterId (crop 20)",
+    "Writer",
+    "InstanceId (crop 20)",
+    "MultiAZ",
+    "Engine",
+    "Engine Version",
+    "Class",
+    "Price",
+    "Price unit",
+    "Candidate",
+    "Candidate price",
+    "Saving",
+    "Status",
+    *[f"30 days CPU {column}" for column in STAT_COLUMNS],
+    "Connections",
+]
+CPU_FIELDS = stat_fields("cpu")
+RdsRow = NamedTuple(
+    "RdsRow",
+    [
+        ("cluster_id", str),
+        ("writer", bool),
+        ("instance_id", str),
+        ("multi_az", bool),
+        ("engine", str),
+        ("engine_version", str),
+        ("instance_class", str),
+        ("price", float),
+        ("price_unit", str),
+        ("candidate_class", str),
+        ("candidate_price", float),
+        ("saving", float),
+        ("status", str),
+        *zip(CPU_FIELDS, STAT_TYPES),
+        ("connections", int),
+    ],
+)
+
+
+def class_shape(catalog, instance_class):
+    """
+    (vcpus, memory, burstable) of the EC2 type an RDS class runs on
+    """
+    return type_shape(catalog.get(instance_class.removeprefix("db.")))
 
 
-def check_instance_type(client, cluster_engine, recommended_instance):
+def candidate_table(client, ec2_client, region, key):
     """
-    RDS type existence
+    Classes orderable for the engine version, storage type and Multi-AZ of a
+    table_key(), priced likewise
     """
-    result = False
+    engine, engine_version, storage, multi_az = key
+
+    def build():
+        prefetch_rds_prices(RDS_PRICE_MAP, region)
+        catalog = instance_catalog(ec2_client)
+        index = orderable_index(client, engine, engine_version)
+        candidates = []
+        for instance_class in index:
+            shape = class_shape(catalog, instance_class)
+            if not shape or not is_orderable(index, instance_class, storage, multi_az):
+                continue
+            query = rds_price_query(
+                {
+                    "instance_engine": engine,
+                    "instance_class": instance_class,
+                    "instance_storage": storage,
+                    "instance_az": multi_az,
+                },
+                region,
+            )
+            candidates.append(
+                (
+                    instance_class,
+                    shape[0],
+                    shape[1],
+                    None,
+                    shape[2],
+                    prefetched_price(RDS_PRICE_MAP, "rds", query.cost_id),
+                )
+            )
+        return CandidateTable(candidates)
 
-    if recommended_instance not in AVAILABLE_INSTANCE_TYPES:
-        describe_result = client.describe_orderable_db_instance_options(
-            Engine=cluster_engine, DBInstanceClass=recommended_instance
-        )
-        if describe_result["OrderableDBInstanceOptions"]:
-            result = True
+    return single_flight(CANDIDATE_TABLES, (region, *key), build)
+
+
+def table_key(instance_config_map):
+    """
+    Candidate table of an instance, besides its region
+    """
+    return (
+        instance_config_map["instance_engine"],
+        instance_config_map["instance_engine_version"],
+        instance_config_map["instance_storage"],
+        instance_config_map["instance_az"],
+    )
+
+
+def check_rds_connection(data_points):
+    """
+    RDS connections check
+    """
+    if len(data_points):
+        max_usage = max(data_points)
     else:
-        result = True
+        max_usage = 0
 
-    return result
+    return int(max_usage)
 
 
-def check_recommendation(client, cluster_engine, instance_class):
+def cluster_members(clusters):
     """
-    RDS recommendation check
+    {instance id: cluster} of cluster members
     """
-    instance_kind = instance_class.split(".")[1]
-    instance_size = instance_class.split(".")[2]
-    instance_type = instance_kind[0]
-    instance_generation = instance_kind[1::]
-    instance_recommendation = False
+    clustered_instances = {}
+    for cluster in clusters:
+        cluster_id = cluster["DBClusterIdentifier"]
+        for cluster_member in cluster["DBClusterMembers"]:
+            instance_id = cluster_member["DBInstanceIdentifier"]
+            instance_writer = cluster_member["IsClusterWriter"]
+
+            clustered_instances[instance_id] = {
+                "id": cluster_id,
+                "is_writer": instance_writer,
+            }
 
-    if re.match("^t", instance_type):
-        if instance_generation in ["2", "3"]:
-            recommended_instance = f"db.{instance_type}"
-            recommended_instance += f"4g.{instance_size}"
-            if (
-                check_instance_type(client, cluster_engine, recommended_instance)
-                and recommended_instance != instance_class
-            ):
-                AVAILABLE_INSTANCE_TYPES.add(recommended_instance)
-                instance_recommendation = recommended_instance
+    return clustered_instances
 
-    elif re.match("^m|^r", instance_type):
-        if re.match("^2|^3|^4|^5|^6", instance_generation):
-            recommended_instance = f"db.{instance_type}"
-            recommended_instance += f"6g.{instance_size}"
-            if (
-                check_instance_type(client, cluster_engine, recommended_instance)
-                and recommended_instance != instance_class
-            ):
-                AVAILABLE_INSTANCE_TYPES.add(recommended_instance)
-                instance_recommendation = recommended_instance
 
-    return instance_recommendation
+def instance_config(instance):
+    """
+    RDS instance pricing and orderability attributes
+    """
+    return {
+        "instance_engine": instance["Engine"],
+        "instance_engine_version": instance["EngineVersion"],
+        "instance_class": instance["DBInstanceClass"],
+        "instance_storage": instance["StorageType"],
+        "instance_az": instance["MultiAZ"],
+    }
 
 
-def check_rds_connection(cloudwatch_client, instance_id):
+def instance_attributes(instance, clustered_instances):
     """
-    RDS connections check
+    RDS attributes a row is built from
+    """
+    return [
+        instance_config(instance),
+        instance["EngineVersion"],
+        instance["DBInstanceStatus"],
+        clustered_instances.get(instance["DBInstanceIdentifier"]),
+    ]
+
+
+def rds_state(region, instances, clustered_instances):
+    """
+    Stored rows of a page of instances
     """
-    response = cloudwatch_client.get_metric_statistics(
-        Namespace="AWS/RDS",
-        MetricName="DatabaseConnections",
-        Dimensions=[
-            {"Name": "DBInstanceIdentifier", "Value": instance_id},
-        ],
-        StartTime=START_TIME,
-        EndTime=END_TIME,
-        Period=3600,
-        Statistics=["Maximum"],
+    state_batch = StateBatch("rds", region, RdsRow)
+    state_batch.load(
+        (
+            instance["DBInstanceIdentifier"],
+            instance_attributes(instance, clustered_instances),
+        )
+        for instance in instances
     )
 
-    data_points = response["Datapoints"]
-    if len(data_points):
-        max_usage = max(data_point["Maximum"] for data_point in data_points)
-    else:
-        max_usage = 0
+    return state_batch
 
-    return int(max_usage)
+
+def rds_rows(
+    region,
+    ec2_client,
+    clustered_instances,
+    instances,
+    metric_batch,
+    state_batch,
+    sizing_batch,
+):  # pylint: disable=too-many-arguments,too-many-positional-arguments
+    """
+    RDS rows and {instance id: row index} of available instances, whose series
+    are added to metric_batch and which are right-sized by sizing_batch;
+    unchanged instances come from state_batch
+    """
+    catalog = instance_catalog(ec2_client)
+    table_data = []
+    available_instances = {}
+
+    for instance in instances:
+        instance_id = instance["DBInstanceIdentifier"]
+        stored_row = state_batch.row(instance_id)
+        if stored_row:
+            table_data.append(stored_row)
+            continue
+
+        instance_class = instance["DBInstanceClass"]
+        instance_status = instance["DBInstanceStatus"]
+        instance_config_map = instance_config(instance)
+
+        in_cluster = clustered_instances.get(instance_id)
+        if in_cluster:
+            cluster_member = in_cluster["id"][-20::]
+            cluster_writer = in_cluster["is_writer"]
+        else:
+            cluster_member = cluster_writer = NOT_AVAILABLE
+
+        current_node_price = get_rds_price(
+            RDS_PRICE_MAP,
+            instance_config_map,
+            region,
+        )
+        if instance_class == "db.serverless":
+            price_unit = "ACU-hour"
+        else:
+            price_unit = "month"
+            sizing_batch.add(
+                table_key(instance_config_map),
+                len(table_data),
+                instance_class,
+                class_shape(catalog, instance_class),
+                current_node_price,
+            )
+
+        if instance_status == "available":
+            dimensions = [{"Name": "DBInstanceIdentifier", "Value": instance_id}]
+            metric_batch.add(
+                instance_id, "AWS/RDS", "CPUUtilization", dimensions, "Average"
+            )
+            metric_batch.add(
+                instance_id, "AWS/RDS", "DatabaseConnections", dimensions, "Maximum"
+            )
+            available_instances[instance_id] = len(table_data)
+
+        state_batch.add(instance_id, len(table_data))
+        table_data.append(
+            RdsRow(
+                cluster_member,
+                cluster_writer,
+                instance_id[-20::],
+                instance["MultiAZ"],
+                instance["Engine"],
+                instance["EngineVersion"],
+                instance_class,
+                current_node_price,
+                price_unit,
+                *[NOT_AVAILABLE] * 3,
+                instance_status,
+                *[NOT_AVAILABLE] * (len(CPU_FIELDS) + 1),
+            )
+        )
+
+    return table_data, available_instances
 
 
-def check_rds_utilization(cloudwatch_client, instance_id):
+def apply_rds_metrics(metrics, table_data, available_instances, sizing_batch):
     """
-    RDS utilization check
+    CPU statistics and connections of available instances, their CPU peaks
+    are handed to sizing_batch
     """
-    response = cloudwatch_client.get_metric_statistics(
-        Namespace="AWS/RDS",
-        MetricName="CPUUtilization",
-        Dimensions=[
-            {"Name": "DBInstanceIdentifier", "Value": instance_id},
-        ],
-        StartTime=START_TIME,
-        EndTime=END_TIME,
-        Period=3600,
-        Statistics=["Average"],
+    stats = series_stats(
+        [metrics[instance_id]["CPUUtilization"] for instance_id in available_instances],
+        IDLE_CPU,
     )
+    for instance_id, instance_stats in zip(available_instances, stats):
+        row_index = available_instances[instance_id]
+        row = table_data[row_index]._replace(**dict(zip(CPU_FIELDS, instance_stats)))
+        if metrics[instance_id]["CPUUtilization"]:
+            sizing_batch.peak(row_index, row.cpu_max)
+        connections = check_rds_connection(metrics[instance_id]["DatabaseConnections"])
+        if connections == 0:
+            row = row._replace(
+                candidate_class="delete node", candidate_price=0, saving=row.price
+            )
+        table_data[row_index] = row._replace(connections=connections)
 
-    data_points = response["Datapoints"]
-    total_usage = sum(data_point["Average"] for data_point in data_points)
-    if len(data_points):
-        average_usage = total_usage / len(data_points)
-        max_usage = max(data_point["Average"] for data_point in data_points)
-        min_usage = min(data_point["Average"] for data_point in data_points)
-    else:
-        average_usage = 0
-        max_usage = 0
-        min_usage = 0
 
-    return f"AVG: {round(average_usage, 2)}, MAX: {round(max_usage, 2)}, MIN: {round(min_usage, 2)}"
+def apply_rds_rightsizing(region, client, ec2_client, table_data, sizing_batch):
+    """
+    Cheapest candidate classes of the rows of a page, nodes without
+    connections keep their delete suggestion
+    """
+
+    def table(key):
+        return candidate_table(client, ec2_client, region, key)
+
+    for row_index, replacement in sizing_batch.recommend(table).items():
+        if table_data[row_index].connections == 0:
+            continue
+        table_data[row_index] = table_data[row_index]._replace(
+            **dict(zip(["candidate_class", "candidate_price", "saving"], replacement))
+        )
 
 
 def query_rds(region):
     """
     RDS entry point
     """
-    # pylint: disable=too-many-locals,too-many-branches,too-many-statements
     print(f"\n\n✨  Running in RDS mode {region}")
+    prefetch_rds_prices(RDS_PRICE_MAP, region)
 
-    client = SESSION.client("rds", region_name=region)
-    cloudwatch_client = SESSION.client("cloudwatch", region_name=region)
+    client = get_client("rds", region)
 
     c_paginator = client.get_paginator("describe_db_clusters")
     c_page_iterator = c_paginator.paginate()
     i_paginator = client.get_paginator("describe_db_instances")
     i_page_iterator = i_paginator.paginate()
 
-    table_head = [
-        "ClusterId (crop 20)",
-        "Writer",
-        "InstanceId (crop 20)",
-        "MultiAZ",
-        "Engine",
-        "Engine Version",
-        "Current",
-        "Future",
-        "30 days CPU load",
-        "Connections",
-    ]
-    table_data = []
-    clustered_instances = {}
-
-    for page in c_page_iterator:
-        for cluster in page["DBClusters"]:
-            cluster_id = cluster["DBClusterIdentifier"]
-            cluster_members = cluster["DBClusterMembers"]
-
-            for cluster_member in cluster_members:
-                instance_id = cluster_member["DBInstanceIdentifier"]
-                instance_writer = cluster_member["IsClusterWriter"]
+    return TABLE_HEAD, rds_page_rows(region, client, c_page_iterator, i_page_iterator)
 
-                clustered_instances[instance_id] = {
-                    "id": cluster_id,
-                    "is_writer": instance_writer,
-                }
 
+def rds_page_rows(region, client, c_page_iterator, i_page_iterator):
+    """
+    Rows of every describe_db_instances page, yielded once its metrics are in
+    """
+    cloudwatch_client = get_client("cloudwatch", region)
+    ec2_client = get_client("ec2", region)
+    clustered_instances = cluster_members(
+        cluster for page in c_page_iterator for cluster in page["DBClusters"]
+    )
     for page in i_page_iterator:
-        for instance in page["DBInstances"]:
-            instance_id = instance["DBInstanceIdentifier"]
-            instance_engine = instance["Engine"]
-            instance_engine_version = instance["EngineVersion"]
-            instance_class = instance["DBInstanceClass"]
-
-            instance_class = instance["DBInstanceClass"]
-            instance_storage = instance["StorageType"]
-            instance_status = instance["DBInstanceStatus"]
-            instance_az = instance["MultiAZ"]
-
-            instance_config_map = {
-                "instance_engine": instance_engine,
-                "instance_class": instance_class,
-                "instance_storage": instance_storage,
-                "instance_az": instance_az,
-            }
-
-            in_cluster = clustered_instances.get(instance_id)
-            if in_cluster:
-                cluster_member = in_cluster["id"]
-                cluster_writer = in_cluster["is_writer"]
-                cluster_data = [
-                    cluster_member[-20::],
-                    cluster_writer,
-                ]
-            else:
-                cluster_data = ["N/A", "N/A"]
-
-            cluster_data.append(instance_id[-20::])
-            cluster_data.append(instance_az)
-            cluster_data.append(instance_engine)
-            cluster_data.append(instance_engine_version)
-
-            current_node_price = get_rds_price(
-                RDS_PRICE_MAP,
-                instance_config_map,
-                region,
-            )
-            if instance_class == "db.serverless":
-                current_node_price = f"{current_node_price}/1ACU"
-                cluster_data.append(current_node_price)
-                cluster_data.append("N/A")
-            else:
-                cluster_data.append(f"{instance_class} {current_node_price}")
-                instance_replacement = check_recommendation(
-                    client, instance_engine, instance_class
-                )
-                if instance_replacement:
-                    instance_config_map["instance_class"] = instance_replacement
-                    future_node_price = get_rds_price(
-                        RDS_PRICE_MAP,
-                        instance_config_map,
-                        region,
-                    )
-                    if isinstance(current_node_price, str) or isinstance(
-                        future_node_price, str
-                    ):
-                        cluster_data.append("N/A")
-                    else:
-                        saving = round((current_node_price - future_node_price), 2)
-                        cluster_data.append(
-                            f"{instance_replacement} {future_node_price} (save:{saving})"
-                        )
-                else:
-                    cluster_data.append("N/A")
-
-            if instance_status == "available":
-                cluster_data.append(
-                    check_rds_utilization(cloudwatch_client, instance_id)
-                )
-                connections = check_rds_connection(cloudwatch_client, instance_id)
-                if connections == 0:
-                    cluster_data[7] = f"delete node (save:{current_node_price})"
-                cluster_data.append(connections)
-            else:
-                cluster_data.append(instance_status)
-                cluster_data.append(instance_status)
-
-            table_data.append(cluster_data)
-
-    return table_head, table_data
+        instances = page["DBInstances"]
+        state_batch = rds_state(region, instances, clustered_instances)
+        metric_batch = MetricBatch(region, START_TIME, END_TIME)
+        sizing_batch = SizingBatch()
+        table_data, available_instances = rds_rows(
+            region,
+            ec2_client,
+            clustered_instances,
+            instances,
+            metric_batch,
+            state_batch,
+            sizing_batch,
+        )
+        apply_rds_metrics(
+            metric_batch.fetch(cloudwatch_client),
+            table_data,
+            available_instances,
+            sizing_batch,
+        )
+        apply_rds_rightsizing(region, client, ec2_client, table_data, sizing_batch)
+        state_batch.save(table_data)
+        yield from table_data
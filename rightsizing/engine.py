@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Price-ranked right-sizing
+
+The candidate types of a region are the columns of one table (vCPUs, memory,
+architecture, burstable, monthly price) sorted by price. A page of instances
+is compared against every column at once and each instance gets the cheapest
+candidate that runs its observed CPU peak under the target utilization with
+at least its memory
+"""
+import numpy as np
+from common.records import NOT_AVAILABLE, is_missing, difference
+
+# CPU peak a candidate may run at, in percent of its vCPUs
+TARGET_UTILIZATION = 80
+# instances compared at once, bounds the instances x candidates masks
+CHUNK_SIZE = 4096
+
+
+def configure_rightsizing(target_utilization=80):
+    """
+    CPU peak in percent of the candidate vCPUs a recommendation may run at
+    """
+    global TARGET_UTILIZATION  # pylint: disable=global-statement
+
+    TARGET_UTILIZATION = target_utilization
+
+
+class CandidateTable:
+    """
+    Candidate types of a region, sorted by monthly price
+    """
+
+    def __init__(self, candidates):
+        """
+        candidates are (type, vcpus, memory, architecture, burstable, price),
+        the ones without a price are dropped
+        """
+        candidates = sorted(
+            (candidate for candidate in candidates if not is_missing(candidate[5])),
+            key=lambda candidate: candidate[5],
+        )
+        self.types = [candidate[0] for candidate in candidates]
+        self.columns = {kind: column for column, kind in enumerate(self.types)}
+        self.vcpus = np.array([candidate[1] for candidate in candidates], dtype=float)
+        self.memory = np.array([candidate[2] for candidate in candidates], dtype=float)
+        self.architectures = np.array([candidate[3] for candidate in candidates])
+        self.burstable = np.array(
+            [candidate[4] for candidate in candidates], dtype=bool
+        )
+        self.prices = np.array([candidate[5] for candidate in candidates], dtype=float)
+
+    def __len__(self):
+        return len(self.types)
+
+    def cheapest(self, instances, architecture=None):
+        """
+        Column of the cheapest fitting candidate of every instance, -1 when
+        none fits; instances are arrays of vcpus, memory, burstable, CPU peak
+        (NaN keeps the vCPUs), price (NaN takes any price) and current column
+        """
+        vcpus, memory, burstable, peaks, prices, current = instances
+        chosen = np.full(len(vcpus), -1)
+        if not len(self):
+            return chosen
+
+        needed = np.where(np.isnan(peaks), vcpus, vcpus * peaks / TARGET_UTILIZATION)
+        ceiling = np.where(np.isnan(prices), np.inf, prices)
+        allowed = np.ones(len(self), dtype=bool)
+        if architecture:
+            allowed = self.architectures == architecture
+        positions = np.arange(len(self))
+
+        for start in range(0, len(vcpus), CHUNK_SIZE):
+            rows = slice(start, start + CHUNK_SIZE)
+            fits = (
+                allowed
+                & (self.vcpus >= needed[rows, None])
+                & (self.memory >= memory[rows, None])
+                & (self.prices < ceiling[rows, None])
+                & (burstable[rows, None] | ~self.burstable)
+                & (positions != current[rows, None])
+            )
+            # columns are sorted by price, the first fitting one is the cheapest
+            chosen[rows] = np.where(fits.any(axis=1), fits.argmax(axis=1), -1)
+
+        return chosen
+
+
+class SizingBatch:
+    """
+    Instances of a scanner page, right-sized together once their CPU peaks
+    are in
+    """
+
+    def __init__(self):
+        self.instances = {}
+        self.peaks = {}
+
+    def add(self, table_key, row_index, instance_type, shape, price):
+        """
+        Instance of a row, compared against the candidate table of table_key;
+        shape is (vcpus, memory, burstable) of its type, None when unknown
+        """
+        if shape:
+            self.instances.setdefault(table_key, {})[row_index] = (
+                instance_type,
+                shape,
+                price,
+            )
+
+    def peak(self, row_index, cpu_peak):
+        """
+        Observed CPU peak of a row, rows without one keep their vCPUs
+        """
+        self.peaks[row_index] = cpu_peak
+
+    def recommend(self, candidate_table, architecture=None):
+        """
+        {row index: (type, price, saving)} of the cheapest candidates,
+        candidate_table(table_key) gives the table of a key
+        """
+        recommendations = {}
+        for table_key, instances in self.instances.items():
+            table = candidate_table(table_key)
+            rows = list(instances)
+            chosen = table.cheapest(
+                self.instance_arrays(table, instances), architecture
+            )
+            for row_index, column in zip(rows, chosen.tolist()):
+                if column < 0:
+                    recommendations[row_index] = (NOT_AVAILABLE,) * 3
+                    continue
+                price = instances[row_index][2]
+                future_price = round(float(table.prices[column]), 3)
+                recommendations[row_index] = (
+                    table.types[column],
+                    future_price,
+                    difference(price, future_price),
+                )
+
+        return recommendations
+
+    def instance_arrays(self, table, instances):
+        """
+        CandidateTable.cheapest() arrays of instances
+        """
+        values = list(instances.values())
+        peaks = [self.peaks.get(row_index) for row_index in instances]
+
+        return (
+            np.array([shape[0] for _, shape, _ in values], dtype=float),
+            np.array([shape[1] for _, shape, _ in values], dtype=float),
+            np.array([shape[2] for _, shape, _ in values], dtype=bool),
+            np.array(
+                [np.nan if is_missing(peak) else peak for peak in peaks], dtype=float
+            ),
+            np.array(
+                [np.nan if is_missing(price) else price for _, _, price in values],
+                dtype=float,
+            ),
+            np.array([table.columns.get(kind, -1) for kind, _, _ in values]),
+        )
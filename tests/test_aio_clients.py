@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+asyncio client registry
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+import boto3
+import pytest
+from aws import accounts, clients
+
+aio_clients = pytest.importorskip("aio.clients")
+
+
+def test_failed_client_is_created_again(monkeypatch):
+    """
+    A client whose creation failed once is not failed for the rest of the run
+    """
+    attempts = []
+
+    async def create_client(service, region):
+        attempts.append((service, region))
+        if len(attempts) == 1:
+            raise ConnectionError("endpoint down")
+        return object()
+
+    monkeypatch.setattr(aio_clients, "create_client", create_client)
+
+    async def run():
+        await aio_clients.open_clients()
+        try:
+            with pytest.raises(ConnectionError):
+                await aio_clients.get_client("ec2", "eu-central-1")
+            client = await aio_clients.get_client("ec2", "eu-central-1")
+            assert await aio_clients.get_client("ec2", "eu-central-1") is client
+        finally:
+            await aio_clients.close_clients()
+
+    asyncio.run(run())
+    assert len(attempts) == 2
+
+
+def test_assumed_role_credentials_are_refreshed(monkeypatch):
+    """
+    Clients of an assumed role sign with credentials fetched again as they
+    expire instead of the keys frozen when the client was created
+    """
+    session = boto3.Session()
+    fetches = []
+
+    def fetch():
+        fetches.append(len(fetches) + 1)
+        # inside the advisory refresh window, every use fetches again
+        expiry = datetime.now(timezone.utc) + timedelta(minutes=12)
+        return {
+            "access_key": f"key-{len(fetches)}",
+            "secret_key": "secret",
+            "token": "token",
+            "expiry_time": expiry.isoformat(),
+        }
+
+    monkeypatch.setitem(accounts.CREDENTIAL_FETCHES, session, fetch)
+    monkeypatch.setattr(clients, "SESSION", session)
+
+    async def run():
+        await aio_clients.open_clients()
+        try:
+            client = await aio_clients.get_client("sts", "eu-central-1")
+            credentials = await aio_clients.SESSION.get_credentials()
+            # pylint: disable=protected-access
+            assert client._request_signer._credentials is credentials
+            first = await credentials.get_frozen_credentials()
+            second = await credentials.get_frozen_credentials()
+        finally:
+            await aio_clients.close_clients()
+        return first.access_key, second.access_key
+
+    assert asyncio.run(run()) == ("key-1", "key-2")
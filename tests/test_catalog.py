@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+EC2 instance type catalog
+"""
+from types import SimpleNamespace
+import pytest
+from ec2 import catalog
+from ec2.catalog import build_catalog, instance_catalog, type_shape
+
+INSTANCE_TYPES = [
+    {
+        "InstanceType": "m5.large",
+        "VCpuInfo": {"DefaultVCpus": 2},
+        "MemoryInfo": {"SizeInMiB": 8192},
+        "ProcessorInfo": {"SupportedArchitectures": ["x86_64"]},
+        "NetworkInfo": {"NetworkPerformance": "Up to 10 Gigabit"},
+        "CurrentGeneration": True,
+    },
+    {
+        "InstanceType": "t4g.micro",
+        "VCpuInfo": {"DefaultVCpus": 2},
+        "MemoryInfo": {"SizeInMiB": 1024},
+        "ProcessorInfo": {"SupportedArchitectures": ["arm64"]},
+        "CurrentGeneration": True,
+        "BurstablePerformanceSupported": True,
+    },
+]
+
+
+class Ec2Client:
+    """
+    EC2 client answering describe_instance_types in pages of one type
+    """
+
+    def __init__(self, region="eu-central-1"):
+        self.meta = SimpleNamespace(region_name=region)
+        self.sweeps = 0
+
+    def get_paginator(self, operation):
+        """
+        Paginator of describe_instance_types
+        """
+        assert operation == "describe_instance_types"
+        return self
+
+    def paginate(self, **_):
+        """
+        Pages of the instance types
+        """
+        self.sweeps += 1
+        for instance_type in INSTANCE_TYPES:
+            yield {"InstanceTypes": [instance_type]}
+
+
+@pytest.fixture(name="catalog_dir")
+def fixture_catalog_dir(tmp_path, monkeypatch):
+    """
+    Catalog directory of a test, nothing kept in the process
+    """
+    monkeypatch.setattr(catalog, "CATALOG_DIR", str(tmp_path))
+    monkeypatch.setattr(catalog, "CATALOGS", {})
+    return tmp_path
+
+
+def test_shapes():
+    """
+    Entries keep the shape right-sizing compares, unknown types have none
+    """
+    types = build_catalog(INSTANCE_TYPES)
+
+    assert type_shape(types["m5.large"]) == (2, 8192, False)
+    assert type_shape(types["t4g.micro"]) == (2, 1024, True)
+    assert types["t4g.micro"]["architectures"] == ["arm64"]
+    assert type_shape(types.get("x9.huge")) is None
+
+
+def test_catalog_is_swept_once(catalog_dir, monkeypatch):
+    """
+    A region is swept once per process, later processes read it from disk
+    until it expires or its format changes
+    """
+    client = Ec2Client()
+    assert instance_catalog(client) is instance_catalog(client)
+    assert client.sweeps == 1
+    assert (catalog_dir / "eu-central-1.json").exists()
+
+    monkeypatch.setattr(catalog, "CATALOGS", {})
+    assert instance_catalog(client)["m5.large"]["vcpus"] == 2
+    assert client.sweeps == 1
+
+    monkeypatch.setattr(catalog, "CATALOGS", {})
+    monkeypatch.setattr(catalog, "TTL_HOURS", 0)
+    instance_catalog(client)
+    assert client.sweeps == 2
+
+    monkeypatch.setattr(catalog, "CATALOGS", {})
+    monkeypatch.setattr(catalog, "TTL_HOURS", 168)
+    monkeypatch.setattr(catalog, "CATALOG_VERSION", catalog.CATALOG_VERSION + 1)
+    instance_catalog(client)
+    assert client.sweeps == 3
+
+
+@pytest.mark.usefixtures("catalog_dir")
+def test_regions_have_their_own_catalog(monkeypatch):
+    """
+    Every region is swept on its own, an empty directory keeps nothing
+    """
+    instance_catalog(Ec2Client("eu-central-1"))
+    other = Ec2Client("eu-west-1")
+    instance_catalog(other)
+    assert other.sweeps == 1
+
+    monkeypatch.setattr(catalog, "CATALOG_DIR", "")
+    monkeypatch.setattr(catalog, "CATALOGS", {})
+    instance_catalog(other)
+    assert other.sweeps == 2
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+File exporters
+"""
+import os
+import json
+import pytest
+from ebs.ebsscan import VolumeRow, SnapshotRow, VOLUME_TABLE_HEAD, SNAPSHOT_TABLE_HEAD
+from common.records import NOT_AVAILABLE
+from export import columns
+from export.lines import LineExporter, JsonlExporter
+
+VOLUME = VolumeRow("vol-1", "2025-01-01", "in-use", "i-1", 32, "gp2", 3.2, 2.56, 0.64)
+SNAPSHOT = SnapshotRow(
+    "snap-1", "backup", 32, 10, "completed", "2025-01-01", "standard", 0.05, 0.5
+)
+
+
+def test_line_exporter_needs_write_rows(tmp_path):
+    """
+    Line exporters without a row writer cannot be created
+    """
+    with pytest.raises(TypeError):
+        LineExporter(str(tmp_path))  # pylint: disable=abstract-class-instantiated
+
+
+def test_parquet_partitions_per_scan(tmp_path):
+    """
+    The scans of a mode land in partitions of their own, each with its columns
+    """
+    pq = pytest.importorskip("pyarrow.parquet")
+    # pylint: disable=import-outside-toplevel
+    from export.parquet import ParquetExporter
+
+    exporter = ParquetExporter(str(tmp_path))
+    exporter.write("eu-central-1", "ebs", "query_ebs", VOLUME_TABLE_HEAD, [VOLUME])
+    exporter.write(
+        "eu-central-1",
+        "ebs",
+        "query_ebs_snapshots",
+        SNAPSHOT_TABLE_HEAD,
+        [SNAPSHOT._replace(snapshot_size=NOT_AVAILABLE)],
+    )
+
+    region = tmp_path / "region=eu-central-1"
+    assert sorted(os.listdir(region)) == [
+        "scan=query_ebs",
+        "scan=query_ebs_snapshots",
+    ]
+    volumes = pq.read_table(region / "scan=query_ebs")
+    snapshots = pq.read_table(region / "scan=query_ebs_snapshots")
+    assert volumes.column_names[: len(VOLUME_TABLE_HEAD)] == VOLUME_TABLE_HEAD
+    assert snapshots.column_names[: len(SNAPSHOT_TABLE_HEAD)] == SNAPSHOT_TABLE_HEAD
+    assert snapshots.column("Snapshot size *").to_pylist() == [None]
+
+
+def mixed_rows():
+    """
+    Account rows whose size column holds numbers, then a fraction, then text
+    """
+    yield ["111111111111", 1, True]
+    yield ["111111111111", 2, False]
+    yield ["222222222222", 2.5, NOT_AVAILABLE]
+    yield ["222222222222", "unknown", "yes"]
+
+
+MIXED_HEAD = ["Account", "Size", "Encrypted"]
+
+
+def test_later_cells_widen_their_column(monkeypatch):
+    """
+    A cell that does not fit the type of the first rows widens the column
+    instead of being dropped
+    """
+    monkeypatch.setattr(columns, "BATCH_ROWS", 2)
+
+    batches = list(columns.typed_batches(MIXED_HEAD, mixed_rows()))
+
+    assert [kinds for kinds, _ in batches] == [
+        ["string", "int", "bool"],
+        ["string", "string", "string"],
+    ]
+    assert [row[1:] for _, batch in batches for row in batch] == [
+        [1, True],
+        [2, False],
+        ["2.5", None],
+        ["unknown", "yes"],
+    ]
+
+
+def test_jsonl_keeps_widened_cells(monkeypatch, tmp_path):
+    """
+    Line exports write the widened cells
+    """
+    monkeypatch.setattr(columns, "BATCH_ROWS", 2)
+
+    exporter = JsonlExporter(str(tmp_path))
+    exporter.write("eu-central-1", "ebs", "query_ebs", MIXED_HEAD, mixed_rows())
+    exporter.close()
+
+    (path,) = tmp_path.rglob("*.jsonl")
+    assert [json.loads(line)["Size"] for line in path.open()] == [
+        1,
+        2,
+        "2.5",
+        "unknown",
+    ]
+
+
+def test_parquet_rewrites_widened_columns(monkeypatch, tmp_path):
+    """
+    Batches written before a column was widened take its new type
+    """
+    pq = pytest.importorskip("pyarrow.parquet")
+    # pylint: disable=import-outside-toplevel
+    from export.parquet import ParquetExporter
+
+    monkeypatch.setattr(columns, "BATCH_ROWS", 2)
+
+    exporter = ParquetExporter(str(tmp_path))
+    exporter.write("eu-central-1", "ebs", "query_ebs", MIXED_HEAD, mixed_rows())
+
+    partition = tmp_path / "region=eu-central-1" / "scan=query_ebs"
+    assert os.listdir(partition) == ["query_ebs.parquet"]
+    table = pq.read_table(partition / "query_ebs.parquet")
+    assert table.column("Size").to_pylist() == ["1", "2", "2.5", "unknown"]
+    assert table.column("Encrypted").to_pylist() == ["True", "False", None, "yes"]
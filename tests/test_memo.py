@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Memoization with in-flight request coalescing
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from common.memo import single_flight, async_single_flight, store_many
+
+
+def test_concurrent_misses_fetch_once():
+    """
+    Callers missing on the same key at once wait for one fetch
+    """
+    store = {}
+    fetches = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        fetches.append(1)
+        started.set()
+        release.wait(5)
+        return 70.08
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        leader = pool.submit(single_flight, store, "m5.large", fetch)
+        started.wait(5)
+        followers = [
+            pool.submit(single_flight, store, "m5.large", fetch) for _ in range(7)
+        ]
+        release.set()
+        values = [leader.result()] + [follower.result() for follower in followers]
+
+    assert values == [70.08] * 8
+    assert len(fetches) == 1
+    assert single_flight(store, "m5.large", fetch) == 70.08
+    assert len(fetches) == 1
+
+
+def test_failed_fetch_is_retried():
+    """
+    A failed fetch is raised to its waiters and not stored
+    """
+    store = {}
+
+    def fail():
+        raise ConnectionError("pricing down")
+
+    with pytest.raises(ConnectionError):
+        single_flight(store, "m5.large", fail)
+    assert single_flight(store, "m5.large", lambda: 70.08) == 70.08
+
+
+def test_store_many_answers_single_flight():
+    """
+    Keys stored in bulk are answered without fetching
+    """
+    store = {}
+    store_many(store, {"m5.large": 70.08, "m5.xlarge": 140.16})
+
+    assert single_flight(store, "m5.xlarge", pytest.fail) == 140.16
+
+
+def test_async_concurrent_misses_fetch_once():
+    """
+    Coroutines missing on the same key at once await one fetch, a failed
+    fetch is raised to all of them and retried afterwards
+    """
+    store = {}
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return 70.08
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("pricing down")
+
+    async def run():
+        values = await asyncio.gather(
+            *(async_single_flight(store, "m5.large", fetch) for _ in range(8))
+        )
+        failures = await asyncio.gather(
+            *(async_single_flight(store, "m5.xlarge", fail) for _ in range(3)),
+            return_exceptions=True,
+        )
+        retried = await async_single_flight(store, "m5.xlarge", fetch)
+        return values, failures, retried
+
+    values, failures, retried = asyncio.run(run())
+    assert values == [70.08] * 8
+    assert [type(failure) for failure in failures] == [ConnectionError] * 3
+    assert retried == 70.08
+    assert len(fetches) == 2
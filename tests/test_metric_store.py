@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Metric store scoping
+"""
+from datetime import datetime, timedelta
+import pytest
+from cloudwatch import metrics
+from cloudwatch.metrics import MetricBatch, load_metric_store, use_metric_scope
+from cloudwatch.store import series_key
+
+END_TIME = datetime(2025, 6, 30)
+START_TIME = END_TIME - timedelta(days=30)
+
+
+@pytest.fixture(name="store")
+def fixture_store(tmp_path, monkeypatch):
+    """
+    Metric store of a test
+    """
+    monkeypatch.setattr(metrics, "METRIC_STORE", None)
+    return load_metric_store(str(tmp_path / "metrics.db"))
+
+
+def cpu_batch(region):
+    """
+    Batch of the CPU series of a DB instance named the same everywhere
+    """
+    batch = MetricBatch(region, START_TIME, END_TIME)
+    batch.add(
+        "database-1",
+        "AWS/RDS",
+        "CPUUtilization",
+        [{"Name": "DBInstanceIdentifier", "Value": "database-1"}],
+        "Average",
+    )
+    return batch
+
+
+def fetch(batch, value):
+    """
+    Values of a batch whose series all hold value every hour of the window
+    """
+    timestamps = list(range(batch.start, batch.end, 3600))
+    return batch.results(
+        (query["Id"], timestamps, [value] * len(timestamps))
+        for start, queries in batch.windows()
+        for query in queries
+    )
+
+
+@pytest.mark.usefixtures("store")
+def test_regions_do_not_share_series():
+    """
+    Same dimensions in another region are fetched and stored on their own
+    """
+    fetch(cpu_batch("eu-central-1"), 1.0)
+
+    other = cpu_batch("eu-west-1")
+    assert other.windows() == [(other.start, other.queries)]
+    assert fetch(other, 90.0)["database-1"]["CPUUtilization"] == [90.0] * 720
+
+    again = cpu_batch("eu-central-1")
+    assert fetch(again, 1.0)["database-1"]["CPUUtilization"] == [1.0] * 720
+
+
+def test_accounts_do_not_share_series(store):
+    """
+    Same dimensions and region in another account are fetched on their own
+    """
+    use_metric_scope("111111111111")
+    fetch(cpu_batch("eu-central-1"), 1.0)
+
+    use_metric_scope("222222222222")
+    other = cpu_batch("eu-central-1")
+    assert other.windows() == [(other.start, other.queries)]
+    assert fetch(other, 90.0)["database-1"]["CPUUtilization"] == [90.0] * 720
+    assert store.scope == "222222222222"
+
+
+def test_prune_keeps_other_scopes(store):
+    """
+    Pruning the window of a scope leaves the older points of the others
+    """
+    earlier = cpu_batch("eu-central-1")
+    fetch(earlier, 1.0)
+
+    fetch(MetricBatch("eu-west-1", START_TIME + timedelta(days=1), END_TIME), 2.0)
+
+    key = series_key(earlier.scope, earlier.queries[0])
+    assert len(store.values(key, earlier.start, earlier.end)) == 720
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+RDS orderable options index
+"""
+from types import SimpleNamespace
+from rds import orderable
+from rds.orderable import build_index, is_orderable, orderable_index
+
+OPTIONS = [
+    {"DBInstanceClass": "db.m5.large", "StorageType": "gp2", "MultiAZCapable": True},
+    {"DBInstanceClass": "db.m5.large", "StorageType": "gp3", "MultiAZCapable": False},
+    {"DBInstanceClass": "db.m5.large", "StorageType": "gp2", "MultiAZCapable": True},
+    {"DBInstanceClass": "db.t3.micro", "StorageType": "gp2"},
+    {"DBInstanceClass": "db.r5.large"},
+]
+
+
+class RdsClient:
+    """
+    RDS client answering describe_orderable_db_instance_options in pages
+    """
+
+    def __init__(self):
+        self.meta = SimpleNamespace(region_name="eu-central-1")
+        self.sweeps = []
+
+    def get_paginator(self, operation):
+        """
+        Paginator of describe_orderable_db_instance_options
+        """
+        assert operation == "describe_orderable_db_instance_options"
+        return self
+
+    def paginate(self, Engine, EngineVersion, **_):  # pylint: disable=invalid-name
+        """
+        Pages of two options
+        """
+        self.sweeps.append((Engine, EngineVersion))
+        for start in range(0, len(OPTIONS), 2):
+            yield {"OrderableDBInstanceOptions": OPTIONS[start : start + 2]}
+
+
+def test_index_merges_options():
+    """
+    A class keeps every storage type and is Multi-AZ when any option is
+    """
+    assert build_index(OPTIONS) == {
+        "db.m5.large": {"storage_types": ["gp2", "gp3"], "multi_az": True},
+        "db.t3.micro": {"storage_types": ["gp2"], "multi_az": False},
+        "db.r5.large": {"storage_types": [], "multi_az": False},
+    }
+
+
+def test_is_orderable():
+    """
+    Classes are orderable with their storage types, Multi-AZ when capable
+    """
+    index = build_index(OPTIONS)
+
+    assert is_orderable(index, "db.m5.large", "gp3", True)
+    assert not is_orderable(index, "db.m5.large", "io1", False)
+    assert is_orderable(index, "db.t3.micro", "gp2", False)
+    assert not is_orderable(index, "db.t3.micro", "gp2", True)
+    # options without a storage type do not restrict it
+    assert is_orderable(index, "db.r5.large", "aurora", False)
+    assert not is_orderable(index, "db.x2g.large", "gp2", False)
+
+
+def test_index_is_swept_once_per_engine_version(tmp_path, monkeypatch):
+    """
+    An engine version is swept once, later processes read it from disk
+    until it expires or its format changes
+    """
+    monkeypatch.setattr(orderable, "INDEX_DIR", str(tmp_path))
+    monkeypatch.setattr(orderable, "INDEXES", {})
+    client = RdsClient()
+
+    index = orderable_index(client, "mysql", "8.0.40")
+    assert orderable_index(client, "mysql", "8.0.40") is index
+    orderable_index(client, "postgres", "16.4")
+    assert client.sweeps == [("mysql", "8.0.40"), ("postgres", "16.4")]
+
+    monkeypatch.setattr(orderable, "INDEXES", {})
+    assert orderable_index(client, "mysql", "8.0.40") == index
+    assert len(client.sweeps) == 2
+
+    monkeypatch.setattr(orderable, "INDEXES", {})
+    monkeypatch.setattr(orderable, "INDEX_VERSION", orderable.INDEX_VERSION + 1)
+    orderable_index(client, "mysql", "8.0.40")
+    assert len(client.sweeps) == 3
+
+    monkeypatch.setattr(orderable, "INDEXES", {})
+    monkeypatch.setattr(orderable, "TTL_HOURS", 0)
+    orderable_index(client, "mysql", "8.0.40")
+    assert len(client.sweeps) == 4
+
+
+def test_empty_directory_keeps_nothing(monkeypatch):
+    """
+    Without a directory every process sweeps again
+    """
+    monkeypatch.setattr(orderable, "INDEX_DIR", "")
+    monkeypatch.setattr(orderable, "INDEXES", {})
+    client = RdsClient()
+    orderable_index(client, "mysql", "8.0.40")
+    monkeypatch.setattr(orderable, "INDEXES", {})
+    orderable_index(client, "mysql", "8.0.40")
+
+    assert len(client.sweeps) == 2
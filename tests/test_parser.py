@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Price List decoding
+"""
+import json
+from pricing.parser import (
+    usd_price,
+    decoded_usd_price,
+    usage_type,
+    attribute,
+    first_match,
+    SNAPSHOT_USAGE,
+)
+
+
+def price_item(on_demand, reserved=None, usagetype="EUC1-EBS:SnapshotUsage"):
+    """
+    Raw Price List item with OnDemand and Reserved terms of given dimensions
+    """
+    return json.dumps(
+        {
+            "product": {
+                "productFamily": "Storage Snapshot",
+                "attributes": {"usagetype": usagetype, "regionCode": "eu-central-1"},
+            },
+            "terms": {
+                "OnDemand": {
+                    "TERM": {
+                        "priceDimensions": {
+                            f"DIM{position}": {"pricePerUnit": price_per_unit}
+                            for position, price_per_unit in enumerate(on_demand)
+                        }
+                    }
+                }
+                if on_demand is not None
+                else {},
+                "Reserved": {
+                    "RESERVED": {
+                        "priceDimensions": {"DIM": {"pricePerUnit": {"USD": reserved}}}
+                    }
+                }
+                if reserved
+                else {},
+            },
+        },
+        indent=2,
+    )
+
+
+def test_on_demand_price():
+    """
+    The OnDemand USD price answers, from the raw document as decoded
+    """
+    item = price_item([{"USD": "0.0500000000"}], reserved="0.0100000000")
+
+    assert usd_price(item) == decoded_usd_price(item) == 0.05
+
+
+def test_no_on_demand_price():
+    """
+    Products without an OnDemand USD price have none, whatever other terms
+    hold
+    """
+    assert usd_price(price_item(None, reserved="0.01")) is None
+    assert usd_price(price_item([{"CNY": "0.35"}], reserved="0.01")) is None
+
+
+def test_first_usd_dimension():
+    """
+    The first OnDemand dimension priced in USD answers
+    """
+    item = price_item([{"CNY": "0.35"}, {"USD": "0.0125000000"}], reserved="0.01")
+
+    assert usd_price(item) == decoded_usd_price(item) == 0.0125
+
+
+def test_attributes():
+    """
+    Attributes are read from the raw document
+    """
+    item = price_item([{"USD": "0.05"}])
+
+    assert usage_type(item) == "EUC1-EBS:SnapshotUsage"
+    assert attribute(item, "regionCode") == "eu-central-1"
+    assert attribute(item, "instanceType") is None
+
+
+def test_first_match_stops_reading():
+    """
+    The first item whose usagetype matches is priced, later items are not read
+    """
+    items = [
+        price_item([{"USD": "0.0125"}], usagetype="EUC1-EBS:SnapshotArchiveStorage"),
+        price_item([{"USD": "0.05"}]),
+    ]
+
+    def price_items():
+        yield from items
+        raise AssertionError("read past the match")
+
+    assert first_match(price_items(), SNAPSHOT_USAGE) == 0.05
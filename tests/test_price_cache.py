@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Persistent price cache
+"""
+import json
+import pytest
+from common.records import MULTIPLE
+from pricing import cache
+from pricing.cache import PriceCache
+
+HOUR = 3600
+
+
+class Clock:
+    """
+    time module of the cache, moved by hand
+    """
+
+    def __init__(self):
+        self.now = 1_750_000_000.0
+
+    def time(self):
+        """
+        Current time
+        """
+        return self.now
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    """
+    Clock of a test
+    """
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+@pytest.fixture(name="path")
+def fixture_path(tmp_path):
+    """
+    Cache file of a test
+    """
+    return str(tmp_path / "prices.json")
+
+
+@pytest.mark.usefixtures("clock")
+def test_prices_survive_runs(path):
+    """
+    Prices and missing price markers are read back by the next run
+    """
+    price_cache = PriceCache(path)
+    price_cache.set("ec2|m5.large", 70.08)
+    price_cache.set("ec2|m5.metal", MULTIPLE)
+    price_cache.save()
+
+    next_run = PriceCache(path)
+    assert next_run.get("ec2|m5.large") == 70.08
+    assert next_run.get("ec2|m5.metal") is MULTIPLE
+    assert next_run.get("ec2|m5.xlarge") is None
+    assert PriceCache(path, refresh=True).get("ec2|m5.large") is None
+
+
+def test_prices_expire(path, clock):
+    """
+    Prices older than the TTL are not answered and not saved again
+    """
+    price_cache = PriceCache(path, ttl_hours=24)
+    price_cache.set("ec2|m5.large", 70.08)
+    clock.now += 23 * HOUR
+    price_cache.set("ec2|m5.xlarge", 140.16)
+    assert price_cache.get("ec2|m5.large") == 70.08
+
+    clock.now += 2 * HOUR
+    assert price_cache.get("ec2|m5.large") is None
+    price_cache.save()
+
+    with open(path, encoding="utf-8") as cache_file:
+        assert list(json.load(cache_file)["prices"]) == ["ec2|m5.xlarge"]
+
+
+@pytest.mark.usefixtures("clock")
+def test_other_versions_are_dropped(path, monkeypatch):
+    """
+    A cache written in another value format is ignored
+    """
+    price_cache = PriceCache(path)
+    price_cache.set("ec2|m5.large", 70.08)
+    price_cache.save()
+
+    monkeypatch.setattr(cache, "CACHE_VERSION", cache.CACHE_VERSION + 1)
+    assert PriceCache(path).get("ec2|m5.large") is None
+
+
+def test_save_merges_other_processes(path, clock):
+    """
+    Prices another process saved meanwhile are kept, the newest of a key wins
+    """
+    first = PriceCache(path)
+    second = PriceCache(path)
+    first.set("ec2|m5.large", 70.08)
+    first.set("ec2|m5.xlarge", 140.16)
+    clock.now += HOUR
+    second.set("ec2|m5.xlarge", 141.0)
+    second.save()
+    clock.now += HOUR
+    first.save()
+
+    merged = PriceCache(path)
+    assert merged.get("ec2|m5.large") == 70.08
+    assert merged.get("ec2|m5.xlarge") == 141.0
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Offline price index
+"""
+import json
+import pytest
+from pricing import index
+from pricing.index import PriceIndex
+from pricing.parser import usd_price
+
+
+def product(instance_type, region, operating_system="Linux"):
+    """
+    Price List product of an instance type
+    """
+    return {
+        "productFamily": "Compute Instance",
+        "attributes": {
+            "regionCode": region,
+            "instanceType": instance_type,
+            "operatingSystem": operating_system,
+            "tenancy": "Shared",
+        },
+    }
+
+
+def term(usd):
+    """
+    Terms of one product with one price dimension
+    """
+    return {
+        "TERM": {
+            "priceDimensions": {
+                "DIM": {"unit": "Hrs", "pricePerUnit": {"USD": usd} if usd else {}}
+            }
+        }
+    }
+
+
+OFFER = {
+    "formatVersion": "v1.0",
+    "offerCode": "AmazonEC2",
+    "version": 20250601,
+    "products": {
+        "SKU1": product("m5.large", "eu-central-1"),
+        "SKU2": product("m5.xlarge", "eu-central-1"),
+        "SKU3": product("m5.large", "eu-west-1", "Windows"),
+        "SKU4": product("m5.2xlarge", "eu-central-1"),
+    },
+    "terms": {
+        "OnDemand": {
+            "SKU1": term("0.1150000000"),
+            "SKU2": term("0.2300000000"),
+            "SKU3": term("0.2070000000"),
+            "SKU4": term(None),
+        },
+        "Reserved": {"SKU1": term("0.0700000000")},
+    },
+    "attributesList": {},
+}
+
+CSV_OFFER = """\
+"FormatVersion","v1.0"
+"OfferCode","AmazonRDS"
+"SKU","OfferTermCode","TermType","PricePerUnit","Currency","Product Family","Region Code","Instance Type","Database Engine","Deployment Option"
+"R1","T1","Reserved","0.1","USD","Database Instance","eu-central-1","db.m5.large","MySQL","Single-AZ"
+"R1","T2","OnDemand","0.171","USD","Database Instance","eu-central-1","db.m5.large","MySQL","Single-AZ"
+"R2","T2","OnDemand","0.342","USD","Database Instance","eu-central-1","db.m5.xlarge","MySQL","Single-AZ"
+"""
+
+
+@pytest.fixture(name="offers")
+def fixture_offers(tmp_path, monkeypatch):
+    """
+    Directory of a JSON and a CSV offer file, read in tiny chunks and batches
+    """
+    monkeypatch.setattr(index, "READ_CHUNK", 7)
+    monkeypatch.setattr(index, "INGEST_ROWS", 2)
+    (tmp_path / "AmazonEC2.json").write_text(json.dumps(OFFER, indent=2))
+    (tmp_path / "AmazonRDS.csv").write_text(CSV_OFFER)
+    return tmp_path
+
+
+def prices(price_index, service_code, filters):
+    """
+    {instance type: USD price} answered by the index
+    """
+    price_list = price_index.get_products(
+        ServiceCode=service_code,
+        Filters=[{"Field": field, "Value": value} for field, value in filters.items()],
+    )["PriceList"]
+    return {
+        json.loads(item)["product"]["attributes"]["instanceType"]: usd_price(item)
+        for item in price_list
+    }
+
+
+def test_offers_are_streamed_into_the_index(offers, tmp_path):
+    """
+    OnDemand USD prices of both offer formats are indexed, Reserved terms
+    and products without a USD price are not
+    """
+    price_index = PriceIndex(str(tmp_path / "prices.db"))
+
+    assert price_index.ingest(str(offers)) == 5
+    assert prices(price_index, "AmazonEC2", {"regionCode": "eu-central-1"}) == {
+        "m5.large": 0.115,
+        "m5.xlarge": 0.23,
+    }
+    assert prices(
+        price_index,
+        "AmazonEC2",
+        {"regionCode": "EU-WEST-1", "operatingSystem": "windows", "tenancy": "shared"},
+    ) == {"m5.large": 0.207}
+    assert prices(price_index, "AmazonRDS", {"instanceType": "db.m5.large"}) == {
+        "db.m5.large": 0.171
+    }
+
+
+def test_index_covers_ingested_regions(offers, tmp_path):
+    """
+    Regions of ingested offers are answered offline, in a later run too
+    """
+    PriceIndex(str(tmp_path / "prices.db")).ingest(str(offers))
+
+    price_index = PriceIndex(str(tmp_path / "prices.db"))
+    assert price_index.covers("AmazonEC2", "EU-CENTRAL-1")
+    assert price_index.covers("AmazonRDS", "eu-central-1")
+    assert not price_index.covers("AmazonRDS", "eu-west-1")
+
+
+def test_other_services_are_skipped(tmp_path):
+    """
+    Offer files of services the scanners do not price are not indexed
+    """
+    (tmp_path / "AmazonS3.json").write_text(
+        json.dumps({**OFFER, "offerCode": "AmazonS3"})
+    )
+    price_index = PriceIndex(str(tmp_path / "prices.db"))
+
+    assert price_index.ingest(str(tmp_path / "AmazonS3.json")) == 0
+    assert not price_index.covers("AmazonS3", "eu-central-1")
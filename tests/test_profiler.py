@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+API call profiler
+"""
+import botocore.session
+import pytest
+from botocore.config import Config
+from botocore.exceptions import EndpointConnectionError
+from aws.profiler import ApiProfile
+
+
+def test_failed_calls_are_counted(monkeypatch):
+    """
+    A call that never reaches its endpoint is an error of its operation
+    """
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    client = botocore.session.get_session().create_client(
+        "ec2",
+        region_name="eu-central-1",
+        endpoint_url="http://127.0.0.1:9",
+        config=Config(connect_timeout=1, retries={"total_max_attempts": 1}),
+    )
+    profile = ApiProfile()
+    profile.register(client)
+
+    with pytest.raises(EndpointConnectionError):
+        client.describe_instances()
+
+    stats = profile.take()[("ec2", "DescribeInstances", "eu-central-1")]
+    assert stats["calls"] == 1 and stats["errors"] == 1
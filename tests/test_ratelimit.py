@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+AWS rate limiter
+"""
+import botocore.session
+import pytest
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from aws import ratelimit
+from aws.ratelimit import (
+    TokenBucket,
+    bucket,
+    configure_rate_limits,
+    parse_rates,
+    register_rate_limits,
+)
+
+THROTTLED = (
+    b"<Response><Errors><Error><Code>RequestLimitExceeded</Code>"
+    b"<Message>Request limit exceeded.</Message></Error></Errors>"
+    b"<RequestID>1</RequestID></Response>"
+)
+REGIONS = (
+    b'<DescribeRegionsResponse xmlns="http://ec2.amazonaws.com/doc/2016-11-15/">'
+    b"<requestId>2</requestId><regionInfo/></DescribeRegionsResponse>"
+)
+
+
+class Clock:
+    """
+    time module of the limiter, moved by hand
+    """
+
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self):
+        """
+        Current time
+        """
+        return self.now
+
+    def sleep(self, seconds):
+        """
+        Sleep, recorded
+        """
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class Body:
+    """
+    Raw HTTP response body
+    """
+
+    def __init__(self, content):
+        self.content = content
+
+    def stream(self):
+        """
+        Body chunks
+        """
+        yield self.content
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    """
+    Clock of a test, with fresh buckets
+    """
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "time", clock)
+    configure_rate_limits()
+    yield clock
+    configure_rate_limits()
+
+
+def test_parse_rates():
+    """
+    Rates by service or service.Operation
+    """
+    assert parse_rates("pricing=5, ec2.DescribeInstances=20,") == {
+        "pricing": 5.0,
+        "ec2.DescribeInstances": 20.0,
+    }
+    assert not parse_rates(None)
+
+
+def test_bucket_waits_once_the_burst_is_used(clock):
+    """
+    A burst of the rate goes out at once, later requests are spaced by it
+    """
+    token_bucket = TokenBucket(2, 2)
+
+    assert [token_bucket.reserve() for _ in range(4)] == [0, 0, 0.5, 1.0]
+    clock.now += 2.5
+    assert token_bucket.reserve() == 0
+
+
+@pytest.mark.usefixtures("clock")
+def test_rate_adapts_to_throttling():
+    """
+    Throttling halves the rate down to a floor, successes raise it back to
+    the ceiling
+    """
+    token_bucket = TokenBucket(4, 4)
+    token_bucket.throttled()
+    assert token_bucket.rate == 2
+    for _ in range(10):
+        token_bucket.throttled()
+    assert token_bucket.rate == ratelimit.MIN_RATE
+    for _ in range(20):
+        token_bucket.succeeded()
+    assert token_bucket.rate == 4
+
+
+@pytest.mark.usefixtures("clock")
+def test_configured_rates():
+    """
+    An operation rate beats its service rate, other buckets learn their rate
+    """
+    configure_rate_limits("ec2=5,ec2.DescribeInstances=1")
+
+    assert bucket("ec2", "DescribeInstances", "eu-central-1").ceiling == 1
+    assert bucket("ec2", "DescribeVolumes", "eu-central-1").ceiling == 5
+    learned = bucket("rds", "DescribeDBInstances", "eu-central-1")
+    assert (learned.rate, learned.ceiling) == (
+        ratelimit.DEFAULT_RATE,
+        ratelimit.MAX_LEARNED_RATE,
+    )
+    assert bucket("ec2", "DescribeVolumes", "eu-west-1") is not bucket(
+        "ec2", "DescribeVolumes", "eu-central-1"
+    )
+
+
+def test_client_requests_take_tokens(clock, monkeypatch):
+    """
+    Every request attempt of a client takes a token, its throttled and
+    successful responses adapt the rate of its operation
+    """
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    configure_rate_limits("ec2.DescribeRegions=1")
+    client = botocore.session.get_session().create_client(
+        "ec2",
+        region_name="eu-central-1",
+        config=Config(retries={"mode": "standard", "total_max_attempts": 1}),
+    )
+    register_rate_limits(client)
+    responses = [(400, THROTTLED), (200, REGIONS), (200, REGIONS)]
+
+    def respond(request, **_):
+        status, content = responses.pop(0)
+        return AWSResponse(request.url, status, {}, Body(content))
+
+    client.meta.events.register("before-send", respond)
+
+    with pytest.raises(ClientError):
+        client.describe_regions()
+    region_bucket = bucket("ec2", "DescribeRegions", "eu-central-1")
+    assert region_bucket.rate == 0.5
+
+    # the throttled attempt left no token, the next waits a token at the
+    # halved rate, which also earns the token of the one after it
+    client.describe_regions()
+    client.describe_regions()
+    assert clock.slept == [2.0]
+    assert region_bucket.rate == 1
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Price-ranked right-sizing
+"""
+import numpy as np
+from common.records import NOT_AVAILABLE, UNKNOWN
+from rightsizing import engine
+from rightsizing.engine import CandidateTable, SizingBatch
+
+# (type, vcpus, memory, architecture, burstable, monthly price)
+CANDIDATES = [
+    ("m5.2xlarge", 8, 32, "x86_64", False, 280.32),
+    ("m5.large", 2, 8, "x86_64", False, 70.08),
+    ("m6g.large", 2, 8, "arm64", False, 56.21),
+    ("m5.xlarge", 4, 16, "x86_64", False, 140.16),
+    ("t3.large", 2, 8, "x86_64", True, 60.74),
+    ("r5.large", 2, 16, "x86_64", False, 91.98),
+    ("m7i.large", 2, 8, "x86_64", False, UNKNOWN),
+]
+TABLE = CandidateTable(CANDIDATES)
+
+
+def instances(*rows):
+    """
+    cheapest() arrays of (vcpus, memory, burstable, peak, price, current type)
+    rows
+    """
+    return (
+        np.array([row[0] for row in rows], dtype=float),
+        np.array([row[1] for row in rows], dtype=float),
+        np.array([row[2] for row in rows], dtype=bool),
+        np.array([row[3] for row in rows], dtype=float),
+        np.array([row[4] for row in rows], dtype=float),
+        np.array([TABLE.columns.get(row[5], -1) for row in rows]),
+    )
+
+
+def cheapest(*rows, architecture=None):
+    """
+    Types cheapest() picks for rows, None where nothing fits
+    """
+    return [
+        TABLE.types[column] if column >= 0 else None
+        for column in TABLE.cheapest(instances(*rows), architecture).tolist()
+    ]
+
+
+def test_candidates_without_price_are_dropped():
+    """
+    Candidates are sorted by price, unpriced ones are never suggested
+    """
+    assert TABLE.types == [
+        "m6g.large",
+        "t3.large",
+        "m5.large",
+        "r5.large",
+        "m5.xlarge",
+        "m5.2xlarge",
+    ]
+
+
+def test_cheapest_fitting_candidate():
+    """
+    The cheapest candidate running the peak under the target utilization with
+    at least the memory wins, it must be cheaper than the current type
+    """
+    assert cheapest(
+        # 8 vCPUs at 30%: 3 vCPUs needed at 80%
+        (8, 16, False, 30.0, 280.32, "m5.2xlarge"),
+        # 8 vCPUs at 10%: 1 vCPU needed, memory keeps 16 GiB
+        (8, 16, False, 10.0, 280.32, "m5.2xlarge"),
+        # 8 vCPUs at 90%: nothing smaller fits
+        (8, 32, False, 90.0, 280.32, "m5.2xlarge"),
+        # already the cheapest fitting type
+        (2, 8, False, 50.0, 56.21, "m6g.large"),
+    ) == ["m5.xlarge", "r5.large", None, None]
+
+
+def test_target_utilization(monkeypatch):
+    """
+    A lower target asks for more headroom
+    """
+    monkeypatch.setattr(engine, "TARGET_UTILIZATION", 40)
+
+    assert cheapest((8, 8, False, 30.0, 280.32, "m5.2xlarge")) == [None]
+    assert cheapest((8, 8, False, 15.0, 280.32, "m5.2xlarge")) == ["m5.xlarge"]
+
+
+def test_missing_peak_and_price():
+    """
+    Without a peak the vCPUs are kept, without a price any price is allowed
+    """
+    assert cheapest(
+        (4, 16, False, np.nan, 280.32, "m5.2xlarge"),
+        (2, 8, False, 10.0, np.nan, "c5.large"),
+    ) == ["m5.xlarge", "m6g.large"]
+
+
+def test_architecture_and_burstable_filters():
+    """
+    An architecture limits the candidates, burstable types are only
+    suggested for burstable instances
+    """
+    assert cheapest((2, 8, False, 10.0, np.nan, "c5.large"), architecture="x86_64") == [
+        "m5.large"
+    ]
+    assert cheapest((2, 8, True, 10.0, np.nan, "t3.xlarge"), architecture="x86_64") == [
+        "t3.large"
+    ]
+
+
+def test_current_type_is_excluded():
+    """
+    An instance is never right-sized to its own type
+    """
+    assert cheapest((2, 8, False, 10.0, np.nan, "m6g.large")) == ["m5.large"]
+
+
+def test_empty_table():
+    """
+    Nothing fits without candidates
+    """
+    table = CandidateTable([])
+
+    assert table.cheapest(
+        instances((2, 8, False, 10.0, 70.08, "m5.large"))
+    ).tolist() == [-1]
+
+
+def test_batch_recommendations(monkeypatch):
+    """
+    Rows get their cheapest type, price and saving, unknown shapes are skipped
+    """
+    monkeypatch.setattr(engine, "CHUNK_SIZE", 1)
+    batch = SizingBatch()
+    batch.add("Linux", 0, "m5.2xlarge", (8, 16, False), 280.32)
+    batch.add("Linux", 1, "m5.2xlarge", (8, 32, False), 280.32)
+    batch.add("Linux", 2, "m5.xlarge", (4, 16, False), NOT_AVAILABLE)
+    batch.add("Linux", 3, "x9.huge", None, 1000.0)
+    batch.peak(0, 30.0)
+    batch.peak(1, 95.0)
+    batch.peak(2, NOT_AVAILABLE)
+
+    tables = []
+
+    def candidate_table(table_key):
+        tables.append(table_key)
+        return TABLE
+
+    assert batch.recommend(candidate_table, "x86_64") == {
+        0: ("m5.xlarge", 140.16, 140.16),
+        1: (NOT_AVAILABLE,) * 3,
+        2: ("m5.2xlarge", 280.32, NOT_AVAILABLE),
+    }
+    assert tables == ["Linux"]
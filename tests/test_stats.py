@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Utilization statistics
+"""
+from cloudwatch.stats import series_stats
+
+
+def test_missing_periods_count_as_idle():
+    """
+    Periods without a datapoint are zero traffic when periods are given
+    """
+    (busy,) = series_stats([[5.0, 5.0]], 1)
+    (padded,) = series_stats([[5.0, 5.0]], 1, 4)
+    (silent,) = series_stats([[]], 1, 4)
+
+    assert busy[0] == 5.0 and busy[-1] == 0
+    assert padded[0] == 2.5 and padded[2] == 0.0 and padded[-1] == 2
+    assert silent[-1] == 4